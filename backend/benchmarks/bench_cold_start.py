@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for scale-to-zero deployments.
+
+Each sample runs in a fresh interpreter:
+- import: time to `import server` (the app module, including app construction)
+- first request: from spawning `uvicorn server:app` to the first 200 response
+  on --path (default /api/, which needs no database round-trip)
+
+Results are written as JSON; --compare prints deltas against an earlier run.
+
+Usage (from the backend directory):
+    python benchmarks/bench_cold_start.py --samples 10 --output cold.json
+    python benchmarks/bench_cold_start.py --path /api/members/search --compare cold.json
+
+Without a reachable MongoDB, keep --path on a route that doesn't query it;
+index creation runs in the background and only logs a warning.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.loadtest import free_port, git_commit  # noqa: E402
+
+IMPORT_PROBE = (
+    "import time; start = time.perf_counter(); import server; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "samples": len(samples),
+        "minMs": round(min(samples), 1),
+        "medianMs": round(statistics.median(samples), 1),
+        "maxMs": round(max(samples), 1)
+    }
+
+
+def child_env(mongo_url: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", mongo_url)
+    env.setdefault("DB_NAME", "clean_check_cold_start")
+    # Don't let a missing server hold background index creation open for 30s
+    env.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    return env
+
+
+def measure_import(env: dict) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, path: str, timeout: float) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"No 200 from {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def compare(previous: dict, current: dict):
+    print(f"{'measurement':<16}{'median ms':>26}")
+    for name in ("import", "firstRequest"):
+        before = previous.get(name, {}).get("medianMs")
+        after = current[name]["medianMs"]
+        if before:
+            print(f"{name:<16}{before:>10} -> {after:<10}{(after - before) / before * 100:+5.0f}%")
+        else:
+            print(f"{name:<16}{after:>26}  (new)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-request")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--path", default="/api/", help="Route for the first request")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", default="", help="Earlier JSON report to print deltas against")
+    args = parser.parse_args()
+
+    env = child_env(args.mongo_url)
+    import_samples = [measure_import(env) for _ in range(args.samples)]
+    request_samples = [measure_first_request(env, args.path, args.timeout) for _ in range(args.samples)]
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "path": args.path,
+            "python": sys.version.split()[0],
+            "startedAt": datetime.now(timezone.utc).isoformat()
+        },
+        "import": summarize(import_samples),
+        "firstRequest": summarize(request_samples)
+    }
+
+    body = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(body + "\n")
+    else:
+        print(body)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Serialization and compression benchmark for the largest admin payloads.
+
+Compares, for synthetic `get_all_profiles`, `get_pending_payments` and
+`get_admin_stats` responses:
+  - stdlib:        jsonable_encoder + json.dumps (FastAPI's JSONResponse path)
+  - orjson:        jsonable_encoder + orjson (ORJSONResponse as default class)
+  - orjson-direct: orjson on the raw Mongo rows (handler returns ORJSONResponse)
+and the bytes on the wire raw, gzipped and brotli-compressed at the levels the
+middleware uses.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py [--rows 100] [--repeat 200]
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+
+def synthetic_profile(index: int) -> dict:
+    created = datetime.now(timezone.utc) - timedelta(minutes=index)
+    image_hash = uuid.uuid4().hex * 2
+    return {
+        "membershipId": str(uuid.uuid4()),
+        "name": f"Member {index}",
+        "email": f"member{index}@example.com",
+        "photo": f"/api/images/{image_hash}.webp",
+        "references": [
+            {"membershipId": str(uuid.uuid4()), "name": f"Reference {n}", "addedOn": created.isoformat()}
+            for n in range(random.randint(0, 5))
+        ],
+        "userStatus": random.choice([1, 3]),
+        "paymentStatus": random.choice(["pending", "confirmed", "rejected"]),
+        "assignedMemberId": str(random.randint(100000, 999999)),
+        "documentUploaded": random.random() > 0.5,
+        "qrCodeEnabled": random.random() > 0.5,
+        "createdAt": created.isoformat(),
+        "updatedAt": created.isoformat()
+    }
+
+
+def synthetic_payment(index: int) -> dict:
+    return {
+        "membershipId": str(uuid.uuid4()),
+        "name": f"Member {index}",
+        "email": f"member{index}@example.com",
+        "paymentMethod": random.choice(["PayPal", "Zelle", "Venmo"]),
+        "amount": random.choice(["$39", "$69", "Not specified"]),
+        "transactionId": uuid.uuid4().hex[:17].upper(),
+        "notes": "",
+        "status": "pending",
+        "submittedAt": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def synthetic_stats() -> dict:
+    return {
+        "totalUsers": 48211,
+        "totalReferences": 131877,
+        "totalVisits": 902114,
+        "qrCodesGenerated": 48211,
+        "pendingPayments": 37
+    }
+
+
+SERIALIZERS = {
+    "stdlib": lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+    "orjson": lambda payload: ORJSONResponse(jsonable_encoder(payload)).body,
+    "orjson-direct": lambda payload: ORJSONResponse(payload).body
+}
+
+
+def time_serializer(serialize, payload, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(payload)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def bench_payload(name: str, payload, repeat: int) -> dict:
+    body = SERIALIZERS["orjson-direct"](payload)
+    return {
+        "payload": name,
+        "serializeMicros": {
+            serializer: round(time_serializer(serialize, payload, repeat), 1)
+            for serializer, serialize in SERIALIZERS.items()
+        },
+        "bytes": {
+            "raw": len(body),
+            "gzip": len(gzip.compress(body, compresslevel=9)),
+            "brotli": len(brotli.compress(body, quality=4))
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression")
+    parser.add_argument("--rows", type=int, default=100, help="Rows per listing payload (admin pages are 100)")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    payloads = {
+        "get_all_profiles": [synthetic_profile(i) for i in range(args.rows)],
+        "get_pending_payments": [synthetic_payment(i) for i in range(args.rows)],
+        "get_admin_stats": synthetic_stats()
+    }
+
+    results = [bench_payload(name, payload, args.repeat) for name, payload in payloads.items()]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
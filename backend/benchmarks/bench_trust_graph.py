@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Trust-network traversal benchmark on a synthetic reference graph.
+
+Seeds a scratch database with N members, each referencing a random handful of
+others, then times neighborhood queries at depth 1-3 and shortest-path
+queries between random pairs through the same functions the API uses.
+
+Usage (from the backend directory):
+    python benchmarks/bench_trust_graph.py --mongo-url mongodb://localhost:27017 [--members 100000]
+    python benchmarks/bench_trust_graph.py --mock --members 2000   # mongomock-motor, no server needed
+
+The scratch database (--db-name, default clean_check_bench_trust) is dropped
+before seeding.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "clean_check_bench_trust")
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import core  # noqa: E402
+from routers import trust  # noqa: E402
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {
+        "count": len(ordered),
+        "meanMs": round(statistics.fmean(ordered), 2),
+        "p50Ms": round(pick(0.50), 2),
+        "p95Ms": round(pick(0.95), 2),
+        "p99Ms": round(pick(0.99), 2)
+    }
+
+
+async def seed(db, members: int, avg_degree: int, batch_size: int = 10000):
+    await db.profiles.drop()
+    await db.references.drop()
+    await db.profiles.create_index([("membershipId", 1)], unique=True)
+    await db.references.create_index([("fromId", 1), ("toId", 1)], unique=True)
+    await db.references.create_index([("toId", 1), ("fromId", 1)])
+
+    ids = [f"m{index:07d}" for index in range(members)]
+    for start in range(0, members, batch_size):
+        await db.profiles.insert_many([
+            {"membershipId": member_id, "name": f"Member {member_id}", "paymentStatus": "confirmed"}
+            for member_id in ids[start:start + batch_size]
+        ])
+
+    edges = []
+    edge_count = 0
+    for member_id in ids:
+        for target in set(random.sample(ids, random.randint(0, avg_degree * 2))):
+            if target != member_id:
+                edges.append({"fromId": member_id, "toId": target, "name": f"Member {target}", "addedOn": ""})
+        if len(edges) >= batch_size:
+            await db.references.insert_many(edges, ordered=False)
+            edge_count += len(edges)
+            edges = []
+    if edges:
+        await db.references.insert_many(edges, ordered=False)
+        edge_count += len(edges)
+
+    return ids, edge_count
+
+
+async def timed(coroutine_factory, samples: int) -> list:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await coroutine_factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def run(args):
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    core.use_database(db)
+
+    random.seed(args.seed)
+    seed_start = time.perf_counter()
+    ids, edge_count = await seed(db, args.members, args.avg_degree)
+    seed_seconds = time.perf_counter() - seed_start
+
+    results = {
+        "members": args.members,
+        "edges": edge_count,
+        "seedSeconds": round(seed_seconds, 1),
+        "neighborhood": {},
+        "path": {}
+    }
+
+    for depth in (1, 2, 3):
+        timings = await timed(
+            lambda: trust.get_trust_neighborhood(random.choice(ids), depth, "out", trust.TRUST_MAX_NODES),
+            args.samples
+        )
+        results["neighborhood"][f"depth{depth}"] = percentiles(timings)
+
+    found = []
+    inconclusive = []
+
+    async def path_query():
+        path, conclusive = await trust.find_trust_path(random.choice(ids), random.choice(ids), args.max_length, "out")
+        found.append(path is not None)
+        inconclusive.append(not conclusive)
+
+    results["path"] = percentiles(await timed(path_query, args.samples))
+    results["path"]["connectedRatio"] = round(sum(found) / len(found), 3)
+    results["path"]["inconclusiveRatio"] = round(sum(inconclusive) / len(inconclusive), 3)
+
+    print(json.dumps(results, indent=2))
+
+    if not args.keep:
+        await client.drop_database(args.db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trust-network traversal")
+    parser.add_argument("--mongo-url", default=os.environ["MONGO_URL"])
+    parser.add_argument("--db-name", default="clean_check_bench_trust")
+    parser.add_argument("--mock", action="store_true", help="Use mongomock-motor instead of a MongoDB server")
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--avg-degree", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--max-length", type=int, default=trust.TRUST_MAX_PATH_LENGTH)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for the Clean Check API.
+
+Boots `server.app` under uvicorn in-process against a scratch database, seeds
+synthetic profiles, references, payment confirmations and site visits, then
+drives each endpoint scenario with concurrent async clients. Results (RPS and
+latency percentiles per scenario) are written as JSON with stable keys so two
+runs can be diffed or compared with --compare.
+
+Usage (from the backend directory):
+    python benchmarks/loadtest.py --mongo-url mongodb://localhost:27017 --output bench.json
+    python benchmarks/loadtest.py --mock --profiles 2000 --duration 5     # mongomock-motor
+    python benchmarks/loadtest.py --url http://127.0.0.1:8001 --no-seed   # already-running server
+    python benchmarks/loadtest.py --compare before.json --output after.json
+
+The scratch database (--db-name, default clean_check_loadtest) is dropped
+before seeding. Running the client in the server's event loop adds overhead
+to both; use --url against a separately started server for absolute numbers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiohttp  # noqa: E402
+
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
+
+
+# ============================================================================
+# SEEDING
+# ============================================================================
+
+async def seed(db, profiles: int, avg_references: int, payments: int, visits: int, batch_size: int = 5000) -> dict:
+    """Populate a scratch database and return the IDs scenarios pick from"""
+    for collection in ("profiles", "references", "payment_confirmations", "site_visits"):
+        await db[collection].drop()
+
+    now = datetime.now(timezone.utc)
+    membership_ids = [str(uuid.uuid4()) for _ in range(profiles)]
+    confirmed_ids = []
+
+    for start in range(0, profiles, batch_size):
+        documents = []
+        for index, membership_id in enumerate(membership_ids[start:start + batch_size], start):
+            confirmed = random.random() < 0.7
+            created = (now - timedelta(minutes=index)).isoformat()
+            if confirmed:
+                confirmed_ids.append(membership_id)
+            documents.append({
+                "membershipId": membership_id,
+                "name": f"Load Member {index}",
+                "email": f"load{index}@example.com",
+                "photo": f"/api/images/{uuid.uuid4().hex * 2}.jpg",
+                "photoThumb": f"/api/images/{uuid.uuid4().hex * 2}.webp",
+                "userStatus": 3 if confirmed else 1,
+                "paymentStatus": "confirmed" if confirmed else "pending",
+                "assignedMemberId": str(100000 + index) if confirmed else "",
+                "documentUploaded": confirmed,
+                "qrCodeEnabled": confirmed,
+                "createdAt": created,
+                "updatedAt": created
+            })
+        await db.profiles.insert_many(documents, ordered=False)
+
+    edges = []
+    for membership_id in membership_ids:
+        for target in set(random.sample(membership_ids, min(profiles, random.randint(0, avg_references * 2)))):
+            if target != membership_id:
+                edges.append({"fromId": membership_id, "toId": target, "name": "Load Member", "addedOn": now.isoformat()})
+        if len(edges) >= batch_size:
+            await db.references.insert_many(edges, ordered=False)
+            edges = []
+    if edges:
+        await db.references.insert_many(edges, ordered=False)
+
+    for start in range(0, payments, batch_size):
+        await db.payment_confirmations.insert_many([
+            {
+                "membershipId": random.choice(membership_ids),
+                "name": "Load Member",
+                "email": "load@example.com",
+                "paymentMethod": random.choice(["PayPal", "Zelle", "Venmo"]),
+                "amount": random.choice(["$39", "$69"]),
+                "transactionId": uuid.uuid4().hex[:17].upper(),
+                "notes": "",
+                "status": random.choice(["pending", "approved", "approved", "rejected"]),
+                "submittedAt": (now - timedelta(minutes=index)).isoformat()
+            }
+            for index in range(start, min(payments, start + batch_size))
+        ], ordered=False)
+
+    for start in range(0, visits, batch_size):
+        await db.site_visits.insert_many([
+            {"timestamp": (now - timedelta(seconds=index)).isoformat(), "page": "/"}
+            for index in range(start, min(visits, start + batch_size))
+        ], ordered=False)
+
+    return {"membershipIds": membership_ids, "confirmedIds": confirmed_ids or membership_ids}
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+# Each scenario returns (method, path, params, json body) for one request.
+
+def build_scenarios(ids: dict) -> dict:
+    members = ids["membershipIds"]
+    confirmed = ids["confirmedIds"]
+    admin = {"password": ADMIN_PASSWORD}
+
+    return {
+        "get_profile": lambda: ("GET", f"/api/profiles/{random.choice(members)}", None, None),
+        "profile_status": lambda: ("GET", f"/api/profile/status/{random.choice(members)}", None, None),
+        "members_search": lambda: ("GET", "/api/members/search", {"search": f"Member {random.randint(1, 99)}"}, None),
+        "sponsors": lambda: ("GET", "/api/sponsors", None, None),
+        "qr_token": lambda: ("GET", f"/api/qr/token/{random.choice(confirmed)}", None, None),
+        "trust_neighborhood": lambda: ("GET", f"/api/trust/{random.choice(members)}/neighborhood", {"depth": 2}, None),
+        "referenced_by": lambda: ("GET", f"/api/profiles/{random.choice(members)}/referenced-by", None, None),
+        "admin_stats": lambda: ("GET", "/api/admin/stats", admin, None),
+        "admin_profiles": lambda: ("GET", "/api/admin/profiles", admin, None),
+        "admin_pending_payments": lambda: ("GET", "/api/admin/payments/pending", admin, None),
+        "track_visit": lambda: ("POST", "/api/track-visit", None, {"page": "/"}),
+        "add_reference": lambda: (
+            "POST",
+            f"/api/profiles/{random.choice(members)}/references",
+            None,
+            {"membershipId": random.choice(members)}
+        )
+    }
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2) if ordered else None  # noqa: E731
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0,
+        "meanMs": round(statistics.fmean(ordered), 2) if ordered else None,
+        "p50Ms": pick(0.50),
+        "p90Ms": pick(0.90),
+        "p99Ms": pick(0.99),
+        "maxMs": round(ordered[-1], 2) if ordered else None
+    }
+
+
+async def run_scenario(session, base_url: str, make_request, concurrency: int, duration: float) -> dict:
+    """Closed-loop load: `concurrency` workers issue requests back to back for `duration` seconds"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, path, params, body = make_request()
+            start = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, params=params, json=body) as response:
+                    await response.read()
+                    # 4xx from random data (e.g. duplicate references) is still a served request
+                    if response.status >= 500:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(previous: dict, current: dict):
+    """Print per-scenario RPS and p99 deltas against an earlier run"""
+    print(f"{'scenario':<26}{'rps':>22}{'p99 ms':>24}")
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            print(f"{name:<26}{result['rps']:>22}{str(result['p99Ms']):>24}  (new)")
+            continue
+        rps_delta = (result["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0
+        print(
+            f"{name:<26}{before['rps']:>8} -> {result['rps']:<8}{rps_delta:+5.0f}%"
+            f"{str(before['p99Ms']):>10} -> {str(result['p99Ms']):<10}"
+        )
+
+
+async def run(args):
+    os.environ.setdefault("MONGO_URL", args.mongo_url)
+    os.environ["DB_NAME"] = args.db_name
+    import core
+    import server
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        # No replica set in the mock, so secondary reads share the same store
+        core.use_database(AsyncMongoMockClient()[args.db_name])
+
+    random.seed(args.seed)
+    ids = {"membershipIds": [], "confirmedIds": []}
+    if not args.no_seed:
+        seed_start = time.perf_counter()
+        ids = await seed(core.db, args.profiles, args.avg_references, args.payments, args.visits)
+        print(f"Seeded {args.profiles} profiles in {time.perf_counter() - seed_start:.1f}s", file=sys.stderr)
+    else:
+        profiles = await core.db.profiles.find({}, {"_id": 0, "membershipId": 1, "paymentStatus": 1}).to_list(args.profiles)
+        ids["membershipIds"] = [profile["membershipId"] for profile in profiles]
+        ids["confirmedIds"] = [p["membershipId"] for p in profiles if p.get("paymentStatus") == "confirmed"] or ids["membershipIds"]
+
+    uvicorn_server = None
+    serve_task = None
+    base_url = args.url
+    if not base_url:
+        import uvicorn
+        port = free_port()
+        uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+        serve_task = asyncio.create_task(uvicorn_server.serve())
+        while not uvicorn_server.started:
+            await asyncio.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+    scenarios = build_scenarios(ids)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+
+    results = {}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name in selected:
+            print(f"Running {name} ...", file=sys.stderr)
+            results[name] = await run_scenario(session, base_url, scenarios[name], args.concurrency, args.duration)
+
+    if uvicorn_server:
+        uvicorn_server.should_exit = True
+        await serve_task
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "backend": "mongomock" if args.mock else ("external" if args.url else "mongodb"),
+            "profiles": args.profiles,
+            "payments": args.payments,
+            "visits": args.visits,
+            "concurrency": args.concurrency,
+            "durationSeconds": args.duration
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Clean Check API")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="clean_check_loadtest")
+    parser.add_argument("--mock", action="store_true", help="Use mongomock-motor instead of a MongoDB server")
+    parser.add_argument("--url", default="", help="Drive an already-running server instead of booting one")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in --db-name")
+    parser.add_argument("--profiles", type=int, default=10000)
+    parser.add_argument("--avg-references", type=int, default=3)
+    parser.add_argument("--payments", type=int, default=5000)
+    parser.add_argument("--visits", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--scenarios", default="", help="Comma-separated subset of scenarios to run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", default="", help="Earlier JSON report to print deltas against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    body = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(body + "\n")
+    else:
+        print(body)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
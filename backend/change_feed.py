@@ -0,0 +1,207 @@
+"""
+Shared change-stream consumers.
+
+A ChangeFeed holds one Mongo change stream per worker and fans its changes
+out to any number of in-process subscribers (SSE connections, long-polls),
+so a hundred open admin tabs or thousands of waiting members cost one stream
+and one executor thread rather than one each. Feeds built with a `key`
+function route each change only to the subscribers waiting on its key.
+
+Every change carries its resume token. The feed keeps the most recent ones in
+a replay buffer; a client that reconnects with the last token it saw (SSE's
+Last-Event-ID) gets the changes it missed from the buffer, or, when its token
+is older than the buffer, a RESYNC marker telling it to reload a snapshot.
+All workers watch the same stream, so tokens are valid whichever worker the
+reconnect lands on.
+
+The stream is opened when the first subscriber arrives and resumes from its
+own last token after a dropped connection. Change streams need a replica set;
+on a standalone mongod subscribe() raises ChangeFeedUnavailable and callers
+keep polling.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber whose position can't be recovered: it should reload
+RESYNC = "resync"
+
+# History lost / invalid resume token: the stream must restart from now
+NON_RESUMABLE_CODES = {260, 280, 286}
+
+RETRY_SECONDS = 1.0
+
+# After a failed open, subscribers are turned away this long before retrying
+UNAVAILABLE_RETRY_SECONDS = 60.0
+
+_feeds = []
+
+
+class ChangeFeedUnavailable(Exception):
+    """The change stream could not be opened (e.g. not a replica set)"""
+
+
+class Subscription:
+    def __init__(self, queue_size: int, key=None):
+        self.key = key
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A client too slow to drain its queue starts over from a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class ChangeFeed:
+    """
+    One change stream on `db` (or on one of its collections), delivered to
+    every subscriber, or with `key` only to the subscribers for key(change)
+    """
+
+    def __init__(self, name: str, pipeline: list, collection: str = None, full_document: str = None,
+                 key=None, replay_size: int = 500, queue_size: int = 1000):
+        self.name = name
+        self.pipeline = pipeline
+        self.collection = collection
+        self.full_document = full_document
+        self.key = key
+        self.replay_size = replay_size
+        self.queue_size = queue_size
+        self._db = None
+        self._task = None
+        self._opened = None
+        self._unavailable_until = 0.0
+        self._resume_token = None
+        self._start_token_id = None
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = {}
+        _feeds.append(self)
+
+    @staticmethod
+    def token_id(change: dict) -> str:
+        """The change's resume token as an opaque string (the SSE event id)"""
+        return change["_id"]["_data"]
+
+    async def subscribe(self, db, last_event_id: str = None, key=None) -> Subscription:
+        """
+        Register a subscriber, for every change or only those for `key`. With
+        `last_event_id`, the changes after it are queued first (or RESYNC if
+        they are no longer in the replay buffer).
+        """
+        await self._ensure_running(db, last_event_id)
+
+        subscription = Subscription(self.queue_size, key)
+        if last_event_id:
+            token_ids = [token_id for token_id, _ in self._replay]
+            if last_event_id in token_ids:
+                missed = list(self._replay)[token_ids.index(last_event_id) + 1:]
+            elif last_event_id == self._start_token_id:
+                # The stream itself resumed from this token, so it's all missed
+                missed = list(self._replay)
+            else:
+                missed = None
+            if missed is None:
+                subscription.deliver(RESYNC)
+            else:
+                for _, change in missed:
+                    if key is None or self.key(change) == key:
+                        subscription.deliver(change)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.key, set())
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            self._subscribers.pop(subscription.key, None)
+
+    async def _ensure_running(self, db, resume_from: str = None):
+        if self._task is None or self._task.done():
+            if time.monotonic() < self._unavailable_until:
+                raise ChangeFeedUnavailable(f"Change feed {self.name} could not be opened recently")
+            self._db = db
+            self._opened = asyncio.get_running_loop().create_future()
+            # Starting at a reconnecting client's token replays its gap from Mongo
+            if resume_from and self._resume_token is None:
+                self._resume_token = {"_data": resume_from}
+                self._start_token_id = resume_from
+            self._task = asyncio.create_task(self._run())
+        # shield: a cancelled subscriber must not cancel the shared future
+        await asyncio.shield(self._opened)
+
+    def _broadcast(self, item):
+        if item == RESYNC:
+            targets = [subscription for subscriptions in self._subscribers.values() for subscription in subscriptions]
+        else:
+            targets = list(self._subscribers.get(None, ()))
+            if self.key is not None:
+                targets += self._subscribers.get(self.key(item), ())
+        for subscription in targets:
+            subscription.deliver(item)
+
+    async def _run(self):
+        while True:
+            try:
+                target = self._db[self.collection] if self.collection else self._db
+                async with target.watch(
+                    self.pipeline,
+                    full_document=self.full_document,
+                    resume_after=self._resume_token
+                ) as stream:
+                    if not self._opened.done():
+                        self._opened.set_result(True)
+                        logger.info(f"Change feed {self.name} opened")
+                    async for change in stream:
+                        self._resume_token = change["_id"]
+                        self._replay.append((self.token_id(change), change))
+                        self._broadcast(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if not self._opened.done():
+                    if self._start_token_id and e.code in NON_RESUMABLE_CODES:
+                        # The client's token has aged out of the oplog; start from now
+                        self._resume_token = None
+                        self._start_token_id = None
+                        continue
+                    self._unavailable_until = time.monotonic() + UNAVAILABLE_RETRY_SECONDS
+                    self._opened.set_exception(ChangeFeedUnavailable(str(e)))
+                    return
+                if e.code in NON_RESUMABLE_CODES:
+                    logger.warning(f"Change feed {self.name} lost its position, restarting: {e}")
+                    self._resume_token = None
+                    self._start_token_id = None
+                    self._replay.clear()
+                    self._broadcast(RESYNC)
+                else:
+                    logger.warning(f"Change feed {self.name} interrupted, resuming: {e}")
+            except Exception as e:
+                if not self._opened.done():
+                    self._unavailable_until = time.monotonic() + UNAVAILABLE_RETRY_SECONDS
+                    self._opened.set_exception(ChangeFeedUnavailable(str(e)))
+                    return
+                logger.warning(f"Change feed {self.name} interrupted, resuming: {e}")
+            await asyncio.sleep(RETRY_SECONDS)
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def stop_feeds():
+    for feed in _feeds:
+        await feed.stop()
@@ -0,0 +1,275 @@
+"""
+Cross-worker coordination bus.
+
+Each uvicorn worker keeps in-process state (the sponsor logo cache, the admin
+SMS roster). When one worker changes the underlying data it applies the change
+locally and publishes an event; every other worker, on this node or another,
+receives it and updates or drops its copy.
+
+Backends, selected with COORDINATION_BACKEND:
+
+    capped        (default) tailable cursor on a capped collection; works on a
+                  standalone mongod
+    changestream  change stream on a TTL'd collection; needs a replica set,
+                  and resumes from the last token after a dropped connection
+    memory        in-process only, for tests and single-worker runs; buses
+                  created with the same InMemoryHub see each other's events
+
+Delivery is at-most-once and best effort: handlers must be idempotent and
+cheap, and anything that can't miss an update should also expire its cache.
+ExpiringCache does that: it reloads after COORDINATION_CACHE_TTL_SECONDS, so a
+missed event leaves a worker stale for at most that long.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Topics
+SPONSOR_LOGO_UPDATED = "sponsors.logo_updated"  # {"slot": int, "logoUrl": str | None}
+ADMIN_ROSTER_CHANGED = "admins.roster_changed"  # {}
+
+COORDINATION_COLLECTION = os.environ.get("COORDINATION_COLLECTION", "coordination_events")
+COORDINATION_CAPPED_BYTES = int(os.environ.get("COORDINATION_CAPPED_BYTES", str(16 * 1024 * 1024)))
+COORDINATION_EVENT_TTL_SECONDS = int(os.environ.get("COORDINATION_EVENT_TTL_SECONDS", "3600"))
+COORDINATION_RETRY_SECONDS = 1.0
+COORDINATION_CACHE_TTL_SECONDS = float(os.environ.get("COORDINATION_CACHE_TTL_SECONDS", "300"))  # Backstop for missed events
+
+
+class CoordinationBus(ABC):
+    """Topic subscriptions and dispatch shared by every backend"""
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self._handlers = {}
+
+    def subscribe(self, topic: str, handler):
+        """Register `async def handler(payload: dict)` for events from other workers"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def dispatch(self, event: dict):
+        if event.get("origin") == self.node_id:
+            return
+        for handler in self._handlers.get(event.get("topic"), []):
+            try:
+                await handler(event.get("payload") or {})
+            except Exception as e:
+                logger.error(f"Coordination handler for {event.get('topic')} failed: {e}")
+
+    def build_event(self, topic: str, payload: dict) -> dict:
+        return {
+            "topic": topic,
+            "payload": payload,
+            "origin": self.node_id,
+            "createdAt": datetime.now(timezone.utc)
+        }
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: dict = None):
+        """Tell the other workers; the caller has already applied the change locally"""
+
+    async def start(self, db):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class ExpiringCache:
+    """
+    In-process cache for state kept coherent by bus events. The value is
+    reloaded with `loader()` once it is older than `ttl_seconds`, whatever
+    the bus delivered.
+    """
+
+    def __init__(self, loader, ttl_seconds: float = COORDINATION_CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._value = None
+        self._loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    async def get(self):
+        if self._value is None or self.clock() - self._loaded_at >= self.ttl_seconds:
+            value = await self.loader()
+            self._value, self._loaded_at = value, self.clock()
+        return self._value
+
+    def replace(self, value):
+        """Write-through update; the TTL still counts from the last full load"""
+        if self._value is None:
+            self._loaded_at = self.clock()
+        self._value = value
+
+    def invalidate(self):
+        self._value = None
+
+
+# ============================================================================
+# IN-MEMORY
+# ============================================================================
+
+class InMemoryHub:
+    def __init__(self):
+        self.buses = []
+
+
+class InMemoryBus(CoordinationBus):
+    def __init__(self, hub: InMemoryHub = None):
+        super().__init__()
+        self.hub = hub or InMemoryHub()
+        self.hub.buses.append(self)
+
+    async def publish(self, topic: str, payload: dict = None):
+        event = self.build_event(topic, payload or {})
+        for bus in list(self.hub.buses):
+            await bus.dispatch(event)
+
+
+# ============================================================================
+# MONGODB
+# ============================================================================
+
+class MongoBus(CoordinationBus):
+    """Publishes by inserting into the events collection; a task tails it"""
+
+    def __init__(self):
+        super().__init__()
+        self._db = None
+        self._task = None
+        self._prepared = False
+        self._prepare_lock = asyncio.Lock()
+
+    async def _ensure_prepared(self):
+        # Publishing into a missing collection would create it uncapped
+        async with self._prepare_lock:
+            if not self._prepared:
+                await self.prepare()
+                self._prepared = True
+
+    async def publish(self, topic: str, payload: dict = None):
+        try:
+            await self._ensure_prepared()
+            await self._db[COORDINATION_COLLECTION].insert_one(self.build_event(topic, payload or {}))
+        except PyMongoError as e:
+            # Peers fall back to their cache expiry; the local change already happened
+            logger.error(f"Could not publish coordination event {topic}: {e}")
+
+    async def start(self, db):
+        # Startup doesn't wait on Mongo; the consumer prepares and retries on its own
+        self._db = db
+        self._task = asyncio.create_task(self._consume_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def prepare(self):
+        pass
+
+    @abstractmethod
+    async def consume(self):
+        """Dispatch events until the stream ends or fails"""
+
+    async def _consume_forever(self):
+        while True:
+            try:
+                await self._ensure_prepared()
+                await self.consume()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Coordination stream interrupted, retrying: {e}")
+            await asyncio.sleep(COORDINATION_RETRY_SECONDS)
+
+
+class CappedCollectionBus(MongoBus):
+    """
+    Tails a capped collection with an awaitable cursor. Events are read after
+    the newest one present at start-up, so a restarted worker doesn't replay
+    history. When the cursor dies it is reopened after the last _id seen;
+    ObjectIds are only ordered per second across processes, so a reopen can
+    skip a same-second event from another worker (see the delivery note above).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._last_id = None
+
+    async def prepare(self):
+        collection = self._db[COORDINATION_COLLECTION]
+        try:
+            await self._db.create_collection(COORDINATION_COLLECTION, capped=True, size=COORDINATION_CAPPED_BYTES)
+        except CollectionInvalid:
+            pass  # Another worker created it first
+        # A tailable cursor on an empty capped collection closes immediately
+        newest = await collection.find_one({}, sort=[("$natural", -1)])
+        if newest is None:
+            result = await collection.insert_one(self.build_event("bus.started", {}))
+            self._last_id = result.inserted_id
+        else:
+            self._last_id = newest["_id"]
+
+    async def consume(self):
+        cursor = self._db[COORDINATION_COLLECTION].find(
+            {"_id": {"$gt": self._last_id}},
+            cursor_type=CursorType.TAILABLE_AWAIT
+        )
+        while cursor.alive:
+            async for event in cursor:
+                self._last_id = event["_id"]
+                await self.dispatch(event)
+
+
+class ChangeStreamBus(MongoBus):
+    """Watches inserts on the events collection, which a TTL index keeps small"""
+
+    def __init__(self):
+        super().__init__()
+        self._resume_token = None
+
+    async def prepare(self):
+        await self._db[COORDINATION_COLLECTION].create_index(
+            [("createdAt", 1)],
+            expireAfterSeconds=COORDINATION_EVENT_TTL_SECONDS
+        )
+
+    async def consume(self):
+        async with self._db[COORDINATION_COLLECTION].watch(
+            [{"$match": {"operationType": "insert"}}],
+            resume_after=self._resume_token
+        ) as stream:
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                await self.dispatch(change["fullDocument"])
+
+
+BACKENDS = {
+    "capped": CappedCollectionBus,
+    "changestream": ChangeStreamBus,
+    "memory": InMemoryBus,
+}
+
+
+def create_bus(backend: str = None) -> CoordinationBus:
+    backend = (backend or os.environ.get("COORDINATION_BACKEND", "capped")).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"COORDINATION_BACKEND must be one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
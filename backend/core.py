@@ -0,0 +1,146 @@
+"""
+Shared configuration, database handles and admin checks for the API routers.
+
+Everything here is cheap to import: routers pull in their own heavy
+dependencies (PayPal, Twilio, Pillow, email templates) so a process that
+mounts only some routers never loads the rest.
+"""
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import logging
+from pathlib import Path
+import random
+import secrets
+
+from coordination import create_bus
+from metrics import MongoMetricsListener, MongoPoolMetricsListener
+from mongo_settings import client_options, max_pool_size, secondary_read_preference
+from query_monitor import QueryMonitor
+from tracing import MongoTracingListener, configure_tracing
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+
+# Slow-query log: commands over the threshold are logged and explained
+query_monitor = QueryMonitor(
+    slow_ms=float(os.environ.get('MONGO_SLOW_QUERY_MS', '100')),
+    explain_interval=float(os.environ.get('MONGO_EXPLAIN_INTERVAL_SECONDS', '600'))
+)
+
+# Request/Mongo/outbound spans; exporter chosen by OTEL_TRACES_EXPORTER
+configure_tracing()
+
+# Pool size, timeouts and wire compression come from MONGO_* settings
+mongo_options = client_options()
+
+_mongo_client = None
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Build the Motor client on first use, so importing the app starts no driver threads"""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(
+            mongo_url,
+            event_listeners=[
+                MongoMetricsListener(),
+                MongoPoolMetricsListener(max_pool_size(mongo_options)),
+                MongoTracingListener(),
+                query_monitor
+            ],
+            **mongo_options
+        )
+    return _mongo_client
+
+class LazyDatabase:
+    """Stands in for a Motor database until the first collection is touched"""
+    
+    def __init__(self, name: str, read_preference=None):
+        self._name = name
+        self._read_preference = read_preference
+        self._database = None
+    
+    def _resolve(self):
+        if self._database is None:
+            self._database = get_mongo_client().get_database(self._name, read_preference=self._read_preference)
+        return self._database
+    
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+    
+    def __getitem__(self, name):
+        return self._resolve()[name]
+    
+    def bind(self, database):
+        """Point this handle at another database (a test double or a scratch database)"""
+        self._database = database
+
+db = LazyDatabase(os.environ['DB_NAME'])
+
+# Search, stats and listings tolerate replication lag, so they read from secondaries
+secondary_db = LazyDatabase(os.environ['DB_NAME'], read_preference=secondary_read_preference())
+
+# Carries cache updates between workers; backend chosen by COORDINATION_BACKEND
+bus = create_bus()
+
+def use_database(database):
+    """Route every router's reads and writes to `database`, e.g. a mongomock-motor db"""
+    db.bind(database)
+    secondary_db.bind(database)
+
+# Admin password (legacy - for backward compatibility)
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
+
+# Password hashing (passlib is only imported once an admin logs in or is created)
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+# Admin verification
+def verify_admin(password: str):
+    if not secrets.compare_digest(password, ADMIN_PASSWORD):
+        raise HTTPException(status_code=401, detail="Invalid admin password")
+    return True
+
+# Generate unique 6-digit Member ID
+async def generate_unique_member_id():
+    """Generate a unique 6-digit Member ID"""
+    while True:
+        member_id = str(random.randint(100000, 999999))
+        existing = await db.profiles.find_one({"assignedMemberId": member_id})
+        if not existing:
+            return member_id
+
+# Normalized email: the unique key for member profiles (see profile_dedupe.py)
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+# Verify admin user credentials
+async def verify_admin_user(username: str, password: str):
+    """Verify admin user login credentials"""
+    admin = await db.admin_users.find_one({"username": username})
+    if not admin:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    if not get_pwd_context().verify(password, admin['password']):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    return admin
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
@@ -0,0 +1,291 @@
+"""
+Bulk member import from CSV or JSONL.
+
+Rows are read in chunks of IMPORT_CHUNK_SIZE. Each chunk is validated with
+ProfileCreate in one TypeAdapter pass, de-duplicated by normalized email
+(within the file and against existing profiles), and written with a single
+unordered insert_many. The inserted members' welcome emails are handed to
+the caller as one batch per chunk.
+
+Progress lives in `member_imports`, one document per import:
+
+    {"importId", "source", "sha256", "status": running|completed|failed|interrupted,
+     "checkpoint": input rows consumed, "inserted", "duplicates", "invalid",
+     "errors": first IMPORT_MAX_ERRORS problems, "startedAt", "updatedAt"}
+
+The checkpoint only moves after a chunk is written, so an import that dies
+can be resumed with the same file and importId: the consumed rows are
+skipped and a chunk that was half-written is caught by the email check.
+An import still running elsewhere can't be resumed until it has saved no
+progress for IMPORT_STALE_MINUTES.
+
+Used by POST /api/admin/imports and scripts/import_members.py.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
+
+from core import normalize_email
+from models import ProfileCreate
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '500'))
+IMPORT_MAX_ERRORS = 100  # Per-row problems kept on the import document
+IMPORT_PHOTO_CONCURRENCY = int(os.environ.get('IMPORT_PHOTO_CONCURRENCY', '8'))  # Photos rendered in the threadpool at once
+IMPORT_STALE_MINUTES = int(os.environ.get('IMPORT_STALE_MINUTES', '15'))  # A "running" import this quiet lost its worker
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+profile_batch = TypeAdapter(List[ProfileCreate])
+
+
+class ImportConflict(Exception):
+    """The importId can't be resumed: it belongs to a different file, or is still running"""
+
+
+def read_rows(binary_file, format: str):
+    """Yield (row number, dict) from a CSV (with header) or JSONL file; bad JSON lines yield an error string"""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key.strip(): value for key, value in row.items() if key}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def validate_chunk(chunk: list):
+    """
+    Validate a chunk of (row number, row) in one pass.
+    Returns ([(row number, ProfileCreate)], [(row number, error)]).
+    """
+    errors = {number: row for number, row in chunk if isinstance(row, str)}
+    candidates = [(number, row) for number, row in chunk if number not in errors]
+    try:
+        profiles = profile_batch.validate_python([row for _, row in candidates])
+        return list(zip([number for number, _ in candidates], profiles)), list(errors.items())
+    except ValidationError as e:
+        for error in e.errors():
+            number = candidates[error["loc"][0]][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(number, f"{field}: {error['msg']}")
+    # Only the rows without errors go through the second pass
+    valid = [(number, row) for number, row in candidates if number not in errors]
+    profiles = profile_batch.validate_python([row for _, row in valid])
+    return list(zip([number for number, _ in valid], profiles)), sorted(errors.items())
+
+
+async def start_import(db, source: str, sha256: str, import_id: str = None) -> dict:
+    """Create an import document, or load one to resume (same file only)"""
+    if import_id:
+        job = await db.member_imports.find_one({"importId": import_id}, {"_id": 0})
+        if not job:
+            raise HTTPException(status_code=404, detail="Import not found")
+        if job["sha256"] != sha256:
+            raise ImportConflict(f"Import {import_id} was started with a different file")
+        if job["status"] == "completed":
+            return job
+        
+        # Claimed atomically, so only one worker resumes it. A "running" job
+        # is only taken over once it has stopped saving progress (its worker died)
+        now = datetime.now(timezone.utc)
+        stale = (now - timedelta(minutes=IMPORT_STALE_MINUTES)).isoformat()
+        claim = {"status": "running", "updatedAt": now.isoformat()}
+        job = await db.member_imports.find_one_and_update(
+            {"importId": import_id, "$or": [
+                {"status": {"$in": ["failed", "interrupted"]}},
+                {"status": "running", "updatedAt": {"$lt": stale}}
+            ]},
+            {"$set": claim},
+            projection={"_id": 0}
+        )
+        if job is None:
+            raise ImportConflict(f"Import {import_id} is still running")
+        return {**job, **claim}
+
+    now = datetime.now(timezone.utc).isoformat()
+    job = {
+        "importId": str(uuid.uuid4()),
+        "source": source,
+        "sha256": sha256,
+        "status": "running",
+        "checkpoint": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "invalid": 0,
+        "errors": [],
+        "startedAt": now,
+        "updatedAt": now
+    }
+    await db.member_imports.insert_one(dict(job))
+    return job
+
+
+async def process_photos(profiles: list) -> list:
+    """Photo fields per profile (or the HTTPException it failed with), rendered concurrently"""
+    from routers.images import process_profile_photo
+
+    semaphore = asyncio.Semaphore(IMPORT_PHOTO_CONCURRENCY)
+
+    async def process(profile):
+        async with semaphore:
+            try:
+                return await process_profile_photo(profile.photo) or {"photo": "", "photoThumb": ""}
+            except HTTPException as e:
+                return e
+
+    return await asyncio.gather(*(process(profile) for profile in profiles))
+
+
+async def write_chunk(db, job: dict, valid: list, seen_emails: set) -> list:
+    """Insert the chunk's new members; returns [(email, name, membershipId)] actually inserted"""
+    fresh = []
+    for number, profile in valid:
+        email = normalize_email(profile.email)
+        if email in seen_emails:
+            job["duplicates"] += 1
+            continue
+        seen_emails.add(email)
+        fresh.append((number, profile))
+
+    # One lookup for the whole chunk, on the unique emailNormalized index, plus
+    # an exact match for profiles from before emailNormalized (as at sign-up)
+    existing = await db.profiles.find(
+        {"$or": [
+            {"emailNormalized": {"$in": [normalize_email(profile.email) for _, profile in fresh]}},
+            {"email": {"$in": [profile.email for _, profile in fresh]}, "emailNormalized": {"$exists": False}}
+        ]},
+        {"_id": 0, "email": 1, "emailNormalized": 1}
+    ).to_list(None)
+    existing_emails = {profile.get("emailNormalized") or normalize_email(profile["email"]) for profile in existing}
+
+    to_insert = []
+    for number, profile in fresh:
+        if normalize_email(profile.email) in existing_emails:
+            job["duplicates"] += 1
+            continue
+        to_insert.append((number, profile))
+
+    documents = []
+    now = datetime.now(timezone.utc).isoformat()
+    photos = await process_photos([profile for _, profile in to_insert])
+    for (number, profile), photo_fields in zip(to_insert, photos):
+        if isinstance(photo_fields, HTTPException):
+            record_error(job, number, f"photo: {photo_fields.detail}")
+            continue
+        documents.append({
+            "membershipId": str(uuid.uuid4()),
+            "name": profile.name,
+            "email": profile.email,
+            "emailNormalized": normalize_email(profile.email),
+            **photo_fields,
+            "paymentStatus": "pending",
+            "documentUploaded": False,
+            "qrCodeEnabled": False,
+            "importId": job["importId"],
+            "createdAt": now,
+            "updatedAt": now
+        })
+
+    if not documents:
+        return []
+
+    failed = set()
+    try:
+        await db.profiles.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed.add(error["index"])
+            if error.get("code") == 11000:
+                # Signed up (or imported) concurrently; the unique index kept one
+                job["duplicates"] += 1
+            else:
+                record_error(job, None, f"{documents[error['index']]['email']}: {error.get('errmsg', 'write failed')}")
+
+    inserted = [document for index, document in enumerate(documents) if index not in failed]
+    job["inserted"] += len(inserted)
+    return [(document["email"], document["name"], document["membershipId"]) for document in inserted]
+
+
+def record_error(job: dict, row_number, message: str):
+    job["invalid"] += 1
+    if len(job["errors"]) < IMPORT_MAX_ERRORS:
+        job["errors"].append({"row": row_number, "error": message})
+
+
+async def save_progress(db, job: dict):
+    job["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    await db.member_imports.update_one(
+        {"importId": job["importId"]},
+        {"$set": {key: value for key, value in job.items() if key != "importId"}}
+    )
+
+
+async def import_members(db, binary_file, format: str, job: dict, on_inserted, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Run (or resume) an import, yielding the job document after every chunk.
+    `on_inserted(recipients)` is awaited with each chunk's welcome-email batch.
+    """
+    if job["status"] == "completed":
+        yield job
+        return
+
+    job["status"] = "running"
+    skip = job["checkpoint"]
+    seen_emails = set()
+    chunk = []
+    consumed = 0
+
+    async def flush():
+        valid, errors = validate_chunk(chunk)
+        for number, message in errors:
+            record_error(job, number, message)
+        recipients = await write_chunk(db, job, valid, seen_emails)
+        if recipients:
+            await on_inserted(recipients)
+        job["checkpoint"] = consumed
+        await save_progress(db, job)
+
+    try:
+        for number, row in read_rows(binary_file, format):
+            consumed = number
+            if number <= skip:
+                # Already written; remember the emails so later rows still dedupe
+                if isinstance(row, dict) and isinstance(row.get("email"), str):
+                    seen_emails.add(normalize_email(row["email"]))
+                continue
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                await flush()
+                chunk = []
+                yield job
+        if chunk:
+            await flush()
+        job["status"] = "completed"
+        job["completedAt"] = datetime.now(timezone.utc).isoformat()
+        await save_progress(db, job)
+        yield job
+    except BaseException as e:
+        # Includes the CancelledError/GeneratorExit of a client that hung up
+        # mid-stream, so the job never stays "running"; resume with its importId
+        job["status"] = "failed" if isinstance(e, Exception) else "interrupted"
+        job["failure"] = str(e) or type(e).__name__
+        # Shielded: a cancelled request would otherwise cancel this write too
+        await asyncio.shield(save_progress(db, job))
+        raise
@@ -0,0 +1,313 @@
+"""
+Prometheus metrics for the Clean Check API.
+
+- HTTP: request counts and latency per route template (MetricsMiddleware)
+- MongoDB: command latency per collection and command (MongoMetricsListener)
+- MongoDB pool: open/checked-out connections, checkout waits (MongoPoolMetricsListener)
+- Background tasks: queue depth, durations and outcomes (enqueue_task)
+- Outbound calls: PayPal/Twilio latency and outcomes (track_outbound)
+
+Background tasks and outbound calls also get trace spans (see tracing.py).
+
+Exposed by `metrics_response()` at GET /metrics. With several uvicorn workers
+set PROMETHEUS_MULTIPROC_DIR so the endpoint aggregates all of them.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from fastapi import BackgroundTasks
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+from tracing import background_span, capture_context, outbound_span
+
+
+# Buckets tuned for API/DB latencies: 1ms .. 10s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status code",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum"
+)
+
+MONGO_COMMANDS = Counter(
+    "mongo_commands_total",
+    "MongoDB commands by collection, command and outcome",
+    ["collection", "command", "outcome"]
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS
+)
+
+MONGO_POOL_MAX_SIZE = Gauge(
+    "mongo_pool_max_size",
+    "Configured maxPoolSize per server",
+    multiprocess_mode="max"
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections",
+    "Open connections in the pool per server",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out",
+    "Connections currently in use per server",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["address"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Failed connection checkouts by reason (e.g. timeout when the pool is exhausted)",
+    ["address", "reason"]
+)
+
+BACKGROUND_QUEUE_DEPTH = Gauge(
+    "background_tasks_queued",
+    "Background tasks scheduled but not yet started",
+    ["task"],
+    multiprocess_mode="livesum"
+)
+BACKGROUND_TASKS = Counter(
+    "background_tasks_total",
+    "Completed background tasks by outcome",
+    ["task", "outcome"]
+)
+BACKGROUND_LATENCY = Histogram(
+    "background_task_duration_seconds",
+    "Background task run time",
+    ["task"],
+    buckets=LATENCY_BUCKETS
+)
+
+OUTBOUND_REQUESTS = Counter(
+    "outbound_requests_total",
+    "Calls to external services by outcome",
+    ["service", "operation", "outcome"]
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds",
+    "Latency of calls to external services",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, labelled by route template to keep cardinality bounded"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.labels(scope["method"], route_path, str(status["code"])).inc()
+            HTTP_LATENCY.labels(scope["method"], route_path).observe(elapsed)
+
+
+# ============================================================================
+# MONGODB
+# ============================================================================
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Times every command; the collection is only known from the started event"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # getMore's command value is the cursor id; its collection has its own field
+        field = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(field)
+        with self._lock:
+            self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, outcome):
+        with self._lock:
+            collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMANDS.labels(collection, event.command_name, outcome).inc()
+        MONGO_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+
+class MongoPoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Pool utilisation is mongo_pool_checked_out / mongo_pool_max_size. Checkout
+    start and finish fire on the same thread, so the wait is timed per thread.
+    """
+
+    def __init__(self, max_pool_size: int):
+        MONGO_POOL_MAX_SIZE.set(max_pool_size)
+        self._checkout_started = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+
+    def _observe_wait(self, event):
+        started = getattr(self._checkout_started, "value", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(self._address(event)).observe(time.perf_counter() - started)
+            self._checkout_started.value = None
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait(event)
+        MONGO_POOL_CHECKOUT_FAILURES.labels(self._address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        self._observe_wait(event)
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).dec()
+
+
+# ============================================================================
+# BACKGROUND TASKS
+# ============================================================================
+
+async def run_instrumented_task(func, trace_context: dict, *args, **kwargs):
+    name = func.__name__
+    BACKGROUND_QUEUE_DEPTH.labels(name).dec()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with background_span(name, trace_context) as span:
+            result = await func(*args, **kwargs)
+            # Notification helpers report failure by returning False
+            outcome = "failure" if result is False else "success"
+            span.set_attribute("task.outcome", outcome)
+        return result
+    finally:
+        BACKGROUND_LATENCY.labels(name).observe(time.perf_counter() - start)
+        BACKGROUND_TASKS.labels(name, outcome).inc()
+
+
+def enqueue_task(background_tasks: BackgroundTasks, func, *args, **kwargs):
+    """Schedule an async background task with metrics, traced as part of the current request"""
+    BACKGROUND_QUEUE_DEPTH.labels(func.__name__).inc()
+    background_tasks.add_task(run_instrumented_task, func, capture_context(), *args, **kwargs)
+
+
+# ============================================================================
+# OUTBOUND CALLS
+# ============================================================================
+
+@contextmanager
+def track_outbound(service: str, operation: str):
+    """
+    Time a call to an external service. Set call["outcome"] inside the block
+    to record a non-exception failure (e.g. an HTTP error status).
+    """
+    call = {"outcome": "success"}
+    start = time.perf_counter()
+    with outbound_span(service, operation) as span:
+        try:
+            yield call
+        except Exception:
+            call["outcome"] = "error"
+            raise
+        finally:
+            OUTBOUND_LATENCY.labels(service, operation).observe(time.perf_counter() - start)
+            OUTBOUND_REQUESTS.labels(service, operation, call["outcome"]).inc()
+            span.set_attribute("outcome", call["outcome"])
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def metrics_response() -> Response:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
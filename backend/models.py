@@ -0,0 +1,96 @@
+from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from typing import List, Optional
+from datetime import datetime, timezone
+
+# Define Models
+class Reference(BaseModel):
+    membershipId: str
+    name: str
+    addedOn: str
+
+class DonorProfile(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    membershipId: str
+    name: str
+    photo: Optional[str] = ""  # Display image URL
+    photoThumb: Optional[str] = ""  # Thumbnail image URL
+    references: List[Reference] = []
+    # Status system: 0=Guest, 1=Pending_Payment, 2=In_Review, 3=Approved
+    userStatus: int = 1  # Default: Pending_Payment (registered but not paid)
+    paymentStatus: str = "pending"  # pending, in_review, confirmed, rejected
+    assignedMemberId: Optional[str] = ""  # Admin-assigned Member ID (e.g., MEM-001)
+    documentUploaded: bool = False
+    documentData: Optional[str] = ""
+    qrCodeEnabled: bool = False
+    createdAt: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updatedAt: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class ProfileCreate(BaseModel):
+    name: str
+    email: EmailStr
+    password: Optional[str] = None
+    photo: Optional[str] = ""
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class PasswordReset(BaseModel):
+    email: EmailStr
+
+class ReferenceAdd(BaseModel):
+    membershipId: str
+    name: Optional[str] = ""  # Ignored - the referenced member's current name is stored
+
+class ReferenceBatchAdd(BaseModel):
+    membershipIds: List[str] = Field(..., max_length=100)
+
+class ReferenceBatchRemove(BaseModel):
+    membershipIds: List[str] = Field(..., max_length=100)
+
+class AdminLogin(BaseModel):
+    password: str
+
+class AdminUserCreate(BaseModel):
+    name: str
+    email: EmailStr
+    phone: str
+    username: str
+    password: str
+
+class AdminUserLogin(BaseModel):
+    username: str
+    password: str
+
+class AdminUserUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    password: Optional[str] = None
+
+class SiteVisit(BaseModel):
+    timestamp: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    page: str = "/"
+
+class PaymentConfirmation(BaseModel):
+    membershipId: str
+    paymentMethod: Optional[str] = "Not specified"
+    amount: Optional[str] = "Not specified"
+    transactionId: Optional[str] = ""
+    notes: Optional[str] = ""
+
+class DocumentUpload(BaseModel):
+    membershipId: str
+    documentData: str  # base64 encoded
+    documentType: str
+
+class DocumentUploadStart(BaseModel):
+    membershipId: str
+    documentType: str
+    size: int  # Total document size in bytes
+    contentType: Optional[str] = "application/octet-stream"
+
+class AdminApproval(BaseModel):
+    membershipId: str
+    assignedMemberId: str  # Admin-assigned Member ID (e.g., MEM-001)
@@ -0,0 +1,75 @@
+"""
+MongoDB client settings, read from the environment.
+
+Pool and timeouts (unset options keep the driver defaults):
+
+    MONGO_MAX_POOL_SIZE                  connections per server (driver default 100)
+    MONGO_MIN_POOL_SIZE                  connections kept warm (default 0)
+    MONGO_MAX_IDLE_TIME_MS               close connections idle for longer than this
+    MONGO_WAIT_QUEUE_TIMEOUT_MS          fail a request that waits this long for a free connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS    give up finding a usable server (driver default 30000)
+    MONGO_CONNECT_TIMEOUT_MS             TCP connect timeout
+    MONGO_SOCKET_TIMEOUT_MS              per-operation socket timeout
+    MONGO_COMPRESSORS                    wire compression, e.g. "zstd,snappy,zlib"
+                                         (zstd needs `zstandard`, snappy needs `python-snappy`)
+
+Reads for search, stats and listings go through `secondary_read_preference()`:
+
+    MONGO_SECONDARY_READ_PREFERENCE      default secondaryPreferred
+    MONGO_MAX_STALENESS_SECONDS          skip secondaries lagging more than this (>= 90)
+"""
+
+import os
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Environment variable -> MongoClient keyword
+INT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+}
+
+
+def client_options() -> dict:
+    """Keyword arguments for AsyncIOMotorClient"""
+    options = {}
+    for env_name, option in INT_OPTIONS.items():
+        value = os.environ.get(env_name, "").strip()
+        if value:
+            options[option] = int(value)
+
+    compressors = os.environ.get("MONGO_COMPRESSORS", "").strip()
+    if compressors:
+        options["compressors"] = compressors
+
+    return options
+
+
+def max_pool_size(options: dict) -> int:
+    return options.get("maxPoolSize", 100)
+
+
+def secondary_read_preference():
+    """Read preference for endpoints that tolerate slightly stale data"""
+    mode = os.environ.get("MONGO_SECONDARY_READ_PREFERENCE", "secondaryPreferred").strip()
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"MONGO_SECONDARY_READ_PREFERENCE must be one of: {', '.join(READ_PREFERENCES)}")
+
+    if mode == "primary":
+        return Primary()
+
+    max_staleness = os.environ.get("MONGO_MAX_STALENESS_SECONDS", "").strip()
+    return READ_PREFERENCES[mode](max_staleness=int(max_staleness) if max_staleness else -1)
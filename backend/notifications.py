@@ -0,0 +1,455 @@
+"""
+Member/admin emails and admin SMS (Twilio), sent from background tasks.
+"""
+
+from datetime import datetime, timezone
+import asyncio
+import os
+
+from coordination import ADMIN_ROSTER_CHANGED, ExpiringCache
+from core import bus, db, logger
+from metrics import track_outbound
+from retention import expires_at
+
+# Frontend URL for email links
+FRONTEND_URL = os.environ.get('FRONTEND_URL', os.environ.get('REACT_APP_BACKEND_URL', ''))
+
+# Welcome emails sent at once for a bulk import batch
+WELCOME_BATCH_CONCURRENCY = int(os.environ.get('WELCOME_BATCH_CONCURRENCY', '10'))
+
+# Twilio Configuration for SMS
+TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
+TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
+TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', '')
+
+_twilio_client = None
+
+def get_twilio_client():
+    """Twilio's SDK is slow to import, so it's loaded with the first SMS"""
+    global _twilio_client
+    if _twilio_client is None:
+        from twilio.rest import Client
+        _twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _twilio_client
+
+async def load_admin_roster() -> list:
+    return await db.admin_users.find({}, {"_id": 0, "phone": 1, "name": 1}).to_list(100)
+
+# Admin names and phones for SMS alerts, dropped whenever an admin user changes
+# and reloaded after the TTL in case a peer's change event was missed
+_admin_roster = ExpiringCache(load_admin_roster)
+
+async def get_admin_roster() -> list:
+    return await _admin_roster.get()
+
+def invalidate_admin_roster():
+    _admin_roster.invalidate()
+
+async def on_admin_roster_changed(payload: dict):
+    invalidate_admin_roster()
+
+bus.subscribe(ADMIN_ROSTER_CHANGED, on_admin_roster_changed)
+
+# Send SMS notification to admins
+async def send_sms_to_admins(message: str):
+    """Send SMS notification to all admin users"""
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
+        logger.warning("Twilio credentials not configured. SMS not sent.")
+        return False
+    
+    try:
+        client = get_twilio_client()
+        
+        # Get all admin users
+        admins = await get_admin_roster()
+        
+        if not admins:
+            logger.warning("No admin users found to send SMS")
+            return False
+        
+        for admin in admins:
+            try:
+                with track_outbound("twilio", "send_sms"):
+                    client.messages.create(
+                        body=message,
+                        from_=TWILIO_PHONE_NUMBER,
+                        to=admin.get('phone')
+                    )
+                logger.info(f"SMS sent to admin: {admin.get('name')}")
+            except Exception as e:
+                logger.error(f"Failed to send SMS to {admin.get('name')}: {e}")
+        
+        return True
+    except Exception as e:
+        logger.error(f"SMS sending failed: {e}")
+        return False
+
+# Email sending function
+async def send_welcome_email(email: str, name: str, membership_id: str):
+    """Send welcome email to new member"""
+    try:
+        # Create email content
+        subject = "Welcome to Clean Check - Membership Confirmed!"
+        
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #dc2626; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0;">🛡️ Clean Check</h1>
+            </div>
+            
+            <div style="background-color: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-radius: 0 0 10px 10px;">
+                <h2 style="color: #dc2626;">Welcome, {name}!</h2>
+                
+                <p>Thank you for creating your Clean Check profile. Your membership has been successfully created.</p>
+                
+                <div style="background-color: #fef3f2; padding: 15px; border-left: 4px solid #dc2626; margin: 20px 0;">
+                    <p style="margin: 0;"><strong>Your Membership ID:</strong></p>
+                    <p style="font-family: monospace; font-size: 14px; color: #dc2626; margin: 5px 0;">{membership_id}</p>
+                </div>
+                
+                <h3 style="color: #374151;">Next Steps:</h3>
+                <ol style="color: #6b7280; line-height: 1.8;">
+                    <li>Complete payment ($39 for single or $69 for couples)</li>
+                    <li>Submit payment confirmation in your profile</li>
+                    <li>Wait for admin confirmation (usually within 5 minutes)</li>
+                    <li>Upload your health document</li>
+                    <li>Generate and share your QR code</li>
+                </ol>
+                
+                <div style="background-color: #dbeafe; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <p style="margin: 0; color: #1e40af;"><strong>💳 Payment Information:</strong></p>
+                    <p style="margin: 5px 0; color: #1e40af;">PayPal: paypal.me/pitbossent</p>
+                    <p style="margin: 5px 0; color: #1e40af;">Zelle: pitbossent@gmail.com</p>
+                </div>
+                
+                <p style="color: #6b7280;">If you have any questions, please don't hesitate to reach out.</p>
+                
+                <p style="color: #9ca3af; font-size: 12px; margin-top: 30px;">
+                    This is an automated message from Clean Check. Please do not reply to this email.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Log email (in production, this would actually send via SMTP)
+        logger.info(f"Welcome email would be sent to: {email}")
+        logger.info(f"Subject: {subject}")
+        logger.info(f"Recipient: {name} ({membership_id})")
+        
+        # Store email log in database
+        await db.email_logs.insert_one({
+            "to": email,
+            "subject": subject,
+            "name": name,
+            "membershipId": membership_id,
+            "sentAt": datetime.now(timezone.utc).isoformat(),
+            "type": "welcome",
+            "expiresAt": expires_at("email_logs")
+        })
+        
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send welcome email: {e}")
+        return False
+
+async def send_welcome_emails(recipients: list):
+    """Welcome a batch of imported members: recipients are (email, name, membershipId)"""
+    semaphore = asyncio.Semaphore(WELCOME_BATCH_CONCURRENCY)
+    
+    async def send(recipient):
+        async with semaphore:
+            await send_welcome_email(*recipient)
+    
+    await asyncio.gather(*(send(recipient) for recipient in recipients))
+    logger.info(f"Sent {len(recipients)} welcome emails")
+
+async def send_admin_payment_notification(name: str, email: str, membership_id: str, payment_method: str, amount: str, transaction_id: str, notes: str):
+    """Send payment notification to admin"""
+    try:
+        admin_email = "pitbossent@gmail.com"
+        subject = f"🔔 New Payment Confirmation - {name}"
+        
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f59e0b; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0;">🔔 Payment Confirmation Alert</h1>
+            </div>
+            
+            <div style="background-color: #fffbeb; padding: 30px; border: 1px solid #fde68a; border-radius: 0 0 10px 10px;">
+                <h2 style="color: #92400e;">New Payment Submitted</h2>
+                
+                <p style="color: #78350f;">A member has submitted a payment confirmation and is waiting for your review.</p>
+                
+                <div style="background-color: #ffffff; padding: 20px; border-left: 4px solid #f59e0b; margin: 20px 0;">
+                    <h3 style="color: #92400e; margin-top: 0;">Member Details:</h3>
+                    <p style="margin: 5px 0;"><strong>Name:</strong> {name}</p>
+                    <p style="margin: 5px 0;"><strong>Email:</strong> {email}</p>
+                    <p style="margin: 5px 0;"><strong>Membership ID:</strong> <code style="background: #fef3f2; padding: 2px 6px; border-radius: 3px;">{membership_id}</code></p>
+                </div>
+                
+                <div style="background-color: #ffffff; padding: 20px; border-left: 4px solid #10b981; margin: 20px 0;">
+                    <h3 style="color: #065f46; margin-top: 0;">Payment Information:</h3>
+                    <p style="margin: 5px 0;"><strong>Method:</strong> {payment_method}</p>
+                    <p style="margin: 5px 0;"><strong>Amount:</strong> {amount}</p>
+                    {f'<p style="margin: 5px 0;"><strong>Transaction ID:</strong> {transaction_id}</p>' if transaction_id else ''}
+                    {f'<p style="margin: 5px 0;"><strong>Notes:</strong> {notes}</p>' if notes else ''}
+                    <p style="margin: 5px 0; color: #6b7280;"><strong>Submitted:</strong> {datetime.now(timezone.utc).strftime('%B %d, %Y at %I:%M %p UTC')}</p>
+                </div>
+                
+                <div style="background-color: #dbeafe; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: center;">
+                    <p style="margin: 0; color: #1e40af;"><strong>⚡ Action Required</strong></p>
+                    <p style="margin: 10px 0; color: #1e40af;">Log in to the admin panel to confirm or reject this payment.</p>
+                    <a href="{FRONTEND_URL}/admin" 
+                       style="display: inline-block; background-color: #dc2626; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; font-weight: bold; margin-top: 10px;">
+                        Go to Admin Panel
+                    </a>
+                </div>
+                
+                <p style="color: #9ca3af; font-size: 12px; margin-top: 30px;">
+                    This is an automated notification from Clean Check Admin System.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Log email
+        logger.info(f"Admin payment notification would be sent to: {admin_email}")
+        logger.info(f"Subject: {subject}")
+        logger.info(f"Payment from: {name} ({membership_id}) - {amount} via {payment_method}")
+        
+        # Store email log in database
+        await db.email_logs.insert_one({
+            "to": admin_email,
+            "subject": subject,
+            "name": name,
+            "membershipId": membership_id,
+            "paymentMethod": payment_method,
+            "amount": amount,
+            "sentAt": datetime.now(timezone.utc).isoformat(),
+            "type": "admin_payment_notification",
+            "expiresAt": expires_at("email_logs")
+        })
+        
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send admin payment notification: {e}")
+        return False
+
+
+
+async def send_user_approval_notification(name: str, email: str, assigned_member_id: str):
+    """Send approval notification to user"""
+    try:
+        subject = f"✅ Payment Confirmed - Welcome to Clean Check!"
+        
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #10b981; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0;">🎉 You're Approved!</h1>
+            </div>
+            
+            <div style="background-color: #f0fdf4; padding: 30px; border: 1px solid #86efac; border-radius: 0 0 10px 10px;">
+                <h2 style="color: #065f46;">Welcome to Clean Check, {name}!</h2>
+                
+                <p style="color: #064e3b; font-size: 16px;">Great news! Your payment has been confirmed and your membership is now active.</p>
+                
+                <div style="background-color: #ffffff; padding: 25px; border-left: 4px solid #10b981; margin: 25px 0; text-align: center;">
+                    <p style="color: #6b7280; margin: 0; font-size: 14px;">Your Official Member ID</p>
+                    <h1 style="color: #dc2626; margin: 10px 0; font-size: 32px; font-weight: bold;">{assigned_member_id}</h1>
+                    <p style="color: #9ca3af; margin: 0; font-size: 12px;">Save this ID for your records</p>
+                </div>
+                
+                <div style="background-color: #dbeafe; padding: 20px; border-radius: 8px; margin: 25px 0;">
+                    <h3 style="color: #1e40af; margin-top: 0;">✨ Next Steps:</h3>
+                    <ol style="color: #1e40af; line-height: 1.8;">
+                        <li>Log in to your account</li>
+                        <li>Complete your donor profile with your photo</li>
+                        <li>Upload your health documents</li>
+                        <li>Generate your personalized QR code</li>
+                        <li>Start sharing safely!</li>
+                    </ol>
+                </div>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="{FRONTEND_URL}" 
+                       style="display: inline-block; background-color: #dc2626; color: white; padding: 15px 40px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px;">
+                        Complete Your Profile Now
+                    </a>
+                </div>
+                
+                <div style="background-color: #fff7ed; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <p style="margin: 0; color: #9a3412; font-size: 14px;">
+                        <strong>💡 Pro Tip:</strong> Complete your profile within the next 48 hours to get listed in our verified members directory!
+                    </p>
+                </div>
+                
+                <p style="color: #9ca3af; font-size: 12px; margin-top: 30px; border-top: 1px solid #e5e7eb; padding-top: 20px;">
+                    Questions? Contact support at pitbossent@gmail.com<br>
+                    This is an automated notification from Clean Check.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Log email
+        logger.info(f"User approval notification would be sent to: {email}")
+        logger.info(f"Subject: {subject}")
+        logger.info(f"Member {name} approved with ID: {assigned_member_id}")
+        
+        # Store email log in database
+        await db.email_logs.insert_one({
+            "to": email,
+            "subject": subject,
+            "name": name,
+            "assignedMemberId": assigned_member_id,
+            "sentAt": datetime.now(timezone.utc).isoformat(),
+            "type": "user_approval_notification",
+            "expiresAt": expires_at("email_logs")
+        })
+        
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send user approval notification: {str(e)}")
+        return False
+
+async def send_member_payment_confirmation(name: str, email: str, membership_id: str):
+    """Send payment confirmation email to member with link to upload documents"""
+    try:
+        subject = f"✅ Welcome to Clean Check - You're Now a Member!"
+        
+        # Generate direct link to Clean Check
+        clean_check_link = f"{FRONTEND_URL}?membershipId={membership_id}"
+        
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #10b981; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0;">🎉 Welcome to Clean Check!</h1>
+            </div>
+            
+            <div style="background-color: #f0fdf4; padding: 30px; border: 1px solid #86efac; border-radius: 0 0 10px 10px;">
+                <h2 style="color: #065f46;">Congratulations, {name}!</h2>
+                
+                <p style="color: #064e3b; font-size: 16px;">
+                    Your payment has been confirmed and you are now an <strong>active Clean Check member</strong>!
+                </p>
+                
+                <div style="background-color: #dbeafe; padding: 20px; border-radius: 8px; margin: 25px 0;">
+                    <h3 style="color: #1e40af; margin-top: 0;">🚀 Next Steps - Complete Your Profile:</h3>
+                    <ol style="color: #1e40af; line-height: 1.8; margin: 0;">
+                        <li>Click the button below to access your member dashboard</li>
+                        <li>Complete your donor profile with your photo</li>
+                        <li>Upload your health documents</li>
+                        <li>Generate your personalized QR code</li>
+                        <li>Start sharing safely!</li>
+                    </ol>
+                </div>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="{clean_check_link}" 
+                       style="display: inline-block; background-color: #dc2626; color: white; padding: 18px 45px; text-decoration: none; border-radius: 10px; font-weight: bold; font-size: 18px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                        📋 Complete Your Profile Now
+                    </a>
+                </div>
+                
+                <div style="background-color: #fff7ed; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <p style="margin: 0; color: #9a3412; font-size: 14px;">
+                        <strong>💡 Important:</strong> Complete your profile within 48 hours to get listed in our verified members directory!
+                    </p>
+                </div>
+                
+                <div style="background-color: white; padding: 20px; border: 2px solid #10b981; border-radius: 8px; margin: 20px 0;">
+                    <p style="margin: 0; color: #065f46; font-size: 14px;">
+                        <strong>Your Membership ID:</strong><br>
+                        <code style="background: #f3f4f6; padding: 8px 12px; border-radius: 4px; display: inline-block; margin-top: 8px; font-size: 16px; color: #dc2626;">{membership_id}</code><br>
+                        <span style="font-size: 12px; color: #6b7280;">Keep this ID for your records</span>
+                    </p>
+                </div>
+                
+                <p style="color: #9ca3af; font-size: 12px; margin-top: 30px; border-top: 1px solid #e5e7eb; padding-top: 20px;">
+                    Questions? Contact support at pitbossent@gmail.com<br>
+                    This is an automated confirmation from Clean Check.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        logger.info(f"Member payment confirmation sent to: {email}")
+        
+        # Store email log
+        await db.email_logs.insert_one({
+            "to": email,
+            "subject": subject,
+            "name": name,
+            "sentAt": datetime.now(timezone.utc).isoformat(),
+            "type": "member_payment_confirmation",
+            "expiresAt": expires_at("email_logs")
+        })
+        
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send member payment confirmation: {str(e)}")
+        return False
+
+async def send_auto_payment_notification(name: str, email: str, membership_id: str, amount: str, transaction_id: str):
+    """Send notification when payment is auto-verified"""
+    try:
+        subject = f"💰 Auto-Verified Payment - {name}"
+        
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #10b981; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0;">💰 Payment Auto-Verified!</h1>
+            </div>
+            
+            <div style="background-color: #f0fdf4; padding: 30px; border: 1px solid #86efac;">
+                <h2 style="color: #065f46;">Payment Automatically Detected</h2>
+                
+                <div style="background-color: white; padding: 20px; border-left: 4px solid #10b981; margin: 20px 0;">
+                    <p style="margin: 5px 0;"><strong>Member:</strong> {name}</p>
+                    <p style="margin: 5px 0;"><strong>Email:</strong> {email}</p>
+                    <p style="margin: 5px 0;"><strong>Membership ID:</strong> {membership_id}</p>
+                    <p style="margin: 5px 0;"><strong>Amount:</strong> ${amount}</p>
+                    <p style="margin: 5px 0;"><strong>Transaction ID:</strong> {transaction_id}</p>
+                </div>
+                
+                <div style="background-color: #dbeafe; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <p style="margin: 0; color: #1e40af; font-size: 14px;">
+                        <strong>✨ Next Step:</strong> Go to admin panel to assign Member ID and fully approve this user.
+                    </p>
+                </div>
+                
+                <p style="color: #6b7280; font-size: 12px; margin-top: 20px;">
+                    This payment was automatically detected via PayPal webhook integration.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        logger.info(f"Auto-payment notification logged for admin - {name}: ${amount}")
+        
+        # Store notification
+        await db.email_logs.insert_one({
+            "to": "pitbossent@gmail.com",
+            "subject": subject,
+            "name": name,
+            "amount": amount,
+            "transactionId": transaction_id,
+            "sentAt": datetime.now(timezone.utc).isoformat(),
+            "type": "auto_payment_notification",
+            "expiresAt": expires_at("email_logs")
+        })
+        
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send auto-payment notification: {str(e)}")
+        return False
@@ -0,0 +1,292 @@
+"""
+Merge duplicate member profiles (same email, ignoring case and spaces).
+
+Runs in batched passes so it can go while the API serves traffic:
+
+1. Backfill: profiles written before `emailNormalized` existed get it set,
+   DEDUPE_BATCH_SIZE rows per bulk write. Rows that would collide with an
+   existing emailNormalized are left for step 2.
+2. Merge: profiles are grouped by emailNormalized (one aggregation), plus,
+   for rows the backfill couldn't set, by normalize_email() computed here,
+   so the grouping key is always the Python normalization the unique index
+   is built from. Every group with more than one member is merged into a
+   survivor (an approved membership if there is one, else the oldest). For
+   each merged-away profile its payment confirmations and document uploads
+   move to the survivor (which adopts the newest document if it has none),
+   its references are re-pointed both ways (dropping self-references and
+   edges the survivor already has), its QR tokens are revoked, and the
+   profile is deleted after a copy (without inline photos or documents)
+   is kept in `profile_merges` for audit.
+3. The unique emailNormalized index is (re)created, which only succeeds
+   once no duplicates are left.
+
+Run with scripts/dedupe_profiles.py or POST /api/admin/profiles/dedupe.
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core import normalize_email
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_BATCH_SIZE = int(os.environ.get('DEDUPE_BATCH_SIZE', '500'))
+
+EMAIL_INDEX = IndexModel(
+    [("emailNormalized", 1)],
+    unique=True,
+    partialFilterExpression={"emailNormalized": {"$type": "string"}}
+)
+
+# Inline blobs stay out of the audit copy, which holds every merged profile
+# in one document (16MB BSON limit); URL fields and upload IDs are kept
+AUDIT_EXCLUDED_FIELDS = ("documentData",)
+AUDIT_IMAGE_FIELDS = ("photo", "photoThumb")
+
+# What a survivor without a document takes over from a merged profile
+DOCUMENT_FIELDS = (
+    "documentUploaded", "documentData", "documentUploadId", "documentType",
+    "documentContentType", "documentSize", "documentSha256"
+)
+
+# Fields carried per group member, enough to choose the survivor
+MEMBER_FIELDS = ("membershipId", "name", "assignedMemberId", "paymentStatus", "photoThumb", "createdAt")
+
+
+async def backfill_normalized_emails(db) -> int:
+    """Set emailNormalized on older profiles, one bulk write per batch"""
+    updated = 0
+    last_id = None
+    while True:
+        query = {"emailNormalized": {"$exists": False}, "email": {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        rows = await db.profiles.find(query, {"_id": 1, "email": 1}).sort("_id", 1).limit(DEDUPE_BATCH_SIZE).to_list(DEDUPE_BATCH_SIZE)
+        if not rows:
+            return updated
+        last_id = rows[-1]["_id"]
+
+        try:
+            result = await db.profiles.bulk_write([
+                UpdateOne({"_id": row["_id"]}, {"$set": {"emailNormalized": normalize_email(row["email"])}})
+                for row in rows
+            ], ordered=False)
+            updated += result.modified_count
+        except BulkWriteError as e:
+            # Duplicates of an already-normalized profile; the merge handles them
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            updated += e.details.get("nModified", 0)
+
+
+def choose_survivor(members: list) -> dict:
+    """Keep an approved membership (it has a member ID and QR) over a pending one, then the oldest"""
+    return min(members, key=lambda member: (
+        not member.get("assignedMemberId"),
+        member.get("paymentStatus") != "confirmed",
+        member.get("createdAt") or ""
+    ))
+
+
+async def move_references(db, survivor: dict, loser_ids: list):
+    """Re-point the losers' reference edges at the survivor; edges between the group are dropped"""
+    survivor_id = survivor["membershipId"]
+    group = set(loser_ids) | {survivor_id}
+
+    edges = await db.references.find(
+        {"$or": [{"fromId": {"$in": loser_ids}}, {"toId": {"$in": loser_ids}}]},
+        {"_id": 0}
+    ).to_list(None)
+
+    operations = []
+    for edge in edges:
+        if edge["fromId"] in group and edge["toId"] in group:
+            continue
+        if edge["fromId"] in loser_ids:
+            key = {"fromId": survivor_id, "toId": edge["toId"]}
+            name = edge.get("name", "")
+        else:
+            key = {"fromId": edge["fromId"], "toId": survivor_id}
+            name = survivor.get("name", "")
+        # The unique (fromId, toId) index: an edge the survivor already has wins
+        operations.append(UpdateOne(key, {"$setOnInsert": {"name": name, "addedOn": edge.get("addedOn", "")}}, upsert=True))
+
+    if operations:
+        try:
+            await db.references.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    await db.references.delete_many({"$or": [{"fromId": {"$in": loser_ids}}, {"toId": {"$in": loser_ids}}]})
+
+
+def audit_copy(doc: dict) -> dict:
+    """A merged profile for profile_merges, minus documents and inline base64 photos"""
+    from routers.images import IMAGE_URL_PREFIX
+
+    copy = {key: value for key, value in doc.items() if key not in AUDIT_EXCLUDED_FIELDS}
+    omitted = [key for key in AUDIT_EXCLUDED_FIELDS if doc.get(key)]
+    for field in AUDIT_IMAGE_FIELDS:
+        value = copy.get(field)
+        if isinstance(value, str) and value and not value.startswith(IMAGE_URL_PREFIX):
+            del copy[field]
+            omitted.append(field)
+    if omitted:
+        copy["omittedFields"] = omitted
+    return copy
+
+
+async def merge_group(db, email: str, members: list) -> dict:
+    from routers.verification import revoke_qr_token
+
+    survivor = choose_survivor(members)
+    losers = [member for member in members if member["membershipId"] != survivor["membershipId"]]
+    loser_ids = [member["membershipId"] for member in losers]
+
+    loser_docs = await db.profiles.find({"membershipId": {"$in": loser_ids}}).to_list(None)
+    await db.profile_merges.insert_one({
+        "emailNormalized": email,
+        "survivorId": survivor["membershipId"],
+        "mergedIds": loser_ids,
+        "mergedProfiles": [audit_copy(doc) for doc in loser_docs],
+        "mergedAt": datetime.now(timezone.utc).isoformat()
+    })
+
+    # Pipeline update, so each confirmation records the membership it came from
+    await db.payment_confirmations.update_many(
+        {"membershipId": {"$in": loser_ids}},
+        [{"$set": {"mergedFromId": "$membershipId", "membershipId": survivor["membershipId"]}}]
+    )
+    await move_references(db, survivor, loser_ids)
+    
+    # Uploaded documents follow the membership, like its payments
+    await db.document_uploads.update_many(
+        {"membershipId": {"$in": loser_ids}},
+        {"$set": {"membershipId": survivor["membershipId"]}}
+    )
+
+    # A survivor without a photo takes the newest one from its duplicates
+    survivor_update = {"emailNormalized": email, "updatedAt": datetime.now(timezone.utc).isoformat()}
+    if not survivor.get("photoThumb"):
+        with_photo = [doc for doc in loser_docs if doc.get("photoThumb")]
+        if with_photo:
+            newest = max(with_photo, key=lambda doc: doc.get("createdAt") or "")
+            survivor_update.update({"photo": newest.get("photo", ""), "photoThumb": newest["photoThumb"]})
+    
+    # Likewise a survivor without a document takes the newest one
+    survivor_doc = await db.profiles.find_one({"membershipId": survivor["membershipId"]}, {"_id": 0, "documentUploaded": 1})
+    if not (survivor_doc or {}).get("documentUploaded"):
+        with_document = [doc for doc in loser_docs if doc.get("documentUploaded")]
+        if with_document:
+            newest = max(with_document, key=lambda doc: doc.get("updatedAt") or doc.get("createdAt") or "")
+            survivor_update.update({field: newest[field] for field in DOCUMENT_FIELDS if field in newest})
+
+    # Free the email before the survivor claims it under the unique index
+    await db.profiles.delete_many({"membershipId": {"$in": loser_ids}})
+    await db.profiles.update_one(
+        {"membershipId": survivor["membershipId"]},
+        {"$set": survivor_update, "$addToSet": {"mergedFrom": {"$each": loser_ids}}}
+    )
+
+    for loser_id in loser_ids:
+        await revoke_qr_token(loser_id, "merged")
+
+    return {"email": email, "survivorId": survivor["membershipId"], "mergedIds": loser_ids}
+
+
+def duplicate_groups_pipeline() -> list:
+    return [
+        {"$match": {"emailNormalized": {"$type": "string"}}},
+        {"$group": {
+            "_id": "$emailNormalized",
+            "members": {"$push": {field: f"${field}" for field in MEMBER_FIELDS}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+
+
+async def find_duplicate_groups(db, limit: int = None) -> list:
+    """
+    Groups of profiles sharing a normalized email. Rows without
+    emailNormalized (not backfilled yet, or left out because they collide
+    with a normalized row) are keyed with normalize_email() in Python;
+    Mongo's $toLower/$trim disagree with it on non-ASCII addresses.
+    """
+    pipeline = duplicate_groups_pipeline()
+    if limit:
+        pipeline.append({"$limit": limit})
+    groups = {
+        group["_id"]: group["members"]
+        for group in await db.profiles.aggregate(pipeline, allowDiskUse=True).to_list(limit)
+    }
+    
+    projection = {"_id": 0, "email": 1, **{field: 1 for field in MEMBER_FIELDS}}
+    unnormalized = {}
+    async for row in db.profiles.find({"emailNormalized": {"$exists": False}, "email": {"$type": "string"}}, projection):
+        unnormalized.setdefault(normalize_email(row.pop("email")), []).append(row)
+    
+    # Their normalized counterparts, DEDUPE_BATCH_SIZE keys per query
+    keys = [key for key in unnormalized if key not in groups]
+    for start in range(0, len(keys), DEDUPE_BATCH_SIZE):
+        async for row in db.profiles.find({"emailNormalized": {"$in": keys[start:start + DEDUPE_BATCH_SIZE]}}, {"_id": 0, "emailNormalized": 1, **projection}):
+            row.pop("email", None)
+            unnormalized[row.pop("emailNormalized")].append(row)
+    
+    for key, members in unnormalized.items():
+        groups[key] = groups.get(key, []) + members
+    
+    duplicates = [{"_id": key, "members": members, "count": len(members)} for key, members in groups.items() if len(members) > 1]
+    return duplicates[:limit] if limit else duplicates
+
+
+async def run_dedupe(db, dry_run: bool = False) -> dict:
+    """Backfill, merge every duplicate group in batches, then ensure the unique index"""
+    if dry_run:
+        groups = await find_duplicate_groups(db)
+        return {
+            "duplicateGroups": len(groups),
+            "profilesToMerge": sum(group["count"] - 1 for group in groups),
+            "sample": [{"email": group["_id"], "count": group["count"]} for group in groups[:20]]
+        }
+
+    backfilled = await backfill_normalized_emails(db)
+
+    merged_groups = 0
+    merged_profiles = 0
+    previous_emails = None
+    while True:
+        # Re-aggregating each pass means merged groups drop out of the results
+        groups = await find_duplicate_groups(db, DEDUPE_BATCH_SIZE)
+        if not groups:
+            break
+        emails = {group["_id"] for group in groups}
+        if emails == previous_emails:
+            logger.warning(f"Dedupe: {len(groups)} groups could not be merged, stopping")
+            break
+        previous_emails = emails
+        for group in groups:
+            result = await merge_group(db, group["_id"], group["members"])
+            merged_groups += 1
+            merged_profiles += len(result["mergedIds"])
+        logger.info(f"Dedupe: merged {merged_groups} groups ({merged_profiles} profiles) so far")
+
+    index_created = True
+    try:
+        await db.profiles.create_indexes([EMAIL_INDEX])
+    except Exception as e:
+        logger.warning(f"Unique emailNormalized index not created: {e}")
+        index_created = False
+
+    summary = {
+        "backfilled": backfilled,
+        "mergedGroups": merged_groups,
+        "mergedProfiles": merged_profiles,
+        "indexCreated": index_created
+    }
+    logger.info(f"Dedupe finished: {summary}")
+    return summary
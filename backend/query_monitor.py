@@ -0,0 +1,230 @@
+"""
+MongoDB slow-query monitor.
+
+`QueryMonitor` is a pymongo CommandListener. It times every command and reduces
+its filter to a redacted *shape* (field names and operators kept, values
+replaced by their type), so queries that differ only in values group together
+and no member data is logged. Commands slower than the threshold are written
+to the "slow_queries" logger as JSON and aggregated per shape for the admin
+endpoint.
+
+The first time a slow shape is seen (and again every `explain_interval`
+seconds) the offending command is re-run through `explain` by a background
+task, and the winning plan's stages are recorded, which flags COLLSCANs.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+slow_query_logger = logging.getLogger("slow_queries")
+
+# Where each command keeps the filter that decides which index is used
+FILTER_LOCATIONS = {
+    "find": lambda command: command.get("filter", {}),
+    "count": lambda command: command.get("query", {}),
+    "distinct": lambda command: command.get("query", {}),
+    "findAndModify": lambda command: command.get("query", {}),
+    "aggregate": lambda command: command.get("pipeline", []),
+    "update": lambda command: [update.get("q", {}) for update in command.get("updates", [])[:1]],
+    "delete": lambda command: [delete.get("q", {}) for delete in command.get("deletes", [])[:1]],
+}
+
+# Driver/session fields that explain rejects
+SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "$clusterTime", "$db", "$readPreference"}
+
+
+def redact_shape(value):
+    """Replace every value with its type name, keeping keys and operators"""
+    if isinstance(value, dict):
+        return {key: redact_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = redact_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return type(value).__name__
+
+
+def plan_stages(plan: dict) -> list:
+    """Flatten a winning plan into its stage names, outermost first"""
+    stages = []
+    while plan:
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        children = plan.get("inputStages") or []
+        if len(children) > 1:
+            for child in children:
+                stages.extend(plan_stages(child))
+            break
+        plan = plan.get("inputStage") or (children[0] if children else plan.get("queryPlan"))
+    return stages
+
+
+class QueryMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = 100, explain_interval: float = 600, recent_size: int = 200):
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self._pending = {}
+        self._shapes = {}
+        self._recent = deque(maxlen=recent_size)
+        self._lock = threading.Lock()
+        self._db = None
+        self._loop = None
+        self._explain_queue = None
+        self._explain_task = None
+
+    # ------------------------------------------------------------------
+    # CommandListener callbacks (run on the driver's threads)
+    # ------------------------------------------------------------------
+
+    def started(self, event):
+        if event.command_name not in FILTER_LOCATIONS:
+            return
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._pending[event.request_id] = (
+                collection if isinstance(collection, str) else "",
+                event.command,
+            )
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.slow_ms:
+            return
+
+        collection, command = pending
+        shape = redact_shape(FILTER_LOCATIONS[event.command_name](command))
+        shape_key = f"{collection}.{event.command_name} {json.dumps(shape, sort_keys=True)}"
+        now = time.time()
+
+        with self._lock:
+            stats = self._shapes.get(shape_key)
+            if stats is None:
+                stats = self._shapes[shape_key] = {
+                    "collection": collection,
+                    "command": event.command_name,
+                    "shape": shape,
+                    "count": 0,
+                    "totalMs": 0.0,
+                    "maxMs": 0.0,
+                    "lastSeenAt": "",
+                    "plan": None,
+                    "collscan": None,
+                    "explainedAt": 0.0,
+                }
+            stats["count"] += 1
+            stats["totalMs"] += duration_ms
+            stats["maxMs"] = max(stats["maxMs"], duration_ms)
+            stats["lastSeenAt"] = datetime.now(timezone.utc).isoformat()
+            needs_explain = now - stats["explainedAt"] >= self.explain_interval
+            if needs_explain:
+                stats["explainedAt"] = now
+
+        entry = {
+            "collection": collection,
+            "command": event.command_name,
+            "shape": shape,
+            "durationMs": round(duration_ms, 2),
+            "outcome": outcome,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._recent.append(entry)
+        slow_query_logger.warning(json.dumps({"event": "slow_query", **entry}))
+
+        if needs_explain and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue_explain, shape_key, command)
+
+    # ------------------------------------------------------------------
+    # Explain sampling (runs on the event loop)
+    # ------------------------------------------------------------------
+
+    def start(self, db):
+        """Begin explaining slow shapes; call from the running event loop"""
+        self._db = db
+        self._loop = asyncio.get_running_loop()
+        self._explain_queue = asyncio.Queue(maxsize=100)
+        self._explain_task = asyncio.create_task(self._explain_worker())
+
+    async def stop(self):
+        self._loop = None
+        if self._explain_task:
+            self._explain_task.cancel()
+            try:
+                await self._explain_task
+            except asyncio.CancelledError:
+                pass
+
+    def _queue_explain(self, shape_key: str, command: dict):
+        # Explains are best-effort samples; drop them rather than back up
+        if not self._explain_queue.full():
+            self._explain_queue.put_nowait((shape_key, command))
+
+    async def _explain_worker(self):
+        while True:
+            shape_key, command = await self._explain_queue.get()
+            explainable = {key: value for key, value in command.items() if key not in SESSION_FIELDS}
+            try:
+                result = await self._db.command({"explain": explainable, "verbosity": "queryPlanner"})
+            except Exception as e:
+                slow_query_logger.info(json.dumps({"event": "explain_failed", "shape": shape_key, "error": str(e)}))
+                continue
+
+            planner = result.get("queryPlanner") or result.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+            stages = plan_stages(planner.get("winningPlan", {}))
+            collscan = "COLLSCAN" in stages
+
+            with self._lock:
+                stats = self._shapes.get(shape_key)
+                if stats is not None:
+                    stats["plan"] = stages
+                    stats["collscan"] = collscan
+
+            if collscan:
+                slow_query_logger.warning(json.dumps({"event": "collscan", "shape": shape_key, "plan": stages}))
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def report(self, limit: int = 50) -> dict:
+        with self._lock:
+            shapes = [
+                {key: value for key, value in stats.items() if key != "explainedAt"}
+                for stats in self._shapes.values()
+            ]
+        shapes.sort(key=lambda stats: stats["totalMs"], reverse=True)
+        for stats in shapes:
+            stats["totalMs"] = round(stats["totalMs"], 2)
+            stats["maxMs"] = round(stats["maxMs"], 2)
+            stats["avgMs"] = round(stats["totalMs"] / stats["count"], 2)
+
+        return {
+            "thresholdMs": self.slow_ms,
+            "shapes": shapes[:limit],
+            "recent": list(self._recent)[-limit:][::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+        self._recent.clear()
@@ -0,0 +1,286 @@
+"""
+Retention for the log-style collections: email_logs, venmo_notifications and
+unmatched_payments.
+
+Each collection has a policy with up to two stages, keyed on the row's ISO
+timestamp field:
+
+    compact   after `compact_after_days`, bulky fields (raw webhook payloads)
+              are archived with the whole row, then unset; the slim row stays
+              in Mongo for admin review
+    expire    after `expire_after_days` the row is archived and deleted
+
+Archives are newline-delimited canonical Extended JSON, zstd-compressed, one
+file per (collection, stage, day of the rows' timestamps, run), under
+
+    <collection>/<YYYY>/<MM>/<DD>/<stage>-<run id>-<seq>.ndjson.zst
+
+on local disk or in S3 (RETENTION_ARCHIVE_URL: a path or s3://bucket/prefix).
+A file is written before its rows are touched, so a failed run at worst
+archives a row twice; restore upserts by _id, so that is harmless.
+
+Every row is also written with a BSON Date `expiresAt` (the expire window
+plus RETENTION_TTL_GRACE_DAYS) and a TTL index on it, so the collections stay
+bounded even if the archive job stops running. Rows written before this have
+no expiresAt and are only removed by the job.
+
+Run the job and restores with scripts/retention_archive.py.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson import json_util
+from pymongo import IndexModel
+from starlette.concurrency import run_in_threadpool
+
+ROOT_DIR = Path(__file__).parent
+
+RETENTION_ARCHIVE_URL = os.environ.get('RETENTION_ARCHIVE_URL', str(ROOT_DIR / 'archives'))
+RETENTION_TTL_GRACE_DAYS = int(os.environ.get('RETENTION_TTL_GRACE_DAYS', '30'))  # TTL backstop after the expire window
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))  # Rows per archive file (at most)
+RETENTION_ZSTD_LEVEL = int(os.environ.get('RETENTION_ZSTD_LEVEL', '10'))
+
+ARCHIVE_SUFFIX = ".ndjson.zst"
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS  # Keeps ObjectIds and dates exact
+
+
+class RetentionPolicy:
+    def __init__(self, collection: str, time_field: str, expire_after_days: int,
+                 compact_fields: tuple = (), compact_after_days: int = None):
+        self.collection = collection
+        self.time_field = time_field
+        self.expire_after_days = expire_after_days
+        self.compact_fields = compact_fields
+        self.compact_after_days = compact_after_days
+
+    def expires_at(self, now: datetime = None) -> datetime:
+        return (now or datetime.now(timezone.utc)) + timedelta(days=self.expire_after_days + RETENTION_TTL_GRACE_DAYS)
+
+
+def _days(collection: str, stage: str, default: int) -> int:
+    return int(os.environ.get(f'RETENTION_{collection.upper()}_{stage}_DAYS', str(default)))
+
+
+# Windows are overridable per collection, e.g. RETENTION_EMAIL_LOGS_EXPIRE_DAYS
+POLICIES = {
+    "email_logs": RetentionPolicy(
+        "email_logs", "sentAt",
+        expire_after_days=_days("email_logs", "EXPIRE", 90)
+    ),
+    "venmo_notifications": RetentionPolicy(
+        "venmo_notifications", "received_at",
+        expire_after_days=_days("venmo_notifications", "EXPIRE", 365),
+        compact_fields=("data",),
+        compact_after_days=_days("venmo_notifications", "COMPACT", 30)
+    ),
+    "unmatched_payments": RetentionPolicy(
+        "unmatched_payments", "received_at",
+        expire_after_days=_days("unmatched_payments", "EXPIRE", 365),
+        compact_fields=("webhook_data",),
+        compact_after_days=_days("unmatched_payments", "COMPACT", 30)
+    ),
+}
+
+# Merged into server.INDEXES
+TTL_INDEXES = {
+    collection: [IndexModel([("expiresAt", 1)], expireAfterSeconds=0)]
+    for collection in POLICIES
+}
+
+
+def expires_at(collection: str) -> datetime:
+    """The TTL backstop for a row written now"""
+    return POLICIES[collection].expires_at()
+
+
+# ============================================================================
+# ARCHIVE STORES
+# ============================================================================
+
+class LocalArchiveStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def write(self, key: str, data: bytes):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated archive
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        partial.replace(path)
+
+    def read(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def list(self, prefix: str) -> list:
+        directory = self.root / prefix
+        if not directory.is_dir():
+            return []
+        return sorted(
+            str(path.relative_to(self.root))
+            for path in directory.rglob(f"*{ARCHIVE_SUFFIX}")
+        )
+
+
+class S3ArchiveStore:
+    def __init__(self, bucket: str, prefix: str = ""):
+        import boto3  # Only needed when archiving to S3
+        self.client = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def write(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType="application/zstd")
+
+    def read(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+
+    def list(self, prefix: str) -> list:
+        keys = []
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            keys += [item["Key"][strip:] for item in page.get("Contents", []) if item["Key"].endswith(ARCHIVE_SUFFIX)]
+        return sorted(keys)
+
+
+def open_archive_store(url: str = RETENTION_ARCHIVE_URL):
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://"):].partition("/")
+        return S3ArchiveStore(bucket, prefix)
+    return LocalArchiveStore(url)
+
+
+def encode_rows(rows: list) -> bytes:
+    import zstandard
+    lines = "".join(json_util.dumps(row, json_options=JSON_OPTIONS) + "\n" for row in rows)
+    return zstandard.ZstdCompressor(level=RETENTION_ZSTD_LEVEL).compress(lines.encode("utf-8"))
+
+
+def decode_rows(data: bytes) -> list:
+    import zstandard
+    text = zstandard.ZstdDecompressor().decompressobj().decompress(data).decode("utf-8")
+    return [json_util.loads(line) for line in text.splitlines() if line]
+
+
+def day_prefix(collection: str, day: str) -> str:
+    """`day` is YYYY-MM-DD"""
+    return f"{collection}/{day[:4]}/{day[5:7]}/{day[8:10]}"
+
+
+# ============================================================================
+# ARCHIVE JOB
+# ============================================================================
+
+async def archive_stage(db, store, policy: RetentionPolicy, stage: str, run_id: str, dry_run: bool = False) -> int:
+    """Archive every row past the stage's window, then unset (compact) or delete (expire) it"""
+    days = policy.compact_after_days if stage == "compact" else policy.expire_after_days
+    if days is None:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=days)).isoformat()
+    query = {policy.time_field: {"$lt": cutoff}}
+    if stage == "compact":
+        # Rows past the expire window are the expire stage's
+        query[policy.time_field]["$gte"] = (now - timedelta(days=policy.expire_after_days)).isoformat()
+        query["$or"] = [{field: {"$exists": True}} for field in policy.compact_fields]
+
+    collection = db[policy.collection]
+    if dry_run:
+        return await collection.count_documents(query)
+
+    processed = 0
+    seq = 0
+    while True:
+        # Oldest first; each batch is removed from the query's results below
+        rows = await collection.find(query).sort(policy.time_field, 1).limit(RETENTION_BATCH_SIZE).to_list(RETENTION_BATCH_SIZE)
+        if not rows:
+            return processed
+
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row[policy.time_field][:10], []).append(row)
+
+        for day, day_rows in by_day.items():
+            seq += 1
+            key = f"{day_prefix(policy.collection, day)}/{stage}-{run_id}-{seq:05d}{ARCHIVE_SUFFIX}"
+            data = await run_in_threadpool(encode_rows, day_rows)
+            await run_in_threadpool(store.write, key, data)
+
+        ids = [row["_id"] for row in rows]
+        if stage == "compact":
+            await collection.update_many(
+                {"_id": {"$in": ids}},
+                {"$unset": {field: "" for field in policy.compact_fields}}
+            )
+        else:
+            await collection.delete_many({"_id": {"$in": ids}})
+        processed += len(rows)
+
+
+async def run_retention(db, store, collections: list = None, dry_run: bool = False) -> dict:
+    """Expire then compact each policy's collection; returns row counts per collection and stage"""
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    results = {}
+    for name in collections or list(POLICIES):
+        policy = POLICIES[name]
+        results[name] = {
+            stage: await archive_stage(db, store, policy, stage, run_id, dry_run)
+            # Expiring first means rows past both windows are archived once, whole
+            for stage in ("expire", "compact")
+        }
+    return results
+
+
+# ============================================================================
+# RESTORE
+# ============================================================================
+
+def window_days(start: str, end: str) -> list:
+    """YYYY-MM-DD for each day the window touches (rows are filtered exactly later)"""
+    day = datetime.fromisoformat(start[:10]).date()
+    last = datetime.fromisoformat(end[:10]).date()
+    days = []
+    while day <= last:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+async def restore_window(db, store, collection: str, start: str, end: str, target: str, dry_run: bool = False) -> int:
+    """
+    Load archived rows with start <= timestamp < end into `target`. Rows are
+    upserted by _id with $set in archive order, so a compacted row keeps the
+    fields its compact-stage copy had.
+    """
+    from pymongo import UpdateOne
+
+    policy = POLICIES[collection]
+    restored = 0
+    for day in window_days(start, end):
+        for key in await run_in_threadpool(store.list, day_prefix(collection, day)):
+            data = await run_in_threadpool(store.read, key)
+            rows = [
+                row for row in await run_in_threadpool(decode_rows, data)
+                if start <= row.get(policy.time_field, "") < end
+            ]
+            if rows and not dry_run:
+                await db[target].bulk_write([
+                    UpdateOne(
+                        {"_id": row["_id"]},
+                        {"$set": {field: value for field, value in row.items() if field not in ("_id", "expiresAt")}},
+                        upsert=True
+                    )
+                    for row in rows
+                ], ordered=True)
+            restored += len(rows)
+    return restored
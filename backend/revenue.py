@@ -0,0 +1,194 @@
+"""
+Normalized payment amounts and the daily analytics rollups built on them.
+
+`payment_confirmations.amount` is whatever the member typed ("$39",
+"39.00 USD", "Not specified"). Every confirmation now also stores
+`amountCents` (int, or None when unparseable) and `currency` (ISO code);
+scripts/backfill_payment_amounts.py fills them in for older rows.
+
+`analytics_daily` holds one document per UTC day:
+
+    {"_id": "YYYY-MM-DD", "signups", "paymentsSubmitted", "approvals",
+     "unpricedApprovals", "revenue": [{"method", "currency", "cents", "count"}]}
+
+built by one aggregation that $merges whole days into it (whenMatched:
+replace), so a reader sees each day either before or after a refresh,
+never half-built. The admin analytics endpoints only read these
+documents and schedule the refresh as a background task, so they serve
+the rollups as last built. Recent days are refreshed at most every
+ANALYTICS_REFRESH_SECONDS, by whichever request finds them stale first;
+older days only change on a full rebuild (the first refresh, or the
+backfill script), since their source rows no longer change.
+"""
+
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+ANALYTICS_REFRESH_SECONDS = int(os.environ.get('ANALYTICS_REFRESH_SECONDS', '300'))
+ANALYTICS_REFRESH_DAYS = int(os.environ.get('ANALYTICS_REFRESH_DAYS', '2'))  # Trailing days recomputed per refresh
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+ROLLUP_COLLECTION = "analytics_daily"
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP"}
+AMOUNT_PATTERN = re.compile(r"(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?")
+CURRENCY_CODE_PATTERN = re.compile(r"\b(USD|EUR|GBP|CAD|AUD|MXN)\b", re.IGNORECASE)
+
+
+# ============================================================================
+# AMOUNTS
+# ============================================================================
+
+def normalize_amount(amount, currency: str = None) -> dict:
+    """
+    {"amountCents", "currency"} for a confirmation. Accepts numbers (PayPal
+    values) and free text; anything without exactly one number is unpriced.
+    """
+    if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+        try:
+            cents = int((Decimal(str(amount)) * 100).quantize(Decimal(1)))
+        except InvalidOperation:
+            return {"amountCents": None, "currency": None}
+        return {"amountCents": cents, "currency": (currency or DEFAULT_CURRENCY).upper()}
+
+    if not isinstance(amount, str):
+        return {"amountCents": None, "currency": None}
+
+    numbers = AMOUNT_PATTERN.findall(amount)
+    if len(numbers) != 1:
+        return {"amountCents": None, "currency": None}
+    whole, fraction = numbers[0]
+    cents = int(whole.replace(",", "")) * 100 + int((fraction or "0").ljust(2, "0"))
+
+    if not currency:
+        code = CURRENCY_CODE_PATTERN.search(amount)
+        symbol = next((name for symbol, name in CURRENCY_SYMBOLS.items() if symbol in amount), None)
+        currency = code.group(1) if code else symbol or DEFAULT_CURRENCY
+    return {"amountCents": cents, "currency": currency.upper()}
+
+
+# ============================================================================
+# ROLLUPS
+# ============================================================================
+
+def day_of(field: str) -> dict:
+    """The YYYY-MM-DD prefix of an ISO timestamp field"""
+    return {"$substrBytes": [f"${field}", 0, 10]}
+
+
+def since_match(field: str, since: str) -> dict:
+    return {field: {"$gte": since} if since else {"$type": "string"}}
+
+
+def rollup_pipeline(since: str, build_id: str) -> list:
+    """
+    One aggregation over profiles and (via $unionWith) payment_confirmations
+    producing a complete document per day, each written with a single
+    replace, so readers never see a day with some counters missing
+    """
+    approved = {"$eq": ["$kind", "approved"]}
+    return [
+        {"$match": since_match("createdAt", since)},
+        {"$project": {"_id": 0, "day": day_of("createdAt"), "kind": "signup"}},
+        {"$unionWith": {"coll": "payment_confirmations", "pipeline": [
+            {"$match": since_match("submittedAt", since)},
+            {"$project": {"_id": 0, "day": day_of("submittedAt"), "kind": "submitted"}}
+        ]}},
+        {"$unionWith": {"coll": "payment_confirmations", "pipeline": [
+            {"$match": {"status": "approved", **since_match("approvedAt", since)}},
+            {"$project": {
+                "_id": 0, "day": day_of("approvedAt"), "kind": "approved",
+                "method": "$paymentMethod", "currency": "$currency", "cents": "$amountCents"
+            }}
+        ]}},
+        {"$group": {
+            "_id": {"day": "$day", "method": "$method", "currency": "$currency"},
+            "signups": {"$sum": {"$cond": [{"$eq": ["$kind", "signup"]}, 1, 0]}},
+            "paymentsSubmitted": {"$sum": {"$cond": [{"$eq": ["$kind", "submitted"]}, 1, 0]}},
+            "approvals": {"$sum": {"$cond": [approved, 1, 0]}},
+            "unpriced": {"$sum": {"$cond": [{"$and": [approved, {"$not": [{"$isNumber": "$cents"}]}]}, 1, 0]}},
+            "cents": {"$sum": "$cents"}
+        }},
+        {"$group": {
+            "_id": "$_id.day",
+            "signups": {"$sum": "$signups"},
+            "paymentsSubmitted": {"$sum": "$paymentsSubmitted"},
+            "approvals": {"$sum": "$approvals"},
+            "unpricedApprovals": {"$sum": "$unpriced"},
+            "revenue": {"$push": {
+                "method": {"$ifNull": ["$_id.method", None]},
+                "currency": "$_id.currency",
+                "cents": "$cents",
+                "count": "$approvals"
+            }}
+        }},
+        # Signups, submissions and unpriced approvals carry no currency (the
+        # field is missing, not null), so they drop out of the revenue list;
+        # they are counted above
+        {"$set": {
+            "revenue": {"$filter": {"input": "$revenue", "cond": {"$eq": [{"$type": "$$this.currency"}, "string"]}}},
+            "buildId": build_id
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+
+async def refresh_rollups(db, since_day: str = None):
+    """
+    Recompute analytics_daily from `since_day` (YYYY-MM-DD) on, or entirely.
+    Days are replaced in place; afterwards only the days in the window that
+    this build didn't produce (no activity left) are deleted.
+    """
+    build_id = uuid.uuid4().hex
+    await db.profiles.aggregate(rollup_pipeline(since_day, build_id)).to_list(None)
+    
+    stale = {"buildId": {"$ne": build_id}}
+    if since_day:
+        stale["_id"] = {"$gte": since_day}
+    await db[ROLLUP_COLLECTION].delete_many(stale)
+    
+    if not since_day:
+        await db.analytics_state.update_one(
+            {"_id": "daily"},
+            {"$set": {"builtAt": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+
+
+async def refresh_recent_rollups(db) -> bool:
+    """Refresh the trailing days if stale; one caller across all workers wins the claim"""
+    now = datetime.now(timezone.utc)
+    try:
+        claimed = await db.analytics_state.find_one_and_update(
+            {"_id": "daily", "refreshedAt": {"$not": {"$gt": (now - timedelta(seconds=ANALYTICS_REFRESH_SECONDS)).isoformat()}}},
+            {"$set": {"refreshedAt": now.isoformat()}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        return False  # Fresh, or another worker is refreshing right now
+    
+    try:
+        if not (claimed or {}).get("builtAt"):
+            # No full build has finished yet: cover all history
+            await refresh_rollups(db)
+        else:
+            await refresh_rollups(db, (now - timedelta(days=ANALYTICS_REFRESH_DAYS)).date().isoformat())
+    except Exception:
+        # Let the next request retry instead of waiting out the refresh interval
+        await db.analytics_state.update_one({"_id": "daily"}, {"$unset": {"refreshedAt": ""}})
+        raise
+    return True
+
+
+async def load_rollups(db, since: str, until: str) -> list:
+    """Rollups as last refreshed; callers schedule refresh_recent_rollups off the request path"""
+    return await db[ROLLUP_COLLECTION].find(
+        {"_id": {"$gte": since, "$lt": until}}
+    ).sort("_id", 1).to_list(None)
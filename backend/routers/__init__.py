@@ -0,0 +1,50 @@
+"""
+API routers, one module per area. Each module exposes `router` and is only
+imported when mounted, so a process serving one role never loads the code
+(or the PayPal/Twilio/email dependencies) of the others.
+"""
+
+import importlib
+
+ROUTER_MODULES = (
+    "profiles",
+    "documents",
+    "images",
+    "trust",
+    "verification",
+    "payments",
+    "webhooks",
+    "sponsors",
+    "visits",
+    "analytics",
+    "admin",
+    "exports",
+)
+
+# Process roles, selected with APP_ROLE (or an explicit APP_ROUTERS list)
+ROLES = {
+    "all": ROUTER_MODULES,
+    # Read-only tier for QR scans: signed tokens, key, revocations and photos
+    "verification": ("verification", "images"),
+    # Member-facing API and payment callbacks, no /admin routes at all
+    "public": ("profiles", "documents", "images", "trust", "verification", "payments", "webhooks", "sponsors", "visits"),
+    "admin": ("admin", "analytics", "sponsors", "images", "exports"),
+}
+
+
+def resolve_router_names(role: str = "all", explicit: str = "") -> tuple:
+    if explicit.strip():
+        names = tuple(name.strip() for name in explicit.split(",") if name.strip())
+    elif role in ROLES:
+        names = ROLES[role]
+    else:
+        raise ValueError(f"Unknown APP_ROLE '{role}', expected one of: {', '.join(ROLES)}")
+
+    unknown = [name for name in names if name not in ROUTER_MODULES]
+    if unknown:
+        raise ValueError(f"Unknown routers: {', '.join(unknown)}")
+    return names
+
+
+def load_routers(names) -> list:
+    return [importlib.import_module(f"routers.{name}").router for name in names]
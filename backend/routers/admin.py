@@ -0,0 +1,578 @@
+"""
+Admin console: login, payment review, live events, profile management, sponsor logos, admin users and the slow-query log.
+"""
+
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import os
+import tempfile
+
+import orjson
+from pymongo.errors import ConfigurationError, OperationFailure
+
+from change_feed import RESYNC, ChangeFeed, ChangeFeedUnavailable
+from coordination import ADMIN_ROSTER_CHANGED, SPONSOR_LOGO_UPDATED
+from core import bus, db, generate_unique_member_id, get_pwd_context, logger, query_monitor, secondary_db, verify_admin, verify_admin_user
+from metrics import enqueue_task
+from member_import import IMPORT_FORMATS, ImportConflict, import_members, start_import
+from models import AdminLogin, AdminUserCreate, AdminUserLogin, AdminUserUpdate
+from notifications import invalidate_admin_roster, send_user_approval_notification, send_welcome_emails
+from profile_dedupe import run_dedupe
+from routers.analytics import load_admin_stats
+from routers.documents import delete_document_uploads
+from routers.sponsors import set_cached_sponsor_logo, store_sponsor_logo
+from routers.verification import clear_qr_revocation, revoke_qr_token
+
+router = APIRouter(prefix="/api")
+
+# Live admin events (Server-Sent Events fed by a change stream)
+ADMIN_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('ADMIN_EVENTS_HEARTBEAT_SECONDS', '15'))  # Keeps proxies from closing idle streams
+ADMIN_EVENTS_REPLAY_SIZE = int(os.environ.get('ADMIN_EVENTS_REPLAY_SIZE', '500'))  # Changes kept for reconnecting clients
+
+# Bulk member import uploads (spooled to disk past 1MB)
+IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', str(50 * 1024 * 1024)))
+
+async def load_pending_payments(session=None) -> list:
+    return await db.payment_confirmations.find(
+        {"status": "pending"},
+        {"_id": 0},
+        session=session
+    ).sort("submittedAt", -1).to_list(100)
+
+# Admin - Get Pending Payment Confirmations
+@router.get("/admin/payments/pending")
+async def get_pending_payments(password: str):
+    verify_admin(password)
+    
+    pending = await load_pending_payments()
+    
+    # Mongo rows are already JSON-safe, so skip jsonable_encoder
+    return ORJSONResponse(pending)
+
+# Admin - Approve Payment (NEW: Auto-generates Member ID)
+@router.post("/admin/payments/approve")
+async def approve_payment(membership_id: str, password: str, background_tasks: BackgroundTasks):
+    verify_admin(password)
+    
+    # Get profile
+    profile = await db.profiles.find_one({"membershipId": membership_id})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    # Generate unique 6-digit Member ID
+    assigned_member_id = await generate_unique_member_id()
+    
+    # Update payment confirmation
+    await db.payment_confirmations.update_one(
+        {"membershipId": membership_id, "status": "pending"},
+        {"$set": {"status": "approved", "approvedAt": datetime.now(timezone.utc).isoformat()}}
+    )
+    
+    # Update profile to Status 3: Approved - Can now build profile
+    await db.profiles.update_one(
+        {"membershipId": membership_id},
+        {"$set": {
+            "userStatus": 3,  # Status 3: Approved
+            "paymentStatus": "confirmed",
+            "assignedMemberId": assigned_member_id,
+            "qrCodeEnabled": True,  # Enable QR code generation
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    
+    # Re-approved members come off the QR revocation list
+    await clear_qr_revocation(membership_id)
+    
+    # Send approval notification email to user
+    enqueue_task(
+        background_tasks,
+        send_user_approval_notification,
+        profile.get("name", "Member"),
+        profile.get("email", ""),
+        assigned_member_id
+    )
+    
+    return {"message": f"Payment confirmed. User approved with Member ID: {assigned_member_id}. Notification sent."}
+
+# Admin - Reject Payment
+@router.post("/admin/payments/reject/{membership_id}")
+async def reject_payment(membership_id: str, password: str, reason: str = ""):
+    verify_admin(password)
+    
+    # Update payment confirmation
+    await db.payment_confirmations.update_one(
+        {"membershipId": membership_id, "status": "pending"},
+        {"$set": {
+            "status": "rejected",
+            "rejectedAt": datetime.now(timezone.utc).isoformat(),
+            "rejectionReason": reason
+        }}
+    )
+    
+    # Update profile to rejected
+    await db.profiles.update_one(
+        {"membershipId": membership_id},
+        {"$set": {
+            "paymentStatus": "rejected",
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    
+    await revoke_qr_token(membership_id, "rejected")
+    
+    return {"message": "Payment rejected."}
+
+# ============================================================================
+# ADMIN EVENTS - Live payment and stats updates
+# ============================================================================
+#
+# GET /api/admin/events is an SSE stream replacing the panel's polling of
+# /admin/payments/pending and /admin/stats. A new connection first gets a
+# "snapshot" event (the pending list and stats), then one event per change:
+#
+#   payment.pending / payment.approved / payment.rejected  {"payment", "statsDelta"}
+#   profile.created / profile.deleted                      {"profile", "statsDelta"}
+#
+# statsDelta holds increments to apply to the snapshot's stats; changes the
+# snapshot already reflects (clusterTime at or before its read) are skipped.
+# Each event's id is its change-stream resume token, so EventSource's
+# automatic reconnect (Last-Event-ID) replays what was missed; when that is
+# no longer possible the client is sent a fresh snapshot instead.
+
+ADMIN_EVENTS_PIPELINE = [
+    {"$match": {"$or": [
+        {"ns.coll": "payment_confirmations", "operationType": "insert"},
+        {"ns.coll": "payment_confirmations", "operationType": "update",
+         "updateDescription.updatedFields.status": {"$exists": True}},
+        {"ns.coll": "profiles", "operationType": {"$in": ["insert", "delete"]}}
+    ]}},
+    # Photos and ID documents never leave the database
+    {"$project": {"fullDocument._id": 0, "fullDocument.photo": 0, "fullDocument.documentData": 0}}
+]
+
+# One change stream per worker, shared by every connected admin
+admin_feed = ChangeFeed(
+    "admin",
+    ADMIN_EVENTS_PIPELINE,
+    full_document="updateLookup",
+    replay_size=ADMIN_EVENTS_REPLAY_SIZE
+)
+
+
+def admin_event(change: dict):
+    """Map a change to (event name, data), or None if the panel doesn't care"""
+    collection = change["ns"]["coll"]
+    operation = change["operationType"]
+    document = change.get("fullDocument") or {}
+    
+    if collection == "payment_confirmations":
+        if operation == "insert":
+            status = document.get("status", "pending")
+            delta = {"pendingPayments": 1} if status == "pending" else {}
+        else:
+            # Approve and reject only ever move a pending confirmation
+            status = change["updateDescription"]["updatedFields"]["status"]
+            delta = {"pendingPayments": -1} if status in ("approved", "rejected") else {}
+        return f"payment.{status}", {"payment": document, "statsDelta": delta}
+    
+    if collection == "profiles":
+        if operation == "insert":
+            profile = {key: document.get(key) for key in ("membershipId", "name", "email", "createdAt")}
+            return "profile.created", {"profile": profile, "statsDelta": {"totalUsers": 1, "qrCodesGenerated": 1}}
+        return "profile.deleted", {"profile": {}, "statsDelta": {"totalUsers": -1, "qrCodesGenerated": -1}}
+    
+    return None
+
+
+def sse_message(event: str, data, event_id: str = None) -> bytes:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", "data: " + orjson.dumps(data, default=str).decode()]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def admin_snapshot() -> tuple:
+    """
+    (snapshot message, cluster time it was read at). The subscription is
+    opened before the snapshot is read, so changes at or before that time
+    are already counted in it and must not be sent as deltas again.
+    """
+    # Read from the primary so the deltas that follow apply to current counts
+    try:
+        async with await db.client.start_session(snapshot=True) as session:
+            pending = await load_pending_payments(session)
+            stats = await load_admin_stats(db, session)
+            return sse_message("snapshot", {"pendingPayments": pending, "stats": stats}), session.operation_time
+    except (OperationFailure, ConfigurationError) as e:
+        # Snapshot reads need MongoDB 5.0+; without them a change racing the
+        # snapshot may be counted twice until the next resync
+        logger.warning(f"Admin snapshot read without a snapshot session: {e}")
+    pending, stats = await asyncio.gather(load_pending_payments(), load_admin_stats(db))
+    return sse_message("snapshot", {"pendingPayments": pending, "stats": stats}), None
+
+
+def already_in_snapshot(change: dict, snapshot_time) -> bool:
+    return snapshot_time is not None and change.get("clusterTime") is not None and change["clusterTime"] <= snapshot_time
+
+
+# Admin - Live Events (SSE)
+@router.get("/admin/events")
+async def admin_events(password: str, last_event_id: str = Header(default="")):
+    verify_admin(password)
+    
+    try:
+        subscription = await admin_feed.subscribe(db, last_event_id or None)
+    except ChangeFeedUnavailable as e:
+        # Standalone mongod: the panel falls back to polling
+        raise HTTPException(status_code=503, detail=f"Live events unavailable: {e}")
+    
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            snapshot_time = None
+            if not last_event_id:
+                snapshot, snapshot_time = await admin_snapshot()
+                yield snapshot
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscription.queue.get(), ADMIN_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if change == RESYNC:
+                    snapshot, snapshot_time = await admin_snapshot()
+                    yield snapshot
+                    continue
+                if already_in_snapshot(change, snapshot_time):
+                    continue
+                event = admin_event(change)
+                if event:
+                    yield sse_message(*event, event_id=ChangeFeed.token_id(change))
+        finally:
+            admin_feed.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Admin Login
+@router.post("/admin/login")
+async def admin_login(credentials: AdminLogin):
+    try:
+        verify_admin(credentials.password)
+        return {"success": True, "message": "Login successful"}
+    except HTTPException:
+        return {"success": False, "message": "Invalid password"}
+
+# Admin - Slow Query Log
+@router.get("/admin/slow-queries")
+async def get_slow_queries(password: str, limit: int = 50):
+    """Slowest query shapes (values redacted) with sampled plans and recent slow commands"""
+    verify_admin(password)
+    return query_monitor.report(limit)
+
+@router.delete("/admin/slow-queries")
+async def reset_slow_queries(password: str):
+    """Clear the collected slow-query statistics"""
+    verify_admin(password)
+    query_monitor.reset()
+    return {"message": "Slow query log cleared"}
+
+# Admin - Get All Profiles
+@router.get("/admin/profiles")
+async def get_all_profiles(password: str, search: str = "", limit: int = 100, skip: int = 0):
+    verify_admin(password)
+    
+    query = {}
+    if search:
+        query = {"$or": [
+            {"name": {"$regex": search, "$options": "i"}},
+            {"membershipId": {"$regex": search, "$options": "i"}}
+        ]}
+    
+    # Add pagination for better performance
+    # Raw photo and document blobs stay in the database; listings get the thumbnail URL
+    profiles = await secondary_db.profiles.find(
+        query,
+        {"_id": 0, "photo": 0, "documentData": 0}
+    ).sort("createdAt", -1).skip(skip).limit(limit).to_list(limit)
+    
+    for profile in profiles:
+        profile["photo"] = profile.pop("photoThumb", "")
+    
+    # Mongo rows are already JSON-safe, so skip jsonable_encoder
+    return ORJSONResponse(profiles)
+
+# Admin - Delete Profile
+@router.delete("/admin/profiles/{membership_id}")
+async def delete_profile(membership_id: str, password: str):
+    verify_admin(password)
+    
+    result = await db.profiles.delete_one({"membershipId": membership_id})
+    
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    # Drop the member's references and everyone's references to them
+    await db.references.delete_many({"$or": [{"fromId": membership_id}, {"toId": membership_id}]})
+    
+    # Stored documents (and any unfinished uploads) go with the profile
+    uploads = await db.document_uploads.find({"membershipId": membership_id}, {"_id": 0, "uploadId": 1}).to_list(None)
+    await delete_document_uploads([upload["uploadId"] for upload in uploads])
+    
+    await revoke_qr_token(membership_id, "deleted")
+    
+    return {"message": "Profile deleted successfully"}
+
+# ============================================================================
+# MEMBER IMPORT - Bulk CSV/JSONL onboarding (see member_import.py)
+# ============================================================================
+
+# Imports and their welcome-email batches outlive the request that started them;
+# holding the tasks here keeps them from being garbage collected mid-run
+_detached_tasks = set()
+
+def run_detached(coroutine) -> asyncio.Task:
+    task = asyncio.create_task(coroutine)
+    _detached_tasks.add(task)
+    task.add_done_callback(_detached_tasks.discard)
+    return task
+
+# Admin - Import Members
+@router.post("/admin/imports")
+async def import_members_upload(request: Request, password: str,
+                                format: str = "", importId: str = "", filename: str = ""):
+    """
+    Import members from a CSV (name,email[,photo] header) or JSONL request body.
+    Streams one NDJSON progress line per chunk. The import runs as its own task,
+    so it finishes even if the client disconnects (follow it with
+    GET /admin/imports/{importId}). To resume a failed or interrupted import,
+    send the same file again with its importId.
+    """
+    verify_admin(password)
+    
+    format = format or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+    
+    upload = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    digest = hashlib.sha256()
+    size = 0
+    async for body_chunk in request.stream():
+        size += len(body_chunk)
+        if size > IMPORT_MAX_BYTES:
+            upload.close()
+            raise HTTPException(status_code=413, detail=f"Import files are limited to {IMPORT_MAX_BYTES} bytes")
+        digest.update(body_chunk)
+        upload.write(body_chunk)
+    upload.seek(0)
+    
+    try:
+        job = await start_import(db, filename or f"upload.{format}", digest.hexdigest(), importId or None)
+    except ImportConflict as e:
+        upload.close()
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        upload.close()
+        raise
+    
+    async def send_welcomes(recipients):
+        # One task per chunk, so slow mail delivery doesn't hold up the import
+        run_detached(send_welcome_emails(recipients))
+    
+    updates = asyncio.Queue()
+    
+    async def run_import():
+        try:
+            async for state in import_members(db, upload, format, job, send_welcomes):
+                updates.put_nowait(dict(state))
+        except Exception as e:
+            # import_members has already recorded the failure on the job
+            logger.error(f"Import {job['importId']} failed: {e}")
+            updates.put_nowait(dict(job))
+        finally:
+            upload.close()
+            updates.put_nowait(None)
+    
+    run_detached(run_import())
+    
+    async def progress():
+        # Only reports; a client hanging up here leaves the import running
+        while (state := await updates.get()) is not None:
+            yield orjson.dumps(state) + b"\n"
+    
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+# Admin - Get Import Progress
+@router.get("/admin/imports/{import_id}")
+async def get_import(import_id: str, password: str):
+    verify_admin(password)
+    
+    job = await db.member_imports.find_one({"importId": import_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    
+    return job
+
+# Admin - Merge Duplicate Profiles
+@router.post("/admin/profiles/dedupe")
+async def dedupe_profiles(password: str, background_tasks: BackgroundTasks, dryRun: bool = False):
+    """
+    Merge profiles that share an email (see profile_dedupe.py). dryRun reports
+    the duplicate groups; otherwise the merge runs as a background task.
+    """
+    verify_admin(password)
+    
+    if dryRun:
+        return await run_dedupe(db, dry_run=True)
+    
+    enqueue_task(background_tasks, run_dedupe, db)
+    return {"message": "Duplicate merge started; progress is logged and merges are recorded in profile_merges"}
+
+# ============================================================================
+# SPONSOR LOGOS - Admin Management (public reads and the cache in routers/sponsors.py)
+# ============================================================================
+
+# Admin - Upload Sponsor Logo
+@router.post("/admin/sponsors/{slot}")
+async def upload_sponsor_logo(slot: int, data: dict, password: str):
+    """Upload sponsor logo for a specific slot (1, 2, or 3)"""
+    verify_admin(password)
+    
+    if slot not in [1, 2, 3]:
+        raise HTTPException(status_code=400, detail="Invalid slot number. Must be 1, 2, or 3")
+    
+    logo_data = data.get("logo", "")
+    if not logo_data:
+        raise HTTPException(status_code=400, detail="No logo data provided")
+    
+    # Store or update sponsor logo
+    logo_url = await store_sponsor_logo(slot, logo_data)
+    await set_cached_sponsor_logo(slot, logo_url)
+    await bus.publish(SPONSOR_LOGO_UPDATED, {"slot": slot, "logoUrl": logo_url})
+    
+    return {"message": f"Sponsor logo uploaded for slot {slot}", "logoUrl": logo_url}
+
+
+# Admin - Remove Sponsor Logo
+@router.delete("/admin/sponsors/{slot}")
+async def remove_sponsor_logo(slot: int, password: str):
+    """Remove sponsor logo from a specific slot"""
+    verify_admin(password)
+    
+    await db.sponsors.delete_one({"slot": slot})
+    await set_cached_sponsor_logo(slot, None)
+    await bus.publish(SPONSOR_LOGO_UPDATED, {"slot": slot, "logoUrl": None})
+    return {"message": f"Sponsor logo removed from slot {slot}"}
+
+
+# ============================================================================
+# ADMIN USER MANAGEMENT
+# ============================================================================
+
+async def admin_roster_changed():
+    """Drop the SMS roster here and on every other worker"""
+    invalidate_admin_roster()
+    await bus.publish(ADMIN_ROSTER_CHANGED, {})
+
+@router.post("/admin/users/create")
+async def create_admin_user(admin_data: AdminUserCreate, password: str):
+    """Create a new admin user (requires existing admin authentication)"""
+    verify_admin(password)
+    
+    # Check if username already exists
+    existing = await db.admin_users.find_one({"username": admin_data.username})
+    if existing:
+        raise HTTPException(status_code=400, detail="Username already exists")
+    
+    # Check if email already exists
+    existing_email = await db.admin_users.find_one({"email": admin_data.email})
+    if existing_email:
+        raise HTTPException(status_code=400, detail="Email already exists")
+    
+    # Hash password
+    hashed_password = get_pwd_context().hash(admin_data.password)
+    
+    # Create admin user
+    admin_user = {
+        "name": admin_data.name,
+        "email": admin_data.email,
+        "phone": admin_data.phone,
+        "username": admin_data.username,
+        "password": hashed_password,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "updatedAt": datetime.now(timezone.utc).isoformat()
+    }
+    
+    await db.admin_users.insert_one(admin_user)
+    await admin_roster_changed()
+    
+    return {"message": "Admin user created successfully", "username": admin_data.username}
+
+@router.post("/admin/users/login")
+async def admin_user_login(login_data: AdminUserLogin):
+    """Login for admin users with individual credentials"""
+    admin = await verify_admin_user(login_data.username, login_data.password)
+    
+    return {
+        "message": "Login successful",
+        "admin": {
+            "username": admin['username'],
+            "name": admin['name'],
+            "email": admin['email'],
+            "phone": admin.get('phone', '')
+        }
+    }
+
+@router.get("/admin/users")
+async def get_all_admin_users(password: str):
+    """Get all admin users (requires authentication)"""
+    verify_admin(password)
+    
+    admins = await db.admin_users.find({}, {"_id": 0, "password": 0}).to_list(100)
+    return admins
+
+@router.put("/admin/users/{username}")
+async def update_admin_user(username: str, update_data: AdminUserUpdate, password: str):
+    """Update admin user profile"""
+    verify_admin(password)
+    
+    admin = await db.admin_users.find_one({"username": username})
+    if not admin:
+        raise HTTPException(status_code=404, detail="Admin user not found")
+    
+    update_fields = {}
+    if update_data.name:
+        update_fields["name"] = update_data.name
+    if update_data.email:
+        update_fields["email"] = update_data.email
+    if update_data.phone:
+        update_fields["phone"] = update_data.phone
+    if update_data.password:
+        update_fields["password"] = get_pwd_context().hash(update_data.password)
+    
+    update_fields["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    
+    await db.admin_users.update_one(
+        {"username": username},
+        {"$set": update_fields}
+    )
+    await admin_roster_changed()
+    
+    return {"message": "Admin user updated successfully"}
+
+@router.delete("/admin/users/{username}")
+async def delete_admin_user(username: str, password: str):
+    """Delete an admin user"""
+    verify_admin(password)
+    
+    result = await db.admin_users.delete_one({"username": username})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Admin user not found")
+    await admin_roster_changed()
+    
+    return {"message": "Admin user deleted successfully"}
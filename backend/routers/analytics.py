@@ -0,0 +1,145 @@
+"""
+Admin dashboard statistics and revenue/funnel analytics (site visits are
+recorded by routers/visits.py).
+"""
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from datetime import date, datetime, timedelta, timezone
+import os
+
+from core import db, secondary_db, verify_admin
+from metrics import enqueue_task
+from revenue import load_rollups, refresh_recent_rollups
+
+router = APIRouter(prefix="/api")
+
+ANALYTICS_DEFAULT_DAYS = int(os.environ.get('ANALYTICS_DEFAULT_DAYS', '30'))
+
+async def load_admin_stats(database, session=None) -> dict:
+    """
+    Dashboard counters; the admin event stream snapshots these from the primary
+    (in a snapshot session, so every counter is read at the same point in time)
+    """
+    total_users = await database.profiles.count_documents({}, session=session)
+    
+    # One document per reference edge, so the collection count is the total.
+    # Not session-bound: snapshot reads don't support count, and no event changes it
+    ref_count = await database.references.estimated_document_count()
+    
+    total_visits = await database.site_visits.count_documents({}, session=session)
+    pending_payments = await database.payment_confirmations.count_documents({"status": "pending"}, session=session)
+    
+    return {
+        "totalUsers": total_users,
+        "totalReferences": ref_count,
+        "totalVisits": total_visits,
+        "qrCodesGenerated": total_users,
+        "pendingPayments": pending_payments
+    }
+
+# Admin Stats
+@router.get("/admin/stats")
+async def get_admin_stats(password: str):
+    verify_admin(password)
+    
+    return await load_admin_stats(secondary_db)
+
+# ============================================================================
+# REVENUE & FUNNEL ANALYTICS - served from the analytics_daily rollups
+# ============================================================================
+
+def analytics_window(since: str, until: str) -> tuple:
+    """(since, until) as YYYY-MM-DD, inclusive/exclusive; defaults to the last ANALYTICS_DEFAULT_DAYS days"""
+    try:
+        end = date.fromisoformat(until) if until else datetime.now(timezone.utc).date() + timedelta(days=1)
+        start = date.fromisoformat(since) if since else end - timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since and until must be dates (YYYY-MM-DD)")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return start.isoformat(), end.isoformat()
+
+def revenue_entry(key: tuple, cents: int, count: int) -> dict:
+    method, currency = key
+    return {"method": method, "currency": currency, "amountCents": cents, "amount": cents / 100, "count": count}
+
+# Admin - Revenue Analytics
+@router.get("/admin/analytics/revenue")
+async def get_revenue_analytics(background_tasks: BackgroundTasks, password: str, since: str = "", until: str = ""):
+    """
+    Approved revenue per day and payment method, by currency.
+    Approvals whose amount could not be parsed are counted in unpricedApprovals.
+    """
+    verify_admin(password)
+    since, until = analytics_window(since, until)
+    
+    rollups = await load_rollups(db, since, until)
+    # Stale days are rebuilt after the response; this request serves the last build
+    enqueue_task(background_tasks, refresh_recent_rollups, db)
+    
+    days = []
+    by_method = {}
+    by_currency = {}
+    for rollup in rollups:
+        # Rollups built before the currency filter may hold signup rows without one
+        entries = [entry for entry in rollup.get("revenue", []) if entry.get("currency")]
+        for entry in entries:
+            key = (entry.get("method"), entry.get("currency"))
+            cents, count = by_method.get(key, (0, 0))
+            by_method[key] = (cents + entry.get("cents", 0), count + entry.get("count", 0))
+            cents, count = by_currency.get(key[1], (0, 0))
+            by_currency[key[1]] = (cents + entry.get("cents", 0), count + entry.get("count", 0))
+        days.append({
+            "day": rollup["_id"],
+            "approvals": rollup.get("approvals", 0),
+            "unpricedApprovals": rollup.get("unpricedApprovals", 0),
+            "revenue": [
+                revenue_entry((entry.get("method"), entry.get("currency")), entry.get("cents", 0), entry.get("count", 0))
+                for entry in entries
+            ]
+        })
+    
+    return {
+        "since": since,
+        "until": until,
+        "days": days,
+        "byMethod": [revenue_entry(key, *totals) for key, totals in sorted(by_method.items(), key=lambda item: -item[1][0])],
+        "totals": [
+            {"currency": currency, "amountCents": cents, "amount": cents / 100, "count": count}
+            for currency, (cents, count) in sorted(by_currency.items())
+        ],
+        "unpricedApprovals": sum(rollup.get("unpricedApprovals", 0) for rollup in rollups)
+    }
+
+def conversion(numerator: int, denominator: int):
+    return round(numerator / denominator, 4) if denominator else None
+
+# Admin - Funnel Analytics
+@router.get("/admin/analytics/funnel")
+async def get_funnel_analytics(background_tasks: BackgroundTasks, password: str, since: str = "", until: str = ""):
+    """
+    Signup -> payment submitted -> approval counts per day.
+    Each stage is counted on the day it happened, not per signup cohort.
+    """
+    verify_admin(password)
+    since, until = analytics_window(since, until)
+    
+    rollups = await load_rollups(db, since, until)
+    # Stale days are rebuilt after the response; this request serves the last build
+    enqueue_task(background_tasks, refresh_recent_rollups, db)
+    
+    stages = ("signups", "paymentsSubmitted", "approvals")
+    days = [{"day": rollup["_id"], **{stage: rollup.get(stage, 0) for stage in stages}} for rollup in rollups]
+    totals = {stage: sum(day[stage] for day in days) for stage in stages}
+    
+    return {
+        "since": since,
+        "until": until,
+        "days": days,
+        "totals": totals,
+        "conversion": {
+            "signupToPayment": conversion(totals["paymentsSubmitted"], totals["signups"]),
+            "paymentToApproval": conversion(totals["approvals"], totals["paymentsSubmitted"]),
+            "signupToApproval": conversion(totals["approvals"], totals["signups"])
+        }
+    }
@@ -0,0 +1,428 @@
+"""
+Health document uploads (streamed multipart and resumable chunked).
+"""
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from typing import AsyncIterator, Optional
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+import uuid
+
+from core import db, logger
+from metrics import enqueue_task
+from models import DocumentUpload, DocumentUploadStart
+
+router = APIRouter(prefix="/api")
+
+# Document uploads
+DOCUMENT_MAX_BYTES = int(os.environ.get('DOCUMENT_MAX_BYTES', str(20 * 1024 * 1024)))  # 20 MB
+DOCUMENT_CHUNK_SIZE = 255 * 1024  # Stored chunk size (same as GridFS)
+DOCUMENT_FORM_OVERHEAD = 64 * 1024  # Multipart boundaries and form fields around the file part
+DOCUMENT_UPLOAD_ABANDON_HOURS = int(os.environ.get('DOCUMENT_UPLOAD_ABANDON_HOURS', '24'))  # Idle "uploading" sessions are purged after this
+DOCUMENT_PURGE_BATCH = 100  # Abandoned sessions purged per sweep
+
+# ============================================================================
+# DOCUMENT UPLOADS - Streaming multipart and resumable chunked uploads
+# ============================================================================
+#
+# Documents are streamed into `document_chunks` ({uploadId, offset, data}) in
+# DOCUMENT_CHUNK_SIZE pieces, so neither the whole document nor a base64 copy
+# is ever held in memory. `document_uploads` tracks each upload session.
+#
+# Resumable flow for flaky connections:
+#   POST /api/document/uploads                        -> {uploadId, received: 0}
+#   PUT  /api/document/uploads/{uploadId}?offset=N    (raw bytes, repeat)
+#   GET  /api/document/uploads/{uploadId}             -> {received} to resume
+#   POST /api/document/uploads/{uploadId}/complete
+#
+# Sessions idle for DOCUMENT_UPLOAD_ABANDON_HOURS are purged, chunks and all,
+# by a sweep that runs in the background whenever a new upload starts.
+
+async def get_document_upload_profile(membership_id: str) -> dict:
+    """Profile that may upload documents (exists and payment confirmed)"""
+    profile = await db.profiles.find_one(
+        {"membershipId": membership_id},
+        {"_id": 0, "membershipId": 1, "paymentStatus": 1, "documentUploadId": 1}
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if profile.get("paymentStatus") != "confirmed":
+        raise HTTPException(status_code=403, detail="Payment must be confirmed before uploading documents")
+    
+    return profile
+
+
+async def create_document_upload(membership_id: str, document_type: str, size: int, content_type: str) -> dict:
+    """Start a new document upload session"""
+    if size > DOCUMENT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Document exceeds the {DOCUMENT_MAX_BYTES} byte limit")
+    
+    upload = {
+        "uploadId": str(uuid.uuid4()),
+        "membershipId": membership_id,
+        "documentType": document_type,
+        "contentType": content_type,
+        "size": size,
+        "received": 0,
+        "status": "uploading",
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "updatedAt": datetime.now(timezone.utc).isoformat()
+    }
+    await db.document_uploads.insert_one(upload)
+    upload.pop("_id", None)
+    return upload
+
+
+async def store_document_chunk(upload: dict, offset: int, data: bytes, hasher=None) -> int:
+    """Claim `offset`, then write the chunk there; returns the new offset"""
+    if offset + len(data) > upload["size"]:
+        raise HTTPException(status_code=413, detail="Upload exceeds the declared document size")
+    
+    # Claim the offset first: a concurrent or retried writer at the same
+    # offset loses here and never touches the stored bytes
+    result = await db.document_uploads.update_one(
+        {"uploadId": upload["uploadId"], "received": offset, "status": "uploading"},
+        {"$inc": {"received": len(data)}, "$set": {"updatedAt": datetime.now(timezone.utc).isoformat()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Upload offset conflict, fetch the upload status and resume")
+    
+    try:
+        # Upserted rather than inserted: if an earlier attempt's write reached
+        # the server but reported an error, the retry overwrites that chunk
+        await db.document_chunks.replace_one(
+            {"uploadId": upload["uploadId"], "offset": offset},
+            {"uploadId": upload["uploadId"], "offset": offset, "data": data},
+            upsert=True
+        )
+    except Exception:
+        # Hand the offset back so the client can resume from it
+        await db.document_uploads.update_one(
+            {"uploadId": upload["uploadId"], "received": offset + len(data)},
+            {"$inc": {"received": -len(data)}}
+        )
+        raise
+    
+    if hasher is not None:
+        hasher.update(data)
+    
+    return offset + len(data)
+
+
+async def stream_document_chunks(upload: dict, offset: int, stream: AsyncIterator[bytes], hasher=None) -> int:
+    """Re-slice an incoming byte stream into stored chunks"""
+    buffer = bytearray()
+    async for data in stream:
+        buffer.extend(data)
+        while len(buffer) >= DOCUMENT_CHUNK_SIZE:
+            offset = await store_document_chunk(upload, offset, bytes(buffer[:DOCUMENT_CHUNK_SIZE]), hasher)
+            del buffer[:DOCUMENT_CHUNK_SIZE]
+    
+    if buffer:
+        offset = await store_document_chunk(upload, offset, bytes(buffer), hasher)
+    
+    return offset
+
+
+async def iter_multipart_form(request: Request, max_bytes: int) -> AsyncIterator[tuple]:
+    """
+    Parse a multipart/form-data body straight off the request stream, capped
+    at `max_bytes`. Yields ("field", name, value) for each form field,
+    ("file", name, content_type) when a file part starts, then its bytes as
+    ("data", bytes) while they arrive, and ("end",) after it; nothing is
+    spooled to disk.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    
+    events = []
+    part = {}
+    header = [bytearray(), bytearray()]
+    
+    def on_part_begin():
+        part.update(headers={}, value=bytearray())
+    
+    def on_header_field(data, start, end):
+        header[0].extend(data[start:end])
+    
+    def on_header_value(data, start, end):
+        header[1].extend(data[start:end])
+    
+    def on_header_end():
+        part["headers"][bytes(header[0]).lower()] = bytes(header[1])
+        header[0].clear()
+        header[1].clear()
+    
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = disposition.get(b"name", b"").decode("latin-1")
+        part["file"] = b"filename" in disposition
+        if part["file"]:
+            events.append(("file", part["name"], part["headers"].get(b"content-type", b"").decode("latin-1")))
+    
+    def on_part_data(data, start, end):
+        if part["file"]:
+            events.append(("data", bytes(data[start:end])))
+        else:
+            part["value"].extend(data[start:end])
+    
+    def on_part_end():
+        if part["file"]:
+            events.append(("end",))
+        else:
+            events.append(("field", part["name"], part["value"].decode("utf-8", errors="replace")))
+    
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+    
+    size = 0
+    async for body_chunk in request.stream():
+        size += len(body_chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Document exceeds the {DOCUMENT_MAX_BYTES} byte limit")
+        parser.write(body_chunk)
+        for event in events:
+            yield event
+        events.clear()
+    
+    parser.finalize()
+    for event in events:
+        yield event
+
+
+async def iter_file_part(form: AsyncIterator[tuple]) -> AsyncIterator[bytes]:
+    """The bytes of the file part that `form` has just started"""
+    async for event in form:
+        if event[0] != "data":
+            return
+        yield event[1]
+
+
+async def hash_stored_document(upload_id: str) -> str:
+    """SHA-256 over the stored chunks, read back in order"""
+    hasher = hashlib.sha256()
+    expected_offset = 0
+    async for chunk in db.document_chunks.find({"uploadId": upload_id}, {"_id": 0}).sort("offset", 1):
+        if chunk["offset"] != expected_offset:
+            raise HTTPException(status_code=409, detail="Stored document is missing chunks")
+        hasher.update(chunk["data"])
+        expected_offset += len(chunk["data"])
+    return hasher.hexdigest()
+
+
+async def complete_document_upload(upload: dict, sha256: str, previous_upload_id: Optional[str]) -> dict:
+    """Attach a fully received upload to its profile and drop the replaced document"""
+    await db.document_uploads.update_one(
+        {"uploadId": upload["uploadId"]},
+        {"$set": {
+            "status": "complete",
+            "size": upload["received"],
+            "sha256": sha256,
+            "completedAt": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    
+    await db.profiles.update_one(
+        {"membershipId": upload["membershipId"]},
+        {"$set": {
+            "documentUploaded": True,
+            "documentData": "",
+            "documentUploadId": upload["uploadId"],
+            "documentType": upload["documentType"],
+            "documentContentType": upload["contentType"],
+            "documentSize": upload["received"],
+            "documentSha256": sha256,
+            "qrCodeEnabled": True,  # Enable QR code after document upload
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    
+    if previous_upload_id and previous_upload_id != upload["uploadId"]:
+        await delete_document_uploads([previous_upload_id])
+    
+    return {
+        "message": "Document uploaded successfully. QR code is now available.",
+        "qrCodeEnabled": True,
+        "uploadId": upload["uploadId"],
+        "size": upload["received"],
+        "sha256": sha256
+    }
+
+
+async def delete_document_uploads(upload_ids: list):
+    if upload_ids:
+        await db.document_chunks.delete_many({"uploadId": {"$in": upload_ids}})
+        await db.document_uploads.delete_many({"uploadId": {"$in": upload_ids}})
+
+
+async def purge_abandoned_uploads():
+    """Drop "uploading" sessions idle past DOCUMENT_UPLOAD_ABANDON_HOURS, with their chunks"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=DOCUMENT_UPLOAD_ABANDON_HOURS)).isoformat()
+    abandoned = await db.document_uploads.find(
+        {"status": "uploading", "updatedAt": {"$lt": cutoff}},
+        {"_id": 0, "uploadId": 1}
+    ).limit(DOCUMENT_PURGE_BATCH).to_list(DOCUMENT_PURGE_BATCH)
+    
+    await delete_document_uploads([upload["uploadId"] for upload in abandoned])
+    if abandoned:
+        logger.info(f"Purged {len(abandoned)} abandoned document uploads")
+
+
+async def get_active_document_upload(upload_id: str) -> dict:
+    upload = await db.document_uploads.find_one({"uploadId": upload_id}, {"_id": 0})
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if upload["status"] != "uploading":
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    
+    return upload
+
+
+# User - Upload Document
+@router.post("/document/upload")
+async def upload_document(doc: DocumentUpload):
+    # Check if profile exists and payment is confirmed
+    profile = await get_document_upload_profile(doc.membershipId)
+    
+    # Update profile with document
+    await db.profiles.update_one(
+        {"membershipId": doc.membershipId},
+        {"$set": {
+            "documentUploaded": True,
+            "documentData": doc.documentData,
+            "documentType": doc.documentType,
+            "qrCodeEnabled": True,  # Enable QR code after document upload
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }, "$unset": {"documentUploadId": ""}}
+    )
+    
+    # The inline document replaces any streamed one
+    if profile.get("documentUploadId"):
+        await delete_document_uploads([profile["documentUploadId"]])
+    
+    return {"message": "Document uploaded successfully. QR code is now available.", "qrCodeEnabled": True}
+
+
+# User - Upload Document (multipart, streamed)
+@router.post("/document/upload/file")
+async def upload_document_file(request: Request, background_tasks: BackgroundTasks):
+    """
+    multipart/form-data with membershipId and documentType fields, then the
+    document as a `file` part. The body is parsed as it arrives and the file
+    is stored chunk by chunk, so the size limit holds before anything is
+    buffered.
+    """
+    form = iter_multipart_form(request, DOCUMENT_MAX_BYTES + DOCUMENT_FORM_OVERHEAD)
+    fields = {}
+    async for event in form:
+        if event[0] == "field":
+            fields[event[1]] = event[2]
+        elif event[0] == "file" and event[1] == "file":
+            break
+    else:
+        raise HTTPException(status_code=400, detail="Missing the file part")
+    
+    if not fields.get("membershipId") or not fields.get("documentType"):
+        raise HTTPException(status_code=400, detail="membershipId and documentType must be sent before the file")
+    
+    profile = await get_document_upload_profile(fields["membershipId"])
+    enqueue_task(background_tasks, purge_abandoned_uploads)
+    
+    # The size is only known once streamed, so cap it at the global limit
+    upload = await create_document_upload(
+        fields["membershipId"],
+        fields["documentType"],
+        DOCUMENT_MAX_BYTES,
+        event[2] or "application/octet-stream"
+    )
+    
+    hasher = hashlib.sha256()
+    try:
+        received = await stream_document_chunks(upload, 0, iter_file_part(form), hasher)
+    except HTTPException:
+        await delete_document_uploads([upload["uploadId"]])
+        raise
+    
+    upload["received"] = received
+    return await complete_document_upload(upload, hasher.hexdigest(), profile.get("documentUploadId"))
+
+
+# User - Start Resumable Document Upload
+@router.post("/document/uploads")
+async def start_document_upload(start: DocumentUploadStart, background_tasks: BackgroundTasks):
+    await get_document_upload_profile(start.membershipId)
+    enqueue_task(background_tasks, purge_abandoned_uploads)
+    
+    upload = await create_document_upload(
+        start.membershipId,
+        start.documentType,
+        start.size,
+        start.contentType or "application/octet-stream"
+    )
+    
+    return {
+        "uploadId": upload["uploadId"],
+        "size": upload["size"],
+        "received": 0,
+        "chunkSize": DOCUMENT_CHUNK_SIZE
+    }
+
+
+# User - Resumable Document Upload Status
+@router.get("/document/uploads/{upload_id}")
+async def get_document_upload_status(upload_id: str):
+    upload = await db.document_uploads.find_one({"uploadId": upload_id}, {"_id": 0})
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return {
+        "uploadId": upload_id,
+        "status": upload["status"],
+        "size": upload["size"],
+        "received": upload["received"]
+    }
+
+
+# User - Append Bytes To Resumable Document Upload
+@router.put("/document/uploads/{upload_id}")
+async def append_document_upload(upload_id: str, offset: int, request: Request):
+    upload = await get_active_document_upload(upload_id)
+    
+    if offset != upload["received"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload offset mismatch. Resume from offset {upload['received']}"
+        )
+    
+    received = await stream_document_chunks(upload, offset, request.stream())
+    
+    return {"uploadId": upload_id, "size": upload["size"], "received": received}
+
+
+# User - Finish Resumable Document Upload
+@router.post("/document/uploads/{upload_id}/complete")
+async def finish_document_upload(upload_id: str):
+    upload = await get_active_document_upload(upload_id)
+    
+    if upload["received"] != upload["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: received {upload['received']} of {upload['size']} bytes"
+        )
+    
+    profile = await get_document_upload_profile(upload["membershipId"])
+    sha256 = await hash_stored_document(upload_id)
+    
+    return await complete_document_upload(upload, sha256, profile.get("documentUploadId"))
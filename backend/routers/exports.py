@@ -0,0 +1,196 @@
+"""
+Streaming admin exports of profiles, payment confirmations and site visits.
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timezone
+import csv
+import io
+import os
+
+from core import secondary_db, verify_admin
+
+router = APIRouter(prefix="/api")
+
+# Rows fetched per cursor batch, and written per CSV chunk / Parquet row group
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '2000'))
+
+# ============================================================================
+# EXPORTS - CSV / Parquet, streamed batch by batch
+# ============================================================================
+#
+# Each dataset lists its columns (name, Parquet type); only those fields are
+# projected, so photos and ID documents never leave the database. Memory use
+# is one cursor batch plus one encoded chunk, whatever the row count.
+
+EXPORTS = {
+    "profiles": {
+        "collection": "profiles",
+        "time_field": "createdAt",
+        "columns": [
+            ("membershipId", "string"), ("assignedMemberId", "string"), ("name", "string"),
+            ("email", "string"), ("paymentStatus", "string"), ("userStatus", "int64"),
+            ("documentUploaded", "bool"), ("qrCodeEnabled", "bool"),
+            ("createdAt", "string"), ("updatedAt", "string")
+        ]
+    },
+    "payments": {
+        "collection": "payment_confirmations",
+        "time_field": "submittedAt",
+        "columns": [
+            ("membershipId", "string"), ("name", "string"), ("email", "string"),
+            ("paymentMethod", "string"), ("amount", "string"), ("transactionId", "string"),
+            ("status", "string"), ("submittedAt", "string"), ("approvedAt", "string"),
+            ("rejectedAt", "string"), ("rejectionReason", "string")
+        ]
+    },
+    "visits": {
+        "collection": "site_visits",
+        "time_field": "timestamp",
+        "columns": [("timestamp", "string"), ("page", "string")]
+    }
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def export_batches(spec: dict, since: str, until: str):
+    """Yield lists of rows from the dataset's cursor, EXPORT_BATCH_SIZE at a time"""
+    query = {}
+    if since or until:
+        query[spec["time_field"]] = {
+            **({"$gte": since} if since else {}),
+            **({"$lt": until} if until else {})
+        }
+    
+    # Exports tolerate replication lag, so they read from secondaries
+    cursor = secondary_db[spec["collection"]].find(
+        query,
+        {"_id": 0, **{name: 1 for name, _ in spec["columns"]}}
+    ).batch_size(EXPORT_BATCH_SIZE)
+    
+    batch = []
+    async for row in cursor:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def neutralize_formulas(row: dict) -> dict:
+    """Member-entered text like "=HYPERLINK(...)" must not run when the CSV is opened in a spreadsheet"""
+    return {
+        key: f"'{value}" if isinstance(value, str) and value[:1] in ("=", "+", "-", "@") else value
+        for key, value in row.items()
+    }
+
+
+async def stream_csv(spec: dict, since: str, until: str):
+    names = [name for name, _ in spec["columns"]]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    
+    async for batch in export_batches(spec, since, until):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(neutralize_formulas(row) for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def coerce(value, arrow_type):
+    """Fit a loosely-typed Mongo value to its Parquet column, or null"""
+    if value is None:
+        return None
+    if str(arrow_type) == "bool":
+        return value if isinstance(value, bool) else None
+    if str(arrow_type) == "int64":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value)
+
+
+async def stream_parquet(spec: dict, since: str, until: str):
+    # pyarrow is only imported for Parquet exports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in spec["columns"]])
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    
+    def write_batch(batch):
+        # One row group per batch
+        table = pa.table({
+            field.name: pa.array([coerce(row.get(field.name), field.type) for row in batch], type=field.type)
+            for field in schema
+        }, schema=schema)
+        writer.write_table(table)
+        return sink.drain()
+    
+    try:
+        async for batch in export_batches(spec, since, until):
+            yield await run_in_threadpool(write_batch, batch)
+    finally:
+        # Footer; sent only if the export ran to the end
+        writer.close()
+    yield sink.drain()
+
+
+# Admin - Export Dataset
+@router.get("/admin/export/{dataset}")
+async def export_dataset(dataset: str, password: str, format: str = "csv", since: str = "", until: str = ""):
+    """
+    Stream a whole dataset (profiles, payments or visits) as CSV or Parquet.
+    `since`/`until` bound the dataset's timestamp (ISO, inclusive/exclusive).
+    """
+    verify_admin(password)
+    
+    spec = EXPORTS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export. Available: {', '.join(EXPORTS)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    stream = stream_csv if format == "csv" else stream_parquet
+    filename = f"{dataset}-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{format}"
+    
+    return StreamingResponse(
+        stream(spec, since, until),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,159 @@
+"""
+Profile photo pipeline and content-addressed image serving.
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime, timezone
+from io import BytesIO
+import base64
+import binascii
+import hashlib
+
+from core import db
+
+router = APIRouter(prefix="/api")
+
+# Profile photo pipeline
+PHOTO_THUMB_SIZE = (128, 128)  # Fixed-size square thumbnail (WebP) for search and listings
+PHOTO_DISPLAY_SIZE = (640, 640)  # Bounding box for the profile display image (JPEG)
+
+# ============================================================================
+# PROFILE PHOTOS - Image normalization and content-addressed storage
+# ============================================================================
+
+IMAGE_URL_PREFIX = "/api/images/"
+
+IMAGE_CONTENT_TYPES = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "svg": "image/svg+xml"
+}
+
+IMAGE_EXTENSIONS = {content_type: extension for extension, content_type in IMAGE_CONTENT_TYPES.items()}
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Decode a base64 image, with or without a data URL prefix"""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Photo is not valid base64 data")
+
+
+def parse_image_data(data: str) -> tuple:
+    """Decode a base64 image as-is, returning (extension, bytes)"""
+    from PIL import Image, UnidentifiedImageError
+    
+    raw = decode_base64_image(data)
+    
+    if data.startswith("data:"):
+        content_type = data[len("data:"):].split(";", 1)[0].split(",", 1)[0].lower()
+        extension = IMAGE_EXTENSIONS.get(content_type)
+    else:
+        try:
+            with Image.open(BytesIO(raw)) as image:
+                extension = IMAGE_EXTENSIONS.get(Image.MIME.get(image.format, ""))
+        except (UnidentifiedImageError, OSError):
+            extension = None
+    
+    if not extension:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    
+    return extension, raw
+
+
+def render_photo_variants(raw: bytes) -> dict:
+    """
+    Decode an uploaded photo once and render the thumbnail and display variants.
+    Re-encoding from pixel data drops EXIF/GPS and other metadata.
+    """
+    # Pillow is only needed once a photo is uploaded
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    
+    try:
+        with Image.open(BytesIO(raw)) as source:
+            # Apply the camera orientation before the EXIF block is discarded
+            image = ImageOps.exif_transpose(source).convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail="Photo is not a supported image")
+    
+    thumb = ImageOps.fit(image, PHOTO_THUMB_SIZE, Image.LANCZOS)
+    thumb_buffer = BytesIO()
+    thumb.save(thumb_buffer, format="WEBP", quality=80, method=4)
+    
+    display = image.copy()
+    display.thumbnail(PHOTO_DISPLAY_SIZE, Image.LANCZOS)
+    display_buffer = BytesIO()
+    display.save(display_buffer, format="JPEG", quality=85, optimize=True, progressive=True)
+    
+    return {
+        "thumb": ("webp", thumb_buffer.getvalue()),
+        "display": ("jpg", display_buffer.getvalue())
+    }
+
+
+async def store_image_blob(extension: str, data: bytes) -> str:
+    """Store an image under its content hash and return its URL"""
+    image_key = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+    
+    # Identical images share one document
+    await db.image_blobs.update_one(
+        {"_id": image_key},
+        {"$setOnInsert": {
+            "contentType": IMAGE_CONTENT_TYPES[extension],
+            "size": len(data),
+            "data": data,
+            "createdAt": datetime.now(timezone.utc).isoformat()
+        }},
+        upsert=True
+    )
+    
+    return f"{IMAGE_URL_PREFIX}{image_key}"
+
+
+async def process_profile_photo(photo: Optional[str]) -> Optional[dict]:
+    """
+    Normalize an uploaded profile photo into stored thumbnail and display images.
+    Returns the profile fields to set, or None when the photo is an
+    already-processed image URL that should be left unchanged.
+    """
+    if not photo:
+        return {"photo": "", "photoThumb": ""}
+    
+    if photo.startswith(IMAGE_URL_PREFIX):
+        return None
+    
+    raw = decode_base64_image(photo)
+    variants = await run_in_threadpool(render_photo_variants, raw)
+    
+    return {
+        "photo": await store_image_blob(*variants["display"]),
+        "photoThumb": await store_image_blob(*variants["thumb"])
+    }
+
+
+@router.get("/images/{image_key}")
+async def get_image(image_key: str):
+    """Serve a stored image (public, immutable - the URL changes when the image does)"""
+    image = await db.image_blobs.find_one({"_id": image_key})
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    return Response(
+        content=image["data"],
+        media_type=image["contentType"],
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": f'"{image_key.split(".")[0]}"',
+            # Uploaded SVGs must never run script on our origin
+            "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+            "X-Content-Type-Options": "nosniff"
+        }
+    )
@@ -0,0 +1,356 @@
+"""
+Member payment submission and PayPal order/subscription verification.
+"""
+
+from fastapi import APIRouter, HTTPException, BackgroundTasks
+from datetime import datetime, timezone
+import os
+
+from core import db, generate_unique_member_id, logger
+from metrics import enqueue_task, track_outbound
+from models import PaymentConfirmation
+from notifications import send_admin_payment_notification, send_sms_to_admins, send_user_approval_notification
+from revenue import normalize_amount
+from routers.verification import clear_qr_revocation
+
+router = APIRouter(prefix="/api")
+
+# PayPal Configuration
+PAYPAL_CLIENT_ID = os.environ.get('PAYPAL_CLIENT_ID', '')
+PAYPAL_SECRET = os.environ.get('PAYPAL_SECRET', '')
+PAYPAL_MODE = os.environ.get('PAYPAL_MODE', 'live')  # 'sandbox' or 'live'
+PAYPAL_PLAN_ID_39 = os.environ.get('PAYPAL_PLAN_ID_39', '')  # Subscription plan for $39
+PAYPAL_PLAN_ID_69 = os.environ.get('PAYPAL_PLAN_ID_69', '')  # Subscription plan for $69
+
+# Payment Confirmation - User submits (MANUAL APPROVAL - No auto-approve)
+@router.post("/payment/confirm")
+async def confirm_payment(payment: PaymentConfirmation, background_tasks: BackgroundTasks):
+    # Check if profile exists
+    profile = await db.profiles.find_one({"membershipId": payment.membershipId})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    # Create payment confirmation record
+    confirmation = {
+        "membershipId": payment.membershipId,
+        "name": profile.get("name", "Unknown"),
+        "email": profile.get("email", ""),
+        "paymentMethod": payment.paymentMethod,
+        "amount": payment.amount,
+        **normalize_amount(payment.amount),
+        "transactionId": payment.transactionId,
+        "notes": payment.notes,
+        "status": "pending",  # Remains pending until admin approves
+        "submittedAt": datetime.now(timezone.utc).isoformat()
+    }
+    
+    await db.payment_confirmations.insert_one(confirmation)
+    
+    # Update profile to indicate payment submitted but pending approval
+    await db.profiles.update_one(
+        {"membershipId": payment.membershipId},
+        {"$set": {
+            "userStatus": 1,  # Status 1: Pending Payment Approval
+            "paymentStatus": "pending", 
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    
+    # Send admin notification email in background
+    enqueue_task(
+        background_tasks,
+        send_admin_payment_notification,
+        profile.get("name", "Unknown"),
+        profile.get("email", ""),
+        payment.membershipId,
+        payment.paymentMethod,
+        payment.amount,
+        payment.transactionId or "",
+        payment.notes or ""
+    )
+    
+    # Send SMS to all admins
+    sms_message = f"🔔 Clean Check: New payment from {profile.get('name', 'Unknown')} - ${payment.amount} via {payment.paymentMethod}. Login to admin panel to approve."
+    enqueue_task(background_tasks, send_sms_to_admins, sms_message)
+    
+    return {"message": "Payment confirmation submitted! Admin will review and approve shortly.", "status": "pending"}
+
+# ============================================================================
+# PAYPAL AUTOMATED PAYMENT VERIFICATION
+# ============================================================================
+
+@router.post("/payment/paypal/verify")
+async def verify_paypal_payment(order_data: dict, background_tasks: BackgroundTasks):
+    """
+    Verify PayPal payment and automatically approve user
+    This endpoint is called from frontend after PayPal onApprove
+    """
+    try:
+        order_id = order_data.get('orderID')
+        membership_id = order_data.get('membershipId')
+        
+        if not order_id or not membership_id:
+            raise HTTPException(status_code=400, detail="Missing orderID or membershipId")
+        
+        # Get profile
+        profile = await db.profiles.find_one({"membershipId": membership_id})
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        
+        # Verify payment with PayPal API
+        logger.info(f"Verifying PayPal payment: Order ID={order_id}, Membership ID={membership_id}")
+        
+        # Use PayPal API to verify the order
+        import base64
+        auth_string = f"{PAYPAL_CLIENT_ID}:{PAYPAL_SECRET}"
+        auth_bytes = auth_string.encode('utf-8')
+        auth_b64 = base64.b64encode(auth_bytes).decode('utf-8')
+        
+        # Get PayPal API URL based on mode
+        api_url = "https://api-m.paypal.com" if PAYPAL_MODE == "live" else "https://api-m.sandbox.paypal.com"
+        
+        # Get order details from PayPal
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {auth_b64}"
+        }
+        
+        import requests
+        with track_outbound("paypal", "get_order") as call:
+            response = requests.get(f"{api_url}/v2/checkout/orders/{order_id}", headers=headers)
+            if response.status_code != 200:
+                call["outcome"] = "failure"
+        
+        if response.status_code != 200:
+            logger.error(f"PayPal API error: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=400, detail="Failed to verify payment with PayPal")
+        
+        order_details = response.json()
+        logger.info(f"PayPal order details: {order_details}")
+        
+        # Verify payment status
+        payment_status = order_details.get('status')
+        if payment_status != 'COMPLETED':
+            logger.warning(f"Payment not completed. Status: {payment_status}")
+            raise HTTPException(status_code=400, detail=f"Payment not completed. Status: {payment_status}")
+        
+        # Verify payment amount
+        purchase_units = order_details.get('purchase_units', [])
+        if not purchase_units:
+            raise HTTPException(status_code=400, detail="No purchase units in order")
+        
+        amount_paid = float(purchase_units[0].get('amount', {}).get('value', '0'))
+        currency = purchase_units[0].get('amount', {}).get('currency_code', 'USD')
+        
+        # Accept both $39 (single) and $69 (joint) memberships
+        valid_amounts = [39.0, 69.0]
+        if amount_paid not in valid_amounts:
+            logger.warning(f"Invalid payment amount: ${amount_paid}")
+            raise HTTPException(status_code=400, detail=f"Invalid payment amount: ${amount_paid}. Expected $39 or $69")
+        
+        logger.info(f"Payment verified: ${amount_paid} {currency}")
+        
+        # Generate unique Member ID
+        assigned_member_id = await generate_unique_member_id()
+        
+        # Update profile to Approved status
+        await db.profiles.update_one(
+            {"membershipId": membership_id},
+            {"$set": {
+                "userStatus": 3,  # Status 3: Approved
+                "paymentStatus": "confirmed",
+                "assignedMemberId": assigned_member_id,
+                "qrCodeEnabled": True,
+                "paymentAmount": amount_paid,
+                "paypalOrderId": order_id,
+                "updatedAt": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        
+        # Re-approved members come off the QR revocation list
+        await clear_qr_revocation(membership_id)
+        
+        # Record payment confirmation
+        await db.payment_confirmations.insert_one({
+            "membershipId": membership_id,
+            "name": profile.get("name", "Unknown"),
+            "email": profile.get("email", ""),
+            "paymentMethod": "PayPal (Automated)",
+            "amount": f"${amount_paid}",
+            **normalize_amount(amount_paid, currency),
+            "transactionId": order_id,
+            "status": "approved",
+            "submittedAt": datetime.now(timezone.utc).isoformat(),
+            "approvedAt": datetime.now(timezone.utc).isoformat(),
+            "automated": True
+        })
+        
+        # Send welcome email to user
+        enqueue_task(
+            background_tasks,
+            send_user_approval_notification,
+            profile.get("name", "Member"),
+            profile.get("email", ""),
+            assigned_member_id
+        )
+        
+        logger.info(f"User auto-approved: {membership_id} - Member ID: {assigned_member_id}")
+        
+        return {
+            "success": True,
+            "message": "Payment verified and account activated!",
+            "membershipId": membership_id,
+            "assignedMemberId": assigned_member_id,
+            "amount": amount_paid,
+            "status": "active"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Payment verification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Payment verification failed: {str(e)}")
+
+@router.get("/payment/paypal/client-id")
+async def get_paypal_client_id():
+    """Return PayPal Client ID for frontend SDK"""
+    if not PAYPAL_CLIENT_ID:
+        raise HTTPException(status_code=500, detail="PayPal not configured")
+    return {"clientId": PAYPAL_CLIENT_ID}
+
+
+@router.get("/payment/paypal/subscription-plans")
+async def get_subscription_plans():
+    """Return PayPal subscription plan IDs for recurring billing"""
+    if not PAYPAL_CLIENT_ID:
+        raise HTTPException(status_code=500, detail="PayPal not configured")
+    
+    return {
+        "clientId": PAYPAL_CLIENT_ID,
+        "plans": {
+            "39": PAYPAL_PLAN_ID_39 or "CREATE_MANUAL",  # Will need manual setup
+            "69": PAYPAL_PLAN_ID_69 or "CREATE_MANUAL"
+        }
+    }
+
+@router.post("/payment/paypal/subscription/verify")
+async def verify_paypal_subscription(subscription_data: dict, background_tasks: BackgroundTasks):
+    """
+    Verify PayPal subscription and automatically approve user
+    This endpoint is called from frontend after subscription approval
+    """
+    try:
+        subscription_id = subscription_data.get('subscriptionID')
+        membership_id = subscription_data.get('membershipId')
+        amount = subscription_data.get('amount', 39)
+        
+        if not subscription_id or not membership_id:
+            raise HTTPException(status_code=400, detail="Missing subscriptionID or membershipId")
+        
+        # Get profile
+        profile = await db.profiles.find_one({"membershipId": membership_id})
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        
+        # Verify subscription with PayPal API
+        logger.info(f"Verifying PayPal subscription: Subscription ID={subscription_id}, Membership ID={membership_id}")
+        
+        # Use PayPal API to verify the subscription
+        import base64
+        auth_string = f"{PAYPAL_CLIENT_ID}:{PAYPAL_SECRET}"
+        auth_bytes = auth_string.encode('utf-8')
+        auth_b64 = base64.b64encode(auth_bytes).decode('utf-8')
+        
+        # Get PayPal API URL based on mode
+        api_url = "https://api-m.paypal.com" if PAYPAL_MODE == "live" else "https://api-m.sandbox.paypal.com"
+        
+        # Get subscription details from PayPal
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {auth_b64}"
+        }
+        
+        import requests
+        with track_outbound("paypal", "get_subscription") as call:
+            response = requests.get(f"{api_url}/v1/billing/subscriptions/{subscription_id}", headers=headers)
+            if response.status_code != 200:
+                call["outcome"] = "failure"
+        
+        if response.status_code != 200:
+            logger.error(f"PayPal API error: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=400, detail="Failed to verify subscription with PayPal")
+        
+        subscription_details = response.json()
+        logger.info(f"PayPal subscription details: {subscription_details}")
+        
+        # Verify subscription status
+        subscription_status = subscription_details.get('status')
+        if subscription_status not in ['ACTIVE', 'APPROVED']:
+            logger.warning(f"Subscription not active. Status: {subscription_status}")
+            raise HTTPException(status_code=400, detail=f"Subscription not active. Status: {subscription_status}")
+        
+        logger.info(f"Subscription verified: {subscription_status}")
+        
+        # Generate unique Member ID
+        assigned_member_id = await generate_unique_member_id()
+        
+        # Update profile to Approved status
+        await db.profiles.update_one(
+            {"membershipId": membership_id},
+            {"$set": {
+                "userStatus": 3,  # Status 3: Approved
+                "paymentStatus": "confirmed",
+                "assignedMemberId": assigned_member_id,
+                "qrCodeEnabled": True,
+                "paymentAmount": amount,
+                "paypalSubscriptionId": subscription_id,
+                "subscriptionStatus": subscription_status,
+                "updatedAt": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        
+        # Re-approved members come off the QR revocation list
+        await clear_qr_revocation(membership_id)
+        
+        # Record payment confirmation
+        await db.payment_confirmations.insert_one({
+            "membershipId": membership_id,
+            "name": profile.get("name", "Unknown"),
+            "email": profile.get("email", ""),
+            "paymentMethod": "PayPal Subscription (Automated)",
+            "amount": f"${amount}",
+            **normalize_amount(amount),
+            "transactionId": subscription_id,
+            "status": "approved",
+            "submittedAt": datetime.now(timezone.utc).isoformat(),
+            "approvedAt": datetime.now(timezone.utc).isoformat(),
+            "automated": True,
+            "recurring": True
+        })
+        
+        # Send welcome email to user
+        enqueue_task(
+            background_tasks,
+            send_user_approval_notification,
+            profile.get("name", "Member"),
+            profile.get("email", ""),
+            assigned_member_id
+        )
+        
+        logger.info(f"User auto-approved with subscription: {membership_id} - Member ID: {assigned_member_id}")
+        
+        return {
+            "success": True,
+            "message": "Subscription activated! Your account is now active!",
+            "membershipId": membership_id,
+            "assignedMemberId": assigned_member_id,
+            "amount": amount,
+            "status": "active",
+            "subscriptionId": subscription_id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Subscription verification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Subscription verification failed: {str(e)}")
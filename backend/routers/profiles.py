@@ -0,0 +1,383 @@
+"""
+Member profiles, status, search and references.
+"""
+
+from fastapi import APIRouter, HTTPException, BackgroundTasks
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import List
+from datetime import datetime, timezone
+import asyncio
+import os
+import uuid
+
+from change_feed import ChangeFeed, ChangeFeedUnavailable
+from core import db, logger, normalize_email, secondary_db
+from metrics import enqueue_task
+from models import ProfileCreate, ReferenceAdd, ReferenceBatchAdd, ReferenceBatchRemove
+from notifications import send_welcome_email
+from routers.images import process_profile_photo
+
+router = APIRouter(prefix="/api")
+
+# Status long-poll for the waiting-for-approval screen
+STATUS_WAIT_DEFAULT_SECONDS = 25  # Under the usual 30s proxy idle timeout
+STATUS_WAIT_MAX_SECONDS = 55
+STATUS_WAIT_FALLBACK_SECONDS = float(os.environ.get('STATUS_WAIT_FALLBACK_SECONDS', '5'))  # Hold time without change streams
+
+STATUS_FIELDS = ("paymentStatus", "userStatus", "documentUploaded", "qrCodeEnabled")
+
+async def load_profile_status(membership_id: str) -> dict:
+    profile = await db.profiles.find_one(
+        {"membershipId": membership_id},
+        {"_id": 0, "paymentStatus": 1, "userStatus": 1, "documentUploaded": 1, "qrCodeEnabled": 1}
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return {
+        "paymentStatus": profile.get("paymentStatus", "pending"),
+        "userStatus": profile.get("userStatus", 1),
+        "documentUploaded": profile.get("documentUploaded", False),
+        "qrCodeEnabled": profile.get("qrCodeEnabled", False)
+    }
+
+# User - Get Profile Status
+@router.get("/profile/status/{membership_id}")
+async def get_profile_status(membership_id: str):
+    return await load_profile_status(membership_id)
+
+# One change stream per worker for every waiting member: status-field updates
+# on profiles, looked up to find the membershipId and routed to its waiters
+status_feed = ChangeFeed(
+    "member-status",
+    [
+        {"$match": {"operationType": "update", "$or": [
+            {f"updateDescription.updatedFields.{field}": {"$exists": True}} for field in STATUS_FIELDS
+        ]}},
+        {"$project": {"fullDocument.membershipId": 1}}
+    ],
+    collection="profiles",
+    full_document="updateLookup",
+    key=lambda change: (change.get("fullDocument") or {}).get("membershipId"),
+    replay_size=0,
+    queue_size=10
+)
+
+# User - Wait for Profile Status Change (long-poll)
+@router.get("/profile/status/{membership_id}/wait")
+async def wait_for_profile_status(membership_id: str, paymentStatus: str = "", timeout: float = STATUS_WAIT_DEFAULT_SECONDS):
+    """
+    Hold the request until this profile's status changes or `timeout` passes,
+    then return the current status with "changed". Pass the paymentStatus the
+    client already has; if it is already out of date the answer is immediate.
+    """
+    timeout = min(max(timeout, 0), STATUS_WAIT_MAX_SECONDS)
+    
+    try:
+        # Subscribe before reading, so a change between the two still wakes us
+        subscription = await status_feed.subscribe(db, key=membership_id)
+    except ChangeFeedUnavailable:
+        subscription = None
+    
+    try:
+        status = await load_profile_status(membership_id)
+        if paymentStatus and status["paymentStatus"] != paymentStatus:
+            return {**status, "changed": True}
+        
+        if subscription is None:
+            # No change streams (standalone mongod): hold briefly, then re-read,
+            # which still spaces out the client's polls
+            await asyncio.sleep(min(timeout, STATUS_WAIT_FALLBACK_SECONDS))
+            current = await load_profile_status(membership_id)
+            return {**current, "changed": current != status}
+        
+        try:
+            await asyncio.wait_for(subscription.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return {**status, "changed": False}
+        
+        # Woken by an update to a status field (userStatus included)
+        return {**await load_profile_status(membership_id), "changed": True}
+    finally:
+        if subscription is not None:
+            status_feed.unsubscribe(subscription)
+
+# Search Active Members (for references)
+@router.get("/members/search")
+async def search_active_members(search: str = "", limit: int = 10):
+    """
+    Search for active members (confirmed payment status) for references
+    """
+    query = {
+        "paymentStatus": "confirmed",  # Only active/paid members
+        "$or": [
+            {"name": {"$regex": search, "$options": "i"}},
+            {"membershipId": {"$regex": search, "$options": "i"}}
+        ]
+    } if search else {"paymentStatus": "confirmed"}
+    
+    members = await secondary_db.profiles.find(
+        query, 
+        {"_id": 0, "name": 1, "membershipId": 1, "photoThumb": 1}
+    ).limit(limit).to_list(limit)
+    
+    # Search results only ever carry the thumbnail URL
+    return [
+        {"name": member.get("name"), "membershipId": member.get("membershipId"), "photo": member.get("photoThumb", "")}
+        for member in members
+    ]
+
+async def find_profile_by_email(email: str):
+    projection = {"_id": 0, "membershipId": 1, "name": 1, "email": 1, "photo": 1}
+    profile = await db.profiles.find_one({"emailNormalized": normalize_email(email)}, projection)
+    if profile is None:
+        # Profiles from before emailNormalized, until scripts/dedupe_profiles.py backfills them
+        profile = await db.profiles.find_one({"email": email, "emailNormalized": {"$exists": False}}, projection)
+    return profile
+
+@router.post("/profiles")
+async def create_or_update_profile(profile: ProfileCreate, background_tasks: BackgroundTasks):
+    """
+    Create a new profile with auto-generated membership ID, or return the
+    existing membership when this email has already signed up
+    """
+    # Repeat sign-ups skip the photo pipeline entirely
+    existing = await find_profile_by_email(profile.email)
+    if existing:
+        return {**existing, "existing": True}
+    
+    membership_id = str(uuid.uuid4())
+    
+    photo_fields = await process_profile_photo(profile.photo) or {"photo": "", "photoThumb": ""}
+    
+    profile_doc = {
+        "membershipId": membership_id,
+        "name": profile.name,
+        "email": profile.email,
+        "emailNormalized": normalize_email(profile.email),
+        **photo_fields,
+        "paymentStatus": "pending",
+        "documentUploaded": False,
+        "qrCodeEnabled": False,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "updatedAt": datetime.now(timezone.utc).isoformat()
+    }
+    
+    # Upsert on the unique emailNormalized index: of two concurrent sign-ups
+    # one inserts and the other gets that membership back
+    try:
+        stored = await db.profiles.find_one_and_update(
+            {"emailNormalized": profile_doc["emailNormalized"]},
+            {"$setOnInsert": profile_doc},
+            upsert=True,
+            projection={"_id": 0, "membershipId": 1, "name": 1, "email": 1, "photo": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Both upserts tried to insert; the loser reads the winner's row
+        stored = await find_profile_by_email(profile.email)
+    
+    if stored["membershipId"] != membership_id:
+        return {**stored, "existing": True}
+    
+    # Send welcome email in background
+    enqueue_task(background_tasks, send_welcome_email, profile.email, profile.name, membership_id)
+    
+    return {
+        "membershipId": membership_id,
+        "name": profile.name,
+        "email": profile.email,
+        "photo": photo_fields["photo"],
+        "existing": False
+    }
+
+@router.get("/profiles/{membership_id}")
+async def get_profile(membership_id: str):
+    """
+    Get profile by membership ID
+    """
+    profile = await db.profiles.find_one({"membershipId": membership_id}, {"_id": 0})
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    profile["references"] = await get_profile_references(membership_id)
+    
+    return profile
+
+@router.put("/profiles/{membership_id}")
+async def update_profile(membership_id: str, profile: ProfileCreate, background_tasks: BackgroundTasks):
+    """
+    Update profile name and photo
+    """
+    existing = await db.profiles.find_one({"membershipId": membership_id}, {"_id": 0, "name": 1})
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    update_data = {
+        "name": profile.name,
+        "updatedAt": datetime.now(timezone.utc).isoformat()
+    }
+    
+    # Only re-process the photo when a new one was uploaded
+    photo_fields = await process_profile_photo(profile.photo)
+    if photo_fields is not None:
+        update_data.update(photo_fields)
+    
+    await db.profiles.update_one(
+        {"membershipId": membership_id},
+        {"$set": update_data}
+    )
+    
+    # Other members' references carry a copy of this name
+    if existing.get("name") != profile.name:
+        enqueue_task(background_tasks, refresh_reference_names, membership_id, profile.name)
+    
+    return {"message": "Profile updated", "membershipId": membership_id}
+
+# ============================================================================
+# REFERENCES - Edge collection
+# ============================================================================
+#
+# Each reference is one document in `references`:
+#   {"fromId": owner membershipId, "toId": referenced membershipId, "name", "addedOn"}
+# A unique (fromId, toId) index keeps adds idempotent and a (toId, fromId)
+# index answers "who references me" without scanning profiles.
+
+async def get_profile_references(membership_id: str) -> List[dict]:
+    """References a member has added, in the embedded-array shape clients expect"""
+    edges = await db.references.find(
+        {"fromId": membership_id},
+        {"_id": 0, "toId": 1, "name": 1, "addedOn": 1}
+    ).sort("addedOn", 1).to_list(None)
+    
+    return [
+        {"membershipId": edge["toId"], "name": edge.get("name", ""), "addedOn": edge.get("addedOn", "")}
+        for edge in edges
+    ]
+
+
+async def refresh_reference_names(membership_id: str, name: str):
+    """Fan a renamed member's new name out to every reference pointing at them"""
+    try:
+        # Served by the (toId, fromId) reverse index - no profile scan
+        result = await db.references.update_many(
+            {"toId": membership_id, "name": {"$ne": name}},
+            {"$set": {"name": name}}
+        )
+        logger.info(f"Refreshed {result.modified_count} reference names for {membership_id}")
+    except Exception as e:
+        logger.error(f"Failed to refresh reference names for {membership_id}: {str(e)}")
+
+
+async def add_references(membership_id: str, reference_ids: List[str]) -> dict:
+    """
+    Add many references with one profile lookup and one bulk write.
+    Names are taken from the referenced profiles, never from the client.
+    """
+    reference_ids = list(dict.fromkeys(ref_id for ref_id in reference_ids if ref_id != membership_id))
+    
+    profiles = await db.profiles.find(
+        {"membershipId": {"$in": [membership_id, *reference_ids]}},
+        {"_id": 0, "membershipId": 1, "name": 1}
+    ).to_list(None)
+    names = {profile["membershipId"]: profile.get("name", "") for profile in profiles}
+    
+    if membership_id not in names:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    found_ids = [ref_id for ref_id in reference_ids if ref_id in names]
+    added_on = datetime.now(timezone.utc).isoformat()
+    
+    added = []
+    if found_ids:
+        # Each upsert is conditional on the edge not existing, so the
+        # upserted indexes are exactly the references this call inserted
+        try:
+            result = await db.references.bulk_write([
+                UpdateOne(
+                    {"fromId": membership_id, "toId": ref_id},
+                    {"$setOnInsert": {"name": names[ref_id], "addedOn": added_on}},
+                    upsert=True
+                )
+                for ref_id in found_ids
+            ], ordered=False)
+            upserted_indexes = list(result.upserted_ids)
+        except BulkWriteError as e:
+            # A concurrent add of the same edge loses the race on the unique
+            # index; that reference simply already exists
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            upserted_indexes = [upsert["index"] for upsert in e.details.get("upserted", [])]
+        added = [found_ids[index] for index in upserted_indexes]
+    
+    return {
+        "added": [{"membershipId": ref_id, "name": names[ref_id], "addedOn": added_on} for ref_id in added],
+        "alreadyExists": [ref_id for ref_id in found_ids if ref_id not in added],
+        "notFound": [ref_id for ref_id in reference_ids if ref_id not in names]
+    }
+
+
+@router.post("/profiles/{membership_id}/references")
+async def add_reference(membership_id: str, reference: ReferenceAdd):
+    """
+    Add a reference to user's profile
+    """
+    if reference.membershipId == membership_id:
+        raise HTTPException(status_code=400, detail="Cannot add yourself as a reference")
+    
+    result = await add_references(membership_id, [reference.membershipId])
+    
+    if result["notFound"]:
+        raise HTTPException(status_code=404, detail="Referenced profile not found")
+    
+    if result["alreadyExists"]:
+        raise HTTPException(status_code=400, detail="Reference already exists")
+    
+    return {"message": "Reference added", "inserted": True, "reference": result["added"][0]}
+
+@router.post("/profiles/{membership_id}/references/batch")
+async def add_references_batch(membership_id: str, batch: ReferenceBatchAdd):
+    """
+    Add up to 100 references in one request
+    """
+    result = await add_references(membership_id, batch.membershipIds)
+    
+    return {"message": f"{len(result['added'])} references added", **result}
+
+@router.delete("/profiles/{membership_id}/references/{ref_id}")
+async def remove_reference(membership_id: str, ref_id: str):
+    """
+    Remove a reference from user's profile
+    """
+    # A single conditional delete; the deleted count tells us whether it existed.
+    # Admin stats count the edge collection, so there is nothing else to update.
+    result = await db.references.delete_one({"fromId": membership_id, "toId": ref_id})
+    
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Reference not found")
+    
+    return {"message": "Reference removed", "membershipId": ref_id}
+
+@router.post("/profiles/{membership_id}/references/remove")
+async def remove_references_batch(membership_id: str, batch: ReferenceBatchRemove):
+    """
+    Remove up to 100 references in one request
+    """
+    result = await db.references.delete_many({"fromId": membership_id, "toId": {"$in": batch.membershipIds}})
+    
+    return {"message": f"{result.deleted_count} references removed", "removed": result.deleted_count}
+
+@router.get("/profiles/{membership_id}/referenced-by")
+async def get_referenced_by(membership_id: str, limit: int = 100, skip: int = 0):
+    """
+    Members who list this member as a reference (reverse index lookup)
+    """
+    edges = await db.references.find(
+        {"toId": membership_id},
+        {"_id": 0, "fromId": 1, "addedOn": 1}
+    ).sort("fromId", 1).skip(skip).limit(limit).to_list(limit)
+    
+    return [{"membershipId": edge["fromId"], "addedOn": edge.get("addedOn", "")} for edge in edges]
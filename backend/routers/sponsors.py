@@ -0,0 +1,89 @@
+"""
+Sponsor logos for the landing page. Uploads and removals are admin routes
+(routers/admin.py), which update this cache and notify the other workers.
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse, Response
+from typing import Optional
+from datetime import datetime, timezone
+import hashlib
+import json as json_lib
+
+from coordination import SPONSOR_LOGO_UPDATED, ExpiringCache
+from core import bus, db
+from routers.images import parse_image_data, store_image_blob
+
+router = APIRouter(prefix="/api")
+
+# ============================================================================
+# SPONSOR LOGOS
+# ============================================================================
+
+def build_sponsor_logo_cache(logos: dict) -> dict:
+    body = json_lib.dumps(logos, sort_keys=True).encode("utf-8")
+    return {"logos": logos, "etag": f'"{hashlib.sha256(body).hexdigest()[:16]}"'}
+
+
+async def store_sponsor_logo(slot: int, logo_data: str) -> str:
+    """Store a logo content-addressed and point the slot at its URL"""
+    logo_url = await store_image_blob(*parse_image_data(logo_data))
+    
+    await db.sponsors.update_one(
+        {"slot": slot},
+        {"$set": {
+            "logoUrl": logo_url,
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }, "$unset": {"logo": ""}},
+        upsert=True
+    )
+    
+    return logo_url
+
+
+async def load_sponsor_logos() -> dict:
+    logos = {1: None, 2: None, 3: None}
+    async for sponsor in db.sponsors.find({}, {"_id": 0}):
+        logo_url = sponsor.get("logoUrl")
+        if not logo_url and sponsor.get("logo"):
+            # Legacy rows still hold the raw base64 logo
+            logo_url = await store_sponsor_logo(sponsor["slot"], sponsor["logo"])
+        logos[sponsor.get("slot")] = logo_url
+    return build_sponsor_logo_cache(logos)
+
+
+# Write-through cache of slot -> logo URL so the landing page never hits Mongo;
+# reloaded after the TTL in case a peer's update event was missed
+_sponsor_logo_cache = ExpiringCache(load_sponsor_logos)
+
+
+async def get_sponsor_logo_cache() -> dict:
+    return await _sponsor_logo_cache.get()
+
+
+async def set_cached_sponsor_logo(slot: int, logo_url: Optional[str]):
+    logos = dict((await get_sponsor_logo_cache())["logos"])
+    logos[slot] = logo_url
+    _sponsor_logo_cache.replace(build_sponsor_logo_cache(logos))
+
+
+async def on_sponsor_logo_updated(payload: dict):
+    """Another worker changed a slot; nothing cached yet means the next request loads fresh rows"""
+    if _sponsor_logo_cache.loaded:
+        await set_cached_sponsor_logo(payload["slot"], payload.get("logoUrl"))
+
+
+bus.subscribe(SPONSOR_LOGO_UPDATED, on_sponsor_logo_updated)
+
+
+@router.get("/sponsors")
+async def get_sponsor_logos(request: Request):
+    """Get all sponsor logo URLs by slot (public endpoint)"""
+    cache = await get_sponsor_logo_cache()
+    
+    # Clients revalidate every time, but unchanged logos cost a 304
+    headers = {"ETag": cache["etag"], "Cache-Control": "public, no-cache"}
+    if request.headers.get("if-none-match") == cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse(content=cache["logos"], headers=headers)
@@ -0,0 +1,230 @@
+"""
+Trust-network queries over the reference graph.
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional, Tuple
+
+from core import db
+
+router = APIRouter(prefix="/api")
+
+# Trust-network traversal bounds
+TRUST_MAX_DEPTH = 4  # Neighborhood radius limit
+TRUST_MAX_PATH_LENGTH = 6  # Longest path searched between two members
+TRUST_MAX_NODES = 500  # Neighborhood size limit
+TRUST_MAX_EDGES_PER_LEVEL = 5000  # Edges fetched per direction per BFS level
+TRUST_MAX_VISITED = 5000  # Members a path search may visit (both sides together)
+
+# ============================================================================
+# TRUST NETWORK - Bounded traversal over the reference graph
+# ============================================================================
+#
+# Traversal is level-synchronous: each BFS level is one indexed `$in` query on
+# the references collection (fromId index for outgoing, toId index for
+# incoming), so a depth-3 neighborhood costs at most three round trips
+# instead of one profile fetch per member.
+#
+# Both endpoints are public, so the work per request is capped: each level
+# fetches at most TRUST_MAX_EDGES_PER_LEVEL edges per direction, and a path
+# search stops after visiting TRUST_MAX_VISITED members. A capped
+# neighborhood is reported as truncated, a capped path search as
+# inconclusive (neither connected nor proven disconnected).
+
+TRUST_DIRECTIONS = {"out": "in", "in": "out", "both": "both"}  # direction -> reverse
+
+
+async def get_reference_edges(frontier: List[str], direction: str) -> Tuple[List[tuple], bool]:
+    """
+    (fromId, toId) edges touching the frontier in the given direction, and
+    whether they are all of them (False when TRUST_MAX_EDGES_PER_LEVEL cut the fetch)
+    """
+    edges = []
+    complete = True
+    projection = {"_id": 0, "fromId": 1, "toId": 1}  # Covered by the edge indexes
+    
+    queries = []
+    if direction in ("out", "both"):
+        queries.append({"fromId": {"$in": frontier}})
+    if direction in ("in", "both"):
+        queries.append({"toId": {"$in": frontier}})
+    
+    for query in queries:
+        fetched = await db.references.find(query, projection).limit(TRUST_MAX_EDGES_PER_LEVEL + 1).to_list(None)
+        if len(fetched) > TRUST_MAX_EDGES_PER_LEVEL:
+            complete = False
+            fetched = fetched[:TRUST_MAX_EDGES_PER_LEVEL]
+        edges.extend((edge["fromId"], edge["toId"]) for edge in fetched)
+    
+    return edges, complete
+
+
+async def expand_frontier(frontier: List[str], direction: str) -> Tuple[List[tuple], bool]:
+    """(node, neighbor, edge) steps from each frontier node, honoring edge direction; plus completeness"""
+    frontier_set = set(frontier)
+    steps = []
+    edges, complete = await get_reference_edges(frontier, direction)
+    for edge in edges:
+        from_id, to_id = edge
+        if direction in ("out", "both") and from_id in frontier_set:
+            steps.append((from_id, to_id, edge))
+        if direction in ("in", "both") and to_id in frontier_set:
+            steps.append((to_id, from_id, edge))
+    return steps, complete
+
+
+async def get_trust_nodes(membership_ids: List[str]) -> dict:
+    """Name and status for each member, in one query"""
+    profiles = await db.profiles.find(
+        {"membershipId": {"$in": membership_ids}},
+        {"_id": 0, "membershipId": 1, "name": 1, "paymentStatus": 1}
+    ).to_list(None)
+    return {profile["membershipId"]: profile for profile in profiles}
+
+
+def validate_trust_direction(direction: str):
+    if direction not in TRUST_DIRECTIONS:
+        raise HTTPException(status_code=400, detail="direction must be one of: out, in, both")
+
+
+async def get_trust_neighborhood(membership_id: str, depth: int, direction: str, limit: int) -> dict:
+    depths = {membership_id: 0}
+    edges = set()
+    frontier = [membership_id]
+    truncated = False
+    
+    for level in range(1, depth + 1):
+        if not frontier:
+            break
+        next_frontier = []
+        steps, complete = await expand_frontier(frontier, direction)
+        truncated = truncated or not complete
+        for node, neighbor, edge in steps:
+            if neighbor not in depths:
+                if len(depths) >= limit:
+                    truncated = True
+                    continue
+                depths[neighbor] = level
+                next_frontier.append(neighbor)
+            edges.add(edge)
+        frontier = next_frontier
+    
+    nodes = await get_trust_nodes(list(depths))
+    
+    return {
+        "membershipId": membership_id,
+        "depth": depth,
+        "direction": direction,
+        "truncated": truncated,
+        "nodes": [
+            {
+                "membershipId": node_id,
+                "name": nodes.get(node_id, {}).get("name", ""),
+                "paymentStatus": nodes.get(node_id, {}).get("paymentStatus", ""),
+                "depth": node_depth
+            }
+            for node_id, node_depth in sorted(depths.items(), key=lambda item: item[1])
+        ],
+        "edges": [{"from": from_id, "to": to_id} for from_id, to_id in sorted(edges)]
+    }
+
+
+async def find_trust_path(source: str, target: str, max_length: int, direction: str) -> Tuple[Optional[List[str]], bool]:
+    """
+    Bidirectional BFS: expand whichever side has the smaller frontier until the
+    two searches meet. Returns (shortest path of membership IDs or None, conclusive);
+    conclusive is False when a work cap stopped the search before it could decide.
+    """
+    if source == target:
+        return [source], True
+    
+    parents = {"forward": {source: None}, "backward": {target: None}}
+    distances = {"forward": {source: 0}, "backward": {target: 0}}
+    frontiers = {"forward": [source], "backward": [target]}
+    directions = {"forward": direction, "backward": TRUST_DIRECTIONS[direction]}
+    searched = 0
+    
+    while searched < max_length and frontiers["forward"] and frontiers["backward"]:
+        side = "forward" if len(frontiers["forward"]) <= len(frontiers["backward"]) else "backward"
+        other = "backward" if side == "forward" else "forward"
+        
+        next_frontier = []
+        steps, complete = await expand_frontier(frontiers[side], directions[side])
+        for node, neighbor, _ in steps:
+            if neighbor not in parents[side]:
+                parents[side][neighbor] = node
+                distances[side][neighbor] = distances[side][node] + 1
+                next_frontier.append(neighbor)
+        frontiers[side] = next_frontier
+        searched += 1
+        visited = len(parents["forward"]) + len(parents["backward"])
+        
+        # Finish the whole level before picking the best meeting point
+        meetings = [node for node in next_frontier if node in parents[other]]
+        if meetings:
+            meet = min(meetings, key=lambda node: distances["forward"][node] + distances["backward"][node])
+            path = []
+            node = meet
+            while node is not None:
+                path.append(node)
+                node = parents["forward"][node]
+            path.reverse()
+            node = parents["backward"][meet]
+            while node is not None:
+                path.append(node)
+                node = parents["backward"][node]
+            return path, True
+        
+        # Checked after the meeting test, so a path found on this level still counts
+        if not complete or visited > TRUST_MAX_VISITED:
+            return None, False
+    
+    return None, True
+
+
+@router.get("/trust/{membership_id}/neighborhood")
+async def get_trust_neighborhood_endpoint(membership_id: str, depth: int = 2, direction: str = "both", limit: int = 200):
+    """
+    Members within `depth` reference hops (out: who I reference, in: who references me)
+    """
+    validate_trust_direction(direction)
+    if not 1 <= depth <= TRUST_MAX_DEPTH:
+        raise HTTPException(status_code=400, detail=f"depth must be between 1 and {TRUST_MAX_DEPTH}")
+    
+    if not await db.profiles.find_one({"membershipId": membership_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return await get_trust_neighborhood(membership_id, depth, direction, min(max(limit, 1), TRUST_MAX_NODES))
+
+
+@router.get("/trust/path")
+async def get_trust_path(source: str, target: str, maxLength: int = 4, direction: str = "both"):
+    """
+    Shortest reference path between two members
+    """
+    validate_trust_direction(direction)
+    if not 1 <= maxLength <= TRUST_MAX_PATH_LENGTH:
+        raise HTTPException(status_code=400, detail=f"maxLength must be between 1 and {TRUST_MAX_PATH_LENGTH}")
+    
+    path, conclusive = await find_trust_path(source, target, maxLength, direction)
+    if path is None:
+        # inconclusive: the search hit its work cap, so no path is not proof of none
+        return {"source": source, "target": target, "connected": False, "inconclusive": not conclusive, "length": None, "path": []}
+    
+    nodes = await get_trust_nodes(path)
+    
+    return {
+        "source": source,
+        "target": target,
+        "connected": True,
+        "inconclusive": False,
+        "length": len(path) - 1,
+        "path": [
+            {
+                "membershipId": node_id,
+                "name": nodes.get(node_id, {}).get("name", ""),
+                "paymentStatus": nodes.get(node_id, {}).get("paymentStatus", "")
+            }
+            for node_id in path
+        ]
+    }
@@ -0,0 +1,211 @@
+"""
+Signed QR verification tokens, the public key and the revocation list.
+"""
+
+from fastapi import APIRouter, HTTPException
+from datetime import datetime, timezone
+import base64
+import hashlib
+import json as json_lib
+import os
+
+from bson import ObjectId
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from pymongo.errors import DuplicateKeyError
+
+from core import db, logger
+
+router = APIRouter(prefix="/api")
+
+# QR verification token signing (Ed25519)
+QR_SIGNING_KEY = os.environ.get('QR_SIGNING_KEY', '')  # base64 encoded 32-byte Ed25519 private key
+QR_TOKEN_TTL_SECONDS = int(os.environ.get('QR_TOKEN_TTL_SECONDS', '86400'))  # Signed token lifetime (24h)
+
+# ============================================================================
+# QR VERIFICATION TOKENS - Signed, offline-verifiable QR payloads
+# ============================================================================
+#
+# Token format: "CC1.<payload>.<signature>" where both parts are unpadded
+# base64url. The payload is compact JSON:
+#   {"v": 1, "kid": key id, "mid": membershipId, "aid": assignedMemberId,
+#    "st": paymentStatus, "iat": issued at (unix), "exp": expiry (unix)}
+# The signature is Ed25519 over the raw payload bytes. Scanners verify it with
+# the key from GET /api/qr/public-key and check "mid" against the revocation
+# list from GET /api/qr/revocations.
+
+QR_TOKEN_PREFIX = "CC1"
+
+_qr_signing_key = None
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+async def load_qr_signing_key() -> Ed25519PrivateKey:
+    """
+    Load the Ed25519 signing key from QR_SIGNING_KEY. Without it, the first
+    worker generates a key and stores it in `app_secrets`, so every worker
+    (and every restart) signs with the same key.
+    """
+    global _qr_signing_key
+    if _qr_signing_key is None:
+        if QR_SIGNING_KEY:
+            _qr_signing_key = Ed25519PrivateKey.from_private_bytes(base64.b64decode(QR_SIGNING_KEY))
+            return _qr_signing_key
+        
+        logger.warning("QR_SIGNING_KEY not configured. Using the signing key stored in the database.")
+        generated = Ed25519PrivateKey.generate().private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        try:
+            await db.app_secrets.insert_one({
+                "_id": "qr_signing_key",
+                "privateKey": base64.b64encode(generated).decode("ascii"),
+                "createdAt": datetime.now(timezone.utc).isoformat()
+            })
+        except DuplicateKeyError:
+            pass  # Another worker stored one first; use that
+        stored = await db.app_secrets.find_one({"_id": "qr_signing_key"})
+        _qr_signing_key = Ed25519PrivateKey.from_private_bytes(base64.b64decode(stored["privateKey"]))
+    return _qr_signing_key
+
+
+def get_qr_signing_key() -> Ed25519PrivateKey:
+    if _qr_signing_key is None:
+        raise RuntimeError("QR signing key not loaded; await load_qr_signing_key() first")
+    return _qr_signing_key
+
+
+def get_qr_public_key_bytes() -> bytes:
+    return get_qr_signing_key().public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    )
+
+
+def get_qr_key_id() -> str:
+    """Short key id so scanners can tell which published key signed a token"""
+    return b64url_encode(hashlib.sha256(get_qr_public_key_bytes()).digest()[:8])
+
+
+def issue_qr_token(profile: dict) -> dict:
+    """Create a signed verification token for an approved profile"""
+    issued_at = int(datetime.now(timezone.utc).timestamp())
+    expires_at = issued_at + QR_TOKEN_TTL_SECONDS
+    payload = {
+        "v": 1,
+        "kid": get_qr_key_id(),
+        "mid": profile["membershipId"],
+        "aid": profile.get("assignedMemberId", ""),
+        "st": profile.get("paymentStatus", "pending"),
+        "iat": issued_at,
+        "exp": expires_at
+    }
+    payload_bytes = json_lib.dumps(payload, separators=(",", ":")).encode("utf-8")
+    signature = get_qr_signing_key().sign(payload_bytes)
+    token = f"{QR_TOKEN_PREFIX}.{b64url_encode(payload_bytes)}.{b64url_encode(signature)}"
+    return {"token": token, "expiresAt": datetime.fromtimestamp(expires_at, timezone.utc).isoformat()}
+
+
+async def revoke_qr_token(membership_id: str, reason: str):
+    """Add a membership to the QR revocation list"""
+    now = datetime.now(timezone.utc).isoformat()
+    await db.qr_revocations.update_one(
+        {"membershipId": membership_id},
+        {"$set": {
+            "membershipId": membership_id,
+            "revoked": True,
+            "reason": reason,
+            "revokedAt": now,
+            "updatedAt": now
+        }},
+        upsert=True
+    )
+
+
+async def clear_qr_revocation(membership_id: str):
+    """
+    Lift a revocation (e.g. after re-approval). The row is kept with
+    revoked: false so incremental scanners see the change.
+    """
+    await db.qr_revocations.update_one(
+        {"membershipId": membership_id, "revoked": {"$ne": False}},
+        {"$set": {"revoked": False, "updatedAt": datetime.now(timezone.utc).isoformat()}}
+    )
+
+
+@router.get("/qr/token/{membership_id}")
+async def get_qr_token(membership_id: str):
+    """Issue a signed QR verification token for an approved profile"""
+    profile = await db.profiles.find_one(
+        {"membershipId": membership_id},
+        {"_id": 0, "membershipId": 1, "assignedMemberId": 1, "paymentStatus": 1, "qrCodeEnabled": 1}
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if not profile.get("qrCodeEnabled"):
+        raise HTTPException(status_code=403, detail="QR code is not enabled for this profile")
+    
+    await load_qr_signing_key()
+    return issue_qr_token(profile)
+
+
+@router.get("/qr/public-key")
+async def get_qr_public_key():
+    """Public key scanners use to verify QR tokens offline (public endpoint)"""
+    await load_qr_signing_key()
+    return {
+        "alg": "Ed25519",
+        "kid": get_qr_key_id(),
+        "publicKey": b64url_encode(get_qr_public_key_bytes()),
+        "tokenTtlSeconds": QR_TOKEN_TTL_SECONDS
+    }
+
+
+def revocation_cursor(revocation: dict) -> str:
+    return f"{revocation['updatedAt']}|{revocation['_id']}"
+
+
+@router.get("/qr/revocations")
+async def get_qr_revocations(since: str = ""):
+    """
+    Compact revocation list for scanners
+    Pass the previous response's "cursor" as `since` to fetch only changes:
+    newly revoked IDs in "revoked", lifted revocations in "restored".
+    """
+    if not since:
+        query = {"revoked": {"$ne": False}}
+    elif "|" in since:
+        # (updatedAt, _id) cursor, so rows sharing a timestamp are not skipped
+        updated_at, last_id = since.split("|", 1)
+        if not ObjectId.is_valid(last_id):
+            raise HTTPException(status_code=400, detail="Invalid since cursor")
+        query = {"$or": [
+            {"updatedAt": {"$gt": updated_at}},
+            {"updatedAt": updated_at, "_id": {"$gt": ObjectId(last_id)}}
+        ]}
+    else:
+        # Plain timestamp from older scanners; re-sending equal timestamps is harmless
+        query = {"updatedAt": {"$gte": since}}
+    
+    revocations = await db.qr_revocations.find(
+        query,
+        {"_id": 1, "membershipId": 1, "revoked": 1, "updatedAt": 1}
+    ).sort([("updatedAt", 1), ("_id", 1)]).to_list(None)
+    
+    return {
+        "updatedAt": revocations[-1]["updatedAt"] if revocations else since.split("|", 1)[0],
+        "cursor": revocation_cursor(revocations[-1]) if revocations else since,
+        "revoked": [revocation["membershipId"] for revocation in revocations if revocation.get("revoked") is not False],
+        "restored": [revocation["membershipId"] for revocation in revocations if revocation.get("revoked") is False]
+    }
@@ -0,0 +1,16 @@
+"""
+Site visit tracking for the landing page.
+"""
+
+from fastapi import APIRouter
+
+from core import db
+from models import SiteVisit
+
+router = APIRouter(prefix="/api")
+
+# Track site visit
+@router.post("/track-visit")
+async def track_visit(visit: SiteVisit):
+    await db.site_visits.insert_one(visit.model_dump())
+    return {"status": "tracked"}
@@ -0,0 +1,130 @@
+"""
+PayPal and Venmo payment webhooks.
+"""
+
+from fastapi import APIRouter, BackgroundTasks, Request
+from datetime import datetime, timezone
+
+from core import db, logger, normalize_email
+from metrics import enqueue_task
+from notifications import send_auto_payment_notification
+from retention import expires_at
+
+router = APIRouter(prefix="/api")
+
+# ============================================================================
+# PAYMENT WEBHOOKS - Automatic Payment Notifications
+# ============================================================================
+
+@router.post("/webhooks/paypal")
+async def paypal_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    PayPal Webhook Handler
+    Receives instant payment notifications from PayPal
+    """
+    try:
+        # Get webhook data
+        body = await request.body()
+        headers = request.headers
+        
+        # Log webhook received
+        logger.info("PayPal webhook received")
+        
+        # Parse webhook data
+        webhook_data = await request.json()
+        event_type = webhook_data.get("event_type", "")
+        
+        logger.info(f"PayPal Event Type: {event_type}")
+        
+        # Handle different event types
+        if event_type == "PAYMENT.SALE.COMPLETED":
+            # Payment completed successfully
+            sale = webhook_data.get("resource", {})
+            
+            # Extract payment info
+            payer_email = sale.get("payer", {}).get("payer_info", {}).get("email", "")
+            amount = sale.get("amount", {}).get("total", "")
+            currency = sale.get("amount", {}).get("currency", "USD")
+            transaction_id = sale.get("id", "")
+            payment_status = sale.get("state", "")
+            
+            logger.info(f"Payment from {payer_email}: {currency} {amount}, Transaction: {transaction_id}")
+            
+            # Try to match with pending payment in database
+            profile = await db.profiles.find_one({"emailNormalized": normalize_email(payer_email), "paymentStatus": "in_review"})
+            if not profile:
+                # Profiles from before emailNormalized, until scripts/dedupe_profiles.py backfills them
+                profile = await db.profiles.find_one({"email": payer_email, "paymentStatus": "in_review"})
+            
+            if profile:
+                # Auto-update payment status
+                await db.profiles.update_one(
+                    {"membershipId": profile["membershipId"]},
+                    {"$set": {
+                        "paymentStatus": "auto_verified",
+                        "paymentTransactionId": transaction_id,
+                        "paymentAmount": f"{currency} {amount}",
+                        "paymentVerifiedAt": datetime.now(timezone.utc).isoformat(),
+                        "updatedAt": datetime.now(timezone.utc).isoformat()
+                    }}
+                )
+                
+                # Send notification to admin
+                enqueue_task(
+                    background_tasks,
+                    send_auto_payment_notification,
+                    profile.get("name", "Member"),
+                    payer_email,
+                    profile.get("membershipId", ""),
+                    amount,
+                    transaction_id
+                )
+                
+                logger.info(f"Auto-matched payment for {payer_email}")
+            else:
+                # No matching profile - still log it for admin review
+                await db.unmatched_payments.insert_one({
+                    "payer_email": payer_email,
+                    "amount": amount,
+                    "currency": currency,
+                    "transaction_id": transaction_id,
+                    "payment_status": payment_status,
+                    "received_at": datetime.now(timezone.utc).isoformat(),
+                    "webhook_data": webhook_data,
+                    "expiresAt": expires_at("unmatched_payments")
+                })
+                
+                logger.warning(f"Unmatched payment from {payer_email} - stored for admin review")
+        
+        return {"status": "success", "event_type": event_type}
+        
+    except Exception as e:
+        logger.error(f"PayPal webhook error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
+@router.post("/webhooks/venmo")
+async def venmo_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    Venmo Webhook Handler
+    Note: Venmo has limited webhook support. This is prepared for future use.
+    """
+    try:
+        webhook_data = await request.json()
+        event_type = webhook_data.get("type", "")
+        
+        logger.info(f"Venmo webhook received: {event_type}")
+        
+        # Log for admin review
+        await db.venmo_notifications.insert_one({
+            "event_type": event_type,
+            "data": webhook_data,
+            "received_at": datetime.now(timezone.utc).isoformat(),
+            "expiresAt": expires_at("venmo_notifications")
+        })
+        
+        return {"status": "success"}
+        
+    except Exception as e:
+        logger.error(f"Venmo webhook error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Fill in amountCents/currency on payment confirmations written before they
+were normalized at confirmation time, then rebuild the analytics_daily
+rollups from scratch (see revenue.py).
+
+Safe to re-run: only rows without amountCents are touched. Amounts that
+cannot be parsed ("Not specified") are stored as amountCents: null and
+show up as unpriced approvals.
+
+Usage (from the backend directory):
+    python scripts/backfill_payment_amounts.py [--dry-run] [--batch-size 1000] [--skip-rollups]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core  # noqa: E402
+import revenue  # noqa: E402
+
+UNPARSED_SAMPLE_SIZE = 20
+
+
+async def backfill(db, batch_size: int, dry_run: bool) -> dict:
+    summary = {"scanned": 0, "priced": 0, "unpriced": 0, "unparsedSample": []}
+    last_id = None
+    while True:
+        query = {"amountCents": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        rows = await db.payment_confirmations.find(query, {"_id": 1, "amount": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not rows:
+            return summary
+        last_id = rows[-1]["_id"]
+
+        operations = []
+        for row in rows:
+            fields = revenue.normalize_amount(row.get("amount"))
+            if fields["amountCents"] is None:
+                summary["unpriced"] += 1
+                if len(summary["unparsedSample"]) < UNPARSED_SAMPLE_SIZE:
+                    summary["unparsedSample"].append(row.get("amount"))
+            else:
+                summary["priced"] += 1
+            operations.append(UpdateOne({"_id": row["_id"]}, {"$set": fields}))
+        summary["scanned"] += len(rows)
+
+        if not dry_run:
+            await db.payment_confirmations.bulk_write(operations, ordered=False)
+        print(f"  {summary['scanned']} confirmations processed")
+
+
+async def run(batch_size: int, dry_run: bool, skip_rollups: bool):
+    try:
+        summary = await backfill(core.db, batch_size, dry_run)
+        if not dry_run and not skip_rollups:
+            await revenue.refresh_rollups(core.db)
+    finally:
+        core.get_mongo_client().close()
+
+    verb = "Would normalize" if dry_run else "Normalized"
+    print(f"{verb} {summary['scanned']} confirmations: {summary['priced']} priced, {summary['unpriced']} unpriced")
+    for amount in summary["unparsedSample"]:
+        print(f"  unparsed: {amount!r}")
+    if not dry_run and not skip_rollups:
+        print("Analytics rollups rebuilt")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize payment confirmation amounts and rebuild analytics rollups")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be parsed without writing")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--skip-rollups", action="store_true", help="Do not rebuild analytics_daily afterwards")
+    args = parser.parse_args()
+
+    return asyncio.run(run(args.batch_size, args.dry_run, args.skip_rollups))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Backfill profile photos stored as raw base64 into the image pipeline.
+
+Profiles created before the image pipeline keep the client-uploaded base64 in
+`photo` and have no `photoThumb`. This re-renders them into content-addressed
+thumbnail/display images and replaces the base64 with image URLs.
+
+Usage (from the backend directory):
+    python scripts/backfill_photo_thumbnails.py [--batch-size 100] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import HTTPException  # noqa: E402
+
+from core import db  # noqa: E402
+from routers import images  # noqa: E402
+
+
+async def backfill(batch_size: int, dry_run: bool):
+    query = {
+        "photo": {"$nin": ["", None], "$not": {"$regex": f"^{images.IMAGE_URL_PREFIX}"}},
+        "photoThumb": {"$in": ["", None]}
+    }
+
+    converted = 0
+    failed = 0
+    cursor = db.profiles.find(query, {"_id": 0, "membershipId": 1, "photo": 1}).batch_size(batch_size)
+
+    async for profile in cursor:
+        try:
+            if dry_run:
+                # Decode and render only; nothing is written
+                images.render_photo_variants(images.decode_base64_image(profile["photo"]))
+            else:
+                photo_fields = await images.process_profile_photo(profile["photo"])
+                await db.profiles.update_one(
+                    {"membershipId": profile["membershipId"]},
+                    {"$set": photo_fields}
+                )
+        except HTTPException as e:
+            failed += 1
+            print(f"Skipping {profile['membershipId']}: {e.detail}")
+            continue
+
+        converted += 1
+
+    print(f"Converted {converted} profile photos ({failed} failed){' [dry run]' if dry_run else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill profile photo thumbnails")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Merge member profiles that share an email, then create the unique
+emailNormalized index (see profile_dedupe.py).
+
+Run once after deploying normalized emails (it also backfills them), and
+again any time the index reports it could not be built.
+
+Usage (from the backend directory):
+    python scripts/dedupe_profiles.py [--dry-run] [--batch-size 500]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core  # noqa: E402
+import profile_dedupe  # noqa: E402
+
+
+async def dedupe(dry_run: bool):
+    try:
+        summary = await profile_dedupe.run_dedupe(core.db, dry_run)
+    finally:
+        core.get_mongo_client().close()
+
+    if dry_run:
+        print(f"{summary['duplicateGroups']} duplicate emails, {summary['profilesToMerge']} profiles would be merged")
+        for group in summary["sample"]:
+            print(f"  {group['email']}: {group['count']} profiles")
+        return 0
+
+    print(f"Backfilled {summary['backfilled']} emails; merged {summary['mergedProfiles']} profiles "
+          f"into {summary['mergedGroups']} memberships")
+    print("Unique email index ready" if summary["indexCreated"] else "Unique email index could not be created (see warnings)")
+    return 0 if summary["indexCreated"] else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate member profiles")
+    parser.add_argument("--dry-run", action="store_true", help="Report duplicate groups only")
+    parser.add_argument("--batch-size", type=int, default=profile_dedupe.DEDUPE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    profile_dedupe.DEDUPE_BATCH_SIZE = args.batch_size
+    return asyncio.run(dedupe(args.dry_run))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Create the API's MongoDB indexes out-of-band.
+
+Run as a deploy/release step together with MONGO_INDEX_MODE=off on the API,
+so cold starts never wait on (or race each other for) createIndexes.
+
+Usage (from the backend directory):
+    python scripts/ensure_indexes.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core  # noqa: E402
+import server  # noqa: E402
+
+
+async def ensure():
+    try:
+        return await server.create_indexes()
+    finally:
+        core.get_mongo_client().close()
+
+
+def main():
+    ok = asyncio.run(ensure())
+    print("Indexes ensured" if ok else "Some indexes could not be created (see warnings above)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
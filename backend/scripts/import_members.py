@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bulk-import members from a CSV (name,email[,photo] header) or JSONL file.
+
+Rows are validated, de-duplicated by email and inserted in chunks (see
+member_import.py); welcome emails go out per chunk. Progress is printed and
+checkpointed in `member_imports`, so an interrupted import resumes with
+--import-id and the same file.
+
+Usage (from the backend directory):
+    python scripts/import_members.py members.csv [--format csv|jsonl] \\
+        [--chunk-size 500] [--import-id ID] [--no-emails]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import HTTPException  # noqa: E402
+
+import core  # noqa: E402
+import member_import  # noqa: E402
+from notifications import send_welcome_emails  # noqa: E402
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def run(args):
+    path = Path(args.file)
+    format = args.format or ("jsonl" if path.suffix.lower() in (".jsonl", ".ndjson") else "csv")
+
+    async def send_welcomes(recipients):
+        if not args.no_emails:
+            await send_welcome_emails(recipients)
+
+    try:
+        job = await member_import.start_import(core.db, path.name, file_sha256(path), args.import_id)
+        print(f"Import {job['importId']} ({'resuming at row ' + str(job['checkpoint']) if job['checkpoint'] else 'new'})")
+
+        with open(path, "rb") as f:
+            async for state in member_import.import_members(core.db, f, format, job, send_welcomes, args.chunk_size):
+                print(f"  row {state['checkpoint']}: {state['inserted']} inserted, "
+                      f"{state['duplicates']} duplicates, {state['invalid']} invalid")
+    finally:
+        core.get_mongo_client().close()
+
+    for error in job["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+    print(f"Import {job['importId']} {job['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk member import")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=member_import.IMPORT_FORMATS, help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=member_import.IMPORT_CHUNK_SIZE)
+    parser.add_argument("--import-id", help="Resume this import (same file)")
+    parser.add_argument("--no-emails", action="store_true", help="Skip welcome emails")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except member_import.ImportConflict as e:
+        print(e)
+        return 1
+    except HTTPException as e:
+        print(e.detail)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
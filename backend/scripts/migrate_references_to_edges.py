@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Move embedded profile `references` arrays into the `references` edge collection.
+
+Each embedded {membershipId, name, addedOn} entry becomes one
+{fromId, toId, name, addedOn} edge. Edges are upserted, so the migration is
+safe to re-run; duplicates inside an old array collapse into one edge. Once a
+profile's edges are written its embedded array is removed.
+
+Usage (from the backend directory):
+    python scripts/migrate_references_to_edges.py [--batch-size 500] [--keep-embedded]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import UpdateOne  # noqa: E402
+
+import core  # noqa: E402
+
+
+async def migrate(batch_size: int, keep_embedded: bool):
+    db = core.db
+
+    await db.references.create_index([("fromId", 1), ("toId", 1)], unique=True)
+    await db.references.create_index([("toId", 1), ("fromId", 1)])
+
+    profiles_migrated = 0
+    edges_written = 0
+    operations = []
+    migrated_ids = []
+
+    async def flush():
+        nonlocal edges_written
+        if operations:
+            result = await db.references.bulk_write(operations, ordered=False)
+            edges_written += result.upserted_count
+            operations.clear()
+        if migrated_ids and not keep_embedded:
+            await db.profiles.update_many(
+                {"membershipId": {"$in": migrated_ids}},
+                {"$unset": {"references": ""}}
+            )
+        migrated_ids.clear()
+
+    cursor = db.profiles.find(
+        {"references.0": {"$exists": True}},
+        {"_id": 0, "membershipId": 1, "references": 1}
+    ).batch_size(batch_size)
+
+    async for profile in cursor:
+        for reference in profile.get("references", []):
+            if not reference.get("membershipId"):
+                continue
+            operations.append(UpdateOne(
+                {"fromId": profile["membershipId"], "toId": reference["membershipId"]},
+                {"$setOnInsert": {"name": reference.get("name", ""), "addedOn": reference.get("addedOn", "")}},
+                upsert=True
+            ))
+        migrated_ids.append(profile["membershipId"])
+        profiles_migrated += 1
+
+        if len(operations) >= batch_size:
+            await flush()
+
+    await flush()
+
+    print(f"Migrated {profiles_migrated} profiles, {edges_written} new reference edges")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate embedded references to the edge collection")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-embedded", action="store_true", help="Leave the old arrays in place")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.batch_size, args.keep_embedded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Archive and prune the log collections, or restore an archived window.
+
+`run` compacts and expires email_logs, venmo_notifications and
+unmatched_payments per retention.POLICIES, writing zstd NDJSON archives to
+RETENTION_ARCHIVE_URL first. Schedule it daily (cron or a k8s CronJob).
+
+`restore` loads the archived rows whose timestamp falls in [--start, --end)
+into a separate collection (default <collection>_restored) for audits.
+
+Usage (from the backend directory):
+    python scripts/retention_archive.py run [--collection email_logs] [--dry-run]
+    python scripts/retention_archive.py restore --collection unmatched_payments \\
+        --start 2025-01-01 --end 2025-02-01 [--into audit_unmatched] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core  # noqa: E402
+import retention  # noqa: E402
+
+
+async def run(args):
+    store = retention.open_archive_store(args.archive)
+    try:
+        results = await retention.run_retention(core.db, store, args.collection, args.dry_run)
+    finally:
+        core.get_mongo_client().close()
+
+    verb = "Would archive" if args.dry_run else "Archived"
+    for collection, stages in results.items():
+        print(f"{verb} {collection}: {stages['expire']} expired, {stages['compact']} compacted")
+
+
+async def restore(args):
+    store = retention.open_archive_store(args.archive)
+    target = args.into or f"{args.collection}_restored"
+    try:
+        restored = await retention.restore_window(core.db, store, args.collection, args.start, args.end, target, args.dry_run)
+    finally:
+        core.get_mongo_client().close()
+
+    print(f"Restored {restored} {args.collection} rows into {target}{' [dry run]' if args.dry_run else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log collection retention and archive restore")
+    parser.add_argument("--archive", default=retention.RETENTION_ARCHIVE_URL, help="Archive directory or s3://bucket/prefix")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Archive rows past their windows, then compact or delete them")
+    run_parser.add_argument("--collection", action="append", choices=list(retention.POLICIES),
+                            help="Limit to a collection (repeatable; default all)")
+    run_parser.add_argument("--dry-run", action="store_true", help="Count the rows only")
+
+    restore_parser = commands.add_parser("restore", help="Load an archived time window into a collection")
+    restore_parser.add_argument("--collection", required=True, choices=list(retention.POLICIES))
+    restore_parser.add_argument("--start", required=True, help="ISO date or timestamp (inclusive)")
+    restore_parser.add_argument("--end", required=True, help="ISO date or timestamp (exclusive)")
+    restore_parser.add_argument("--into", help="Target collection (default <collection>_restored)")
+    restore_parser.add_argument("--dry-run", action="store_true", help="Count the rows only")
+
+    args = parser.parse_args()
+    asyncio.run(run(args) if args.command == "run" else restore(args))
+
+
+if __name__ == "__main__":
+    main()
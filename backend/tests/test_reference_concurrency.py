@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Reference Add Concurrency Tests
+Fires parallel adds against the reference endpoints and verifies:
+1. Parallel adds of the same reference insert exactly one reference
+2. Every losing request gets "Reference already exists" (400), never a 500
+3. Parallel batch adds with overlapping IDs never create duplicates
+"""
+
+import requests
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ReferenceConcurrencyTester:
+    def __init__(self, parallel_requests=20):
+        # Get backend URL from frontend/.env
+        self.base_url = self._get_backend_url()
+        self.api_url = f"{self.base_url}/api"
+        self.parallel_requests = parallel_requests
+
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.test_results = []
+
+        print(f"🔧 Testing Backend URL: {self.base_url}")
+        print(f"🔧 Parallel requests per test: {self.parallel_requests}")
+
+    def _get_backend_url(self):
+        """Get backend URL from frontend/.env file"""
+        try:
+            with open('/app/frontend/.env', 'r') as f:
+                for line in f:
+                    if line.startswith('REACT_APP_BACKEND_URL='):
+                        return line.split('=', 1)[1].strip()
+        except Exception as e:
+            print(f"⚠️ Could not read frontend/.env: {e}")
+
+        # Fallback to default
+        return "https://safe-share-1.preview.emergentagent.com"
+
+    def log_test(self, name, success, details=""):
+        """Log test result"""
+        self.tests_run += 1
+        if success:
+            self.tests_passed += 1
+            status = "✅ PASSED"
+        else:
+            status = "❌ FAILED"
+
+        self.test_results.append({
+            "test": name,
+            "status": status,
+            "success": success,
+            "details": details
+        })
+        print(f"{status} - {name}")
+        if details:
+            print(f"    Details: {details}")
+
+    def create_profile(self, name, email):
+        """Create a test profile and return its membership ID"""
+        response = requests.post(f"{self.api_url}/profiles", json={"name": name, "email": email}, timeout=15)
+        if response.status_code != 200:
+            print(f"    ❌ Could not create profile {name}: {response.text[:200]}")
+            return None
+        return response.json()['membershipId']
+
+    def get_references(self, membership_id):
+        response = requests.get(f"{self.api_url}/profiles/{membership_id}", timeout=15)
+        return response.json().get('references', []) if response.status_code == 200 else []
+
+    def fire_parallel(self, request_fn):
+        """Run request_fn concurrently and return the responses"""
+        with ThreadPoolExecutor(max_workers=self.parallel_requests) as pool:
+            futures = [pool.submit(request_fn) for _ in range(self.parallel_requests)]
+            return [future.result() for future in futures]
+
+    def test_parallel_single_adds(self, owner_id, reference_id):
+        """Same reference added N times at once -> exactly one insert"""
+        responses = self.fire_parallel(lambda: requests.post(
+            f"{self.api_url}/profiles/{owner_id}/references",
+            json={"membershipId": reference_id},
+            timeout=30
+        ))
+
+        statuses = [response.status_code for response in responses]
+        inserted = statuses.count(200)
+        duplicates = statuses.count(400)
+        self.log_test(
+            "Parallel Single Adds - One Insert",
+            inserted == 1 and duplicates == len(statuses) - 1,
+            f"200: {inserted}, 400: {duplicates}, other: {len(statuses) - inserted - duplicates}"
+        )
+
+        stored = [ref for ref in self.get_references(owner_id) if ref['membershipId'] == reference_id]
+        self.log_test("Parallel Single Adds - No Duplicates Stored", len(stored) == 1, f"Stored copies: {len(stored)}")
+
+    def test_parallel_batch_adds(self, owner_id, reference_ids):
+        """Overlapping batch adds at once -> each reference stored once"""
+        responses = self.fire_parallel(lambda: requests.post(
+            f"{self.api_url}/profiles/{owner_id}/references/batch",
+            json={"membershipIds": reference_ids},
+            timeout=30
+        ))
+
+        self.log_test(
+            "Parallel Batch Adds - No Server Errors",
+            all(response.status_code == 200 for response in responses),
+            f"Statuses: {sorted(set(response.status_code for response in responses))}"
+        )
+
+        total_added = sum(len(response.json().get('added', [])) for response in responses if response.status_code == 200)
+        self.log_test(
+            "Parallel Batch Adds - Each Reference Added Once",
+            total_added == len(reference_ids),
+            f"Reported added: {total_added}, expected: {len(reference_ids)}"
+        )
+
+        stored = [ref['membershipId'] for ref in self.get_references(owner_id) if ref['membershipId'] in reference_ids]
+        self.log_test(
+            "Parallel Batch Adds - No Duplicates Stored",
+            sorted(stored) == sorted(reference_ids),
+            f"Stored: {len(stored)}, unique: {len(set(stored))}"
+        )
+
+    def run_reference_concurrency_tests(self):
+        print("🚀 Starting Reference Concurrency Tests")
+        print("=" * 60)
+
+        # Fresh emails each run; an existing email would return the existing profile
+        run_id = uuid.uuid4().hex[:8]
+        owner_id = self.create_profile("Concurrency Owner", f"concurrency.owner.{run_id}@testrefs.com")
+        reference_ids = [
+            self.create_profile(f"Concurrency Ref {index}", f"concurrency.ref{index}.{run_id}@testrefs.com")
+            for index in range(4)
+        ]
+        if not owner_id or not all(reference_ids):
+            self.log_test("Setup Test Profiles", False, "Could not create test profiles")
+            return False
+
+        print("\n🔁 PARALLEL SINGLE ADDS")
+        print("-" * 50)
+        self.test_parallel_single_adds(owner_id, reference_ids[0])
+
+        print("\n🔁 PARALLEL BATCH ADDS")
+        print("-" * 50)
+        self.test_parallel_batch_adds(owner_id, reference_ids[1:])
+
+        return True
+
+    def print_summary(self):
+        print("\n" + "=" * 60)
+        print("📊 REFERENCE CONCURRENCY TEST SUMMARY")
+        print("=" * 60)
+        print(f"Total Tests: {self.tests_run}")
+        print(f"Passed: {self.tests_passed}")
+        print(f"Failed: {self.tests_run - self.tests_passed}")
+
+        if self.tests_run - self.tests_passed > 0:
+            print("\n❌ FAILED TESTS:")
+            for result in self.test_results:
+                if not result['success']:
+                    print(f"  - {result['test']}: {result['details']}")
+
+        return self.tests_passed == self.tests_run
+
+
+def main():
+    tester = ReferenceConcurrencyTester()
+
+    try:
+        success = tester.run_reference_concurrency_tests()
+        all_passed = tester.print_summary()
+        return 0 if success and all_passed else 1
+    except Exception as e:
+        print(f"❌ Test execution failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
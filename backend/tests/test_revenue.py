@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Payment Amount and Analytics Rollup Tests
+1. normalize_amount parses the free-text amounts members type
+2. Rollups round-trip: a full build, then a window refresh that replaces
+   changed days whole and drops days with no activity left
+3. A failed first build is retried as a full build, not a window refresh
+
+The rollup tests need a real MongoDB ($unionWith/$merge); they run against
+TEST_MONGO_URL in a throwaway database and are skipped when it is unset.
+
+Run from the backend directory: python -m unittest tests.test_revenue
+"""
+
+import os
+import sys
+import unittest
+import uuid
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import revenue  # noqa: E402
+
+TEST_MONGO_URL = os.environ.get('TEST_MONGO_URL', '')
+
+
+class NormalizeAmountTests(unittest.TestCase):
+    def test_dollar_sign(self):
+        self.assertEqual(revenue.normalize_amount("$39"), {"amountCents": 3900, "currency": "USD"})
+
+    def test_currency_code_suffix(self):
+        self.assertEqual(revenue.normalize_amount("39.00 USD"), {"amountCents": 3900, "currency": "USD"})
+
+    def test_thousands_separator(self):
+        self.assertEqual(revenue.normalize_amount("$1,299.99"), {"amountCents": 129999, "currency": "USD"})
+
+    def test_unparseable(self):
+        self.assertEqual(revenue.normalize_amount("Not specified"), {"amountCents": None, "currency": None})
+
+
+@unittest.skipUnless(TEST_MONGO_URL, "TEST_MONGO_URL not set")
+class RollupRoundTripTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        self.client = AsyncIOMotorClient(TEST_MONGO_URL)
+        self.db = self.client[f"test_revenue_{uuid.uuid4().hex[:8]}"]
+        await self.db.profiles.insert_many([
+            {"membershipId": "m1", "createdAt": "2024-03-01T09:00:00+00:00"},
+            {"membershipId": "m2", "createdAt": "2024-03-01T17:30:00+00:00"},
+            {"membershipId": "m3", "createdAt": "2024-03-02T08:00:00+00:00"}
+        ])
+        await self.db.payment_confirmations.insert_many([
+            {"membershipId": "m1", "paymentMethod": "venmo", "submittedAt": "2024-03-01T10:00:00+00:00",
+             "status": "approved", "approvedAt": "2024-03-02T12:00:00+00:00", **revenue.normalize_amount("$39")},
+            {"membershipId": "m2", "paymentMethod": "paypal", "submittedAt": "2024-03-02T10:00:00+00:00",
+             "status": "approved", "approvedAt": "2024-03-02T13:00:00+00:00", **revenue.normalize_amount("Not specified")},
+            {"membershipId": "m3", "paymentMethod": "venmo", "submittedAt": "2024-03-03T10:00:00+00:00",
+             "status": "approved", "approvedAt": "2024-03-03T11:00:00+00:00", **revenue.normalize_amount("39.00 USD")},
+            # Legacy row from before amounts were normalized: no amountCents or currency
+            {"membershipId": "m0", "paymentMethod": "zelle", "amount": "39", "submittedAt": "2024-02-28T10:00:00+00:00",
+             "status": "approved", "approvedAt": "2024-03-01T08:00:00+00:00"}
+        ])
+
+    async def asyncTearDown(self):
+        await self.client.drop_database(self.db.name)
+        self.client.close()
+
+    async def rollups(self):
+        rows = await self.db[revenue.ROLLUP_COLLECTION].find({}, {"buildId": 0}).sort("_id", 1).to_list(None)
+        return {row.pop("_id"): row for row in rows}
+
+    async def test_full_build(self):
+        await revenue.refresh_rollups(self.db)
+
+        days = await self.rollups()
+        self.assertEqual(sorted(days), ["2024-02-28", "2024-03-01", "2024-03-02", "2024-03-03"])
+        # Signups and the legacy approval carry no currency: counted, but not revenue entries
+        self.assertEqual(days["2024-03-01"], {
+            "signups": 2, "paymentsSubmitted": 1, "approvals": 1, "unpricedApprovals": 1, "revenue": []
+        })
+        self.assertEqual(days["2024-03-02"], {
+            "signups": 1, "paymentsSubmitted": 1, "approvals": 2, "unpricedApprovals": 1,
+            "revenue": [{"method": "venmo", "currency": "USD", "cents": 3900, "count": 1}]
+        })
+        self.assertEqual(days["2024-03-03"]["revenue"], [{"method": "venmo", "currency": "USD", "cents": 3900, "count": 1}])
+
+        state = await self.db.analytics_state.find_one({"_id": "daily"})
+        self.assertTrue(state.get("builtAt"))
+
+    async def test_window_refresh_replaces_days(self):
+        await revenue.refresh_rollups(self.db)
+
+        # m3's confirmation is withdrawn: 2024-03-03 has no activity left
+        await self.db.payment_confirmations.delete_one({"membershipId": "m3"})
+        await self.db.profiles.insert_one({"membershipId": "m4", "createdAt": "2024-03-02T20:00:00+00:00"})
+        await revenue.refresh_rollups(self.db, "2024-03-02")
+
+        days = await self.rollups()
+        self.assertEqual(sorted(days), ["2024-02-28", "2024-03-01", "2024-03-02"])
+        self.assertEqual(days["2024-03-01"]["signups"], 2)  # Outside the window, untouched
+        self.assertEqual(days["2024-03-02"]["signups"], 2)
+        self.assertEqual(days["2024-03-02"]["approvals"], 2)
+
+    async def test_failed_first_build_retries_full_history(self):
+        with mock.patch.object(revenue, "refresh_rollups", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                await revenue.refresh_recent_rollups(self.db)
+
+        # The state document now exists but records no finished build
+        self.assertTrue(await revenue.refresh_recent_rollups(self.db))
+        days = await self.rollups()
+        self.assertIn("2024-03-01", days)
+
+
+if __name__ == "__main__":
+    unittest.main()
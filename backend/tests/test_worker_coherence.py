@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Cache Coherence Tests
+Runs two workers in one process, each with its own copy of the modules that
+hold per-process caches (routers/sponsors.py, notifications.py,
+routers/admin.py) and its own InMemoryBus on a shared hub, over one shared
+mongomock database. Requests go to each worker's API and verify:
+1. A sponsor logo uploaded on one worker is served by the other
+2. An admin user created on one worker reloads the other's SMS roster
+3. A worker that misses an event serves the old logo only until its cache
+   TTL expires, then reloads
+
+Run from the backend directory: python tests/test_worker_coherence.py
+"""
+
+import asyncio
+import base64
+import importlib
+import os
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'worker_coherence')
+os.environ.setdefault('ADMIN_PASSWORD', 'admin123')
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import core  # noqa: E402
+from coordination import InMemoryBus, InMemoryHub  # noqa: E402
+
+# Modules that keep per-process state and bind the bus at import
+WORKER_MODULES = ("notifications", "routers.sponsors", "routers.admin")
+
+# 1x1 transparent PNG
+LOGO = "data:image/png;base64," + base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)).decode()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Worker:
+    """One uvicorn worker: its own bus, caches and app, sharing the database"""
+
+    def __init__(self, name, hub):
+        self.name = name
+        self.bus = InMemoryBus(hub)
+
+        core.bus = self.bus
+        for module in WORKER_MODULES:
+            sys.modules.pop(module, None)
+        self.notifications = importlib.import_module("notifications")
+        self.sponsors = importlib.import_module("routers.sponsors")
+        self.admin = importlib.import_module("routers.admin")
+
+        app = FastAPI(default_response_class=ORJSONResponse)
+        app.include_router(self.sponsors.router)
+        app.include_router(self.admin.router)
+        self.client = TestClient(app)
+
+        self.clock = FakeClock()
+        self.sponsors._sponsor_logo_cache.clock = self.clock
+
+    def get_logo(self, slot):
+        return self.client.get("/api/sponsors").json().get(str(slot))
+
+    def roster_names(self):
+        return sorted(admin["name"] for admin in asyncio.run(self.notifications.get_admin_roster()))
+
+
+class WorkerCoherenceTester:
+    def __init__(self):
+        self.password = os.environ['ADMIN_PASSWORD']
+        self.hub = InMemoryHub()
+
+        core.use_database(AsyncMongoMockClient()[os.environ['DB_NAME']])
+        original_bus = core.bus
+        try:
+            self.worker_a = Worker("A", self.hub)
+            self.worker_b = Worker("B", self.hub)
+        finally:
+            core.bus = original_bus
+
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.test_results = []
+
+    def log_test(self, name, success, details=""):
+        """Log test result"""
+        self.tests_run += 1
+        if success:
+            self.tests_passed += 1
+            status = "✅ PASSED"
+        else:
+            status = "❌ FAILED"
+
+        self.test_results.append({
+            "test": name,
+            "status": status,
+            "success": success,
+            "details": details
+        })
+        print(f"{status} - {name}")
+        if details:
+            print(f"    Details: {details}")
+
+    def test_sponsor_logo_propagates(self):
+        before = self.worker_b.get_logo(1)
+
+        response = self.worker_a.client.post(f"/api/admin/sponsors/1?password={self.password}", json={"logo": LOGO})
+        logo_url = response.json().get("logoUrl")
+        self.log_test("Upload Sponsor Logo on Worker A", response.status_code == 200 and bool(logo_url),
+                      f"Status: {response.status_code}")
+
+        after = self.worker_b.get_logo(1)
+        self.log_test("Worker B Serves the New Logo", before is None and after == logo_url,
+                      f"Before: {before}, after: {after}")
+
+    def test_admin_roster_reloads(self):
+        before = self.worker_b.roster_names()
+
+        name = f"Coherence Admin {uuid.uuid4().hex[:6]}"
+        response = self.worker_a.client.post(f"/api/admin/users/create?password={self.password}", json={
+            "name": name,
+            "email": f"coherence.{name.split()[-1]}@testrefs.com",
+            "phone": "+15550000000",
+            "username": f"coherence_{name.split()[-1]}",
+            "password": "coherence-pass"
+        })
+        self.log_test("Create Admin User on Worker A", response.status_code == 200, f"Status: {response.status_code}")
+
+        loaded = self.worker_b.notifications._admin_roster.loaded
+        after = self.worker_b.roster_names()
+        self.log_test("Worker B Roster Dropped and Reloaded", not loaded and name in after and name not in before,
+                      f"Before: {before}, after: {after}")
+
+    def test_missed_event_recovers_after_ttl(self):
+        ttl = self.worker_b.sponsors._sponsor_logo_cache.ttl_seconds
+        self.worker_b.clock.now += ttl  # Start from a fresh load
+        stale = self.worker_b.get_logo(1)
+
+        # Worker B misses the event (delivery is at-most-once)
+        self.hub.buses.remove(self.worker_b.bus)
+        try:
+            response = self.worker_a.client.delete(f"/api/admin/sponsors/1?password={self.password}")
+            self.log_test("Remove Sponsor Logo on Worker A", response.status_code == 200, f"Status: {response.status_code}")
+
+            self.worker_b.clock.now += ttl - 1
+            within_ttl = self.worker_b.get_logo(1)
+            self.log_test("Worker B Stale Within the TTL", stale is not None and within_ttl == stale,
+                          f"Served: {within_ttl}")
+
+            self.worker_b.clock.now += 1
+            after_ttl = self.worker_b.get_logo(1)
+            self.log_test("Worker B Reloads After the TTL", after_ttl is None, f"Served: {after_ttl}")
+        finally:
+            self.hub.buses.append(self.worker_b.bus)
+
+    def run_worker_coherence_tests(self):
+        print("🚀 Starting Multi-Worker Cache Coherence Tests")
+        print("=" * 60)
+
+        print("\n🖼️ SPONSOR LOGO CACHE")
+        print("-" * 50)
+        self.test_sponsor_logo_propagates()
+
+        print("\n📱 ADMIN SMS ROSTER")
+        print("-" * 50)
+        self.test_admin_roster_reloads()
+
+        print("\n⏱️ MISSED EVENT")
+        print("-" * 50)
+        self.test_missed_event_recovers_after_ttl()
+
+        return True
+
+    def print_summary(self):
+        print("\n" + "=" * 60)
+        print("📊 WORKER COHERENCE TEST SUMMARY")
+        print("=" * 60)
+        print(f"Total Tests: {self.tests_run}")
+        print(f"Passed: {self.tests_passed}")
+        print(f"Failed: {self.tests_run - self.tests_passed}")
+
+        if self.tests_run - self.tests_passed > 0:
+            print("\n❌ FAILED TESTS:")
+            for result in self.test_results:
+                if not result['success']:
+                    print(f"  - {result['test']}: {result['details']}")
+
+        return self.tests_passed == self.tests_run
+
+
+def main():
+    tester = WorkerCoherenceTester()
+
+    try:
+        success = tester.run_worker_coherence_tests()
+        all_passed = tester.print_summary()
+        return 0 if success and all_passed else 1
+    except Exception as e:
+        print(f"❌ Test execution failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
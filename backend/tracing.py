@@ -0,0 +1,240 @@
+"""
+OpenTelemetry tracing for the Clean Check API.
+
+- HTTP: one server span per request, named by route template (TracingMiddleware)
+- MongoDB: one client span per command, parented to the active span (MongoTracingListener)
+- Background tasks: the request's trace context is captured when the task is
+  queued and restored when it runs (capture_context / background_span)
+- Outbound calls: PayPal/Twilio spans are opened by metrics.track_outbound
+
+Configured from the environment by `configure_tracing()`:
+
+    OTEL_TRACES_EXPORTER        none (default) | otlp | file | console
+    OTEL_EXPORTER_OTLP_ENDPOINT collector for "otlp", e.g. http://localhost:4318
+    TRACE_EXPORT_FILE           NDJSON output for "file" (default traces.ndjson)
+    OTEL_SERVICE_NAME           defaults to clean-check-api
+
+The standard OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG variables are
+honoured by the SDK. With the exporter set to "none" the API hands out
+non-recording spans, so the instrumentation costs next to nothing.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from pymongo import monitoring
+
+from query_monitor import FILTER_LOCATIONS, redact_shape
+
+tracer = trace.get_tracer("clean_check")
+
+
+# ============================================================================
+# SETUP
+# ============================================================================
+
+class FileSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(lines)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def build_exporter(name: str):
+    if name == "otlp":
+        # Only needed when a collector is configured
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if name == "file":
+        return FileSpanExporter(os.environ.get("TRACE_EXPORT_FILE", "traces.ndjson"))
+    if name == "console":
+        return ConsoleSpanExporter()
+    return None
+
+
+def configure_tracing():
+    """Install the global tracer provider; a no-op when no exporter is configured"""
+    exporter = build_exporter(os.environ.get("OTEL_TRACES_EXPORTER", "none").strip().lower())
+    if exporter is None:
+        return None
+
+    resource = Resource.create({"service.name": os.environ.get("OTEL_SERVICE_NAME", "clean-check-api")})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def shutdown_tracing():
+    """Flush spans still buffered in the batch processor"""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware. The span ends once the last body chunk is sent, so
+    background tasks that run after the response don't inflate the request
+    span; they get spans of their own in the same trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        span = tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]}
+        )
+
+        def finish():
+            if not span.is_recording():
+                return
+            # The router stores the matched route in the scope
+            route_path = getattr(scope.get("route"), "path", None)
+            if route_path:
+                span.update_name(f"{scope['method']} {route_path}")
+                span.set_attribute("http.route", route_path)
+            span.end()
+
+        async def send_with_span(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        token = context.attach(trace.set_span_in_context(span))
+        try:
+            await self.app(scope, receive, send_with_span)
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, type(e).__name__))
+            raise
+        finally:
+            context.detach(token)
+            finish()
+
+
+# ============================================================================
+# MONGODB
+# ============================================================================
+
+class MongoTracingListener(monitoring.CommandListener):
+    """
+    Motor runs each command on its executor with a copy of the caller's
+    context, so the started event sees the span of the request that issued it.
+    """
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        parent = trace.get_current_span()
+        if not parent.is_recording():
+            return
+
+        # getMore's command value is the cursor id; its collection has its own field
+        field = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(field)
+        attributes = {
+            "db.system": "mongodb",
+            "db.namespace": event.database_name,
+            "db.operation.name": event.command_name,
+        }
+        if isinstance(collection, str):
+            attributes["db.collection.name"] = collection
+        if event.command_name in FILTER_LOCATIONS:
+            # Redacted: field names and operators only, never member data
+            shape = redact_shape(FILTER_LOCATIONS[event.command_name](event.command))
+            attributes["db.query.text"] = json.dumps(shape, sort_keys=True)
+
+        name = f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name
+        span = tracer.start_span(name, kind=SpanKind.CLIENT, attributes=attributes)
+        with self._lock:
+            self._spans[event.request_id] = span
+
+    def succeeded(self, event):
+        with self._lock:
+            span = self._spans.pop(event.request_id, None)
+        if span is not None:
+            span.end()
+
+    def failed(self, event):
+        with self._lock:
+            span = self._spans.pop(event.request_id, None)
+        if span is not None:
+            span.set_status(Status(StatusCode.ERROR, str(event.failure.get("errmsg", ""))))
+            span.end()
+
+
+# ============================================================================
+# BACKGROUND TASKS / QUEUES
+# ============================================================================
+
+def capture_context() -> dict:
+    """
+    Serialise the active trace context (W3C traceparent) into a plain dict, so
+    it can travel with a BackgroundTasks call or a queued job document.
+    """
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def background_span(name: str, carrier: dict = None):
+    """Run a queued task as a span in the trace that queued it"""
+    with tracer.start_as_current_span(
+        f"task {name}",
+        context=propagate.extract(carrier or {}),
+        kind=SpanKind.CONSUMER
+    ) as span:
+        yield span
+
+
+@contextmanager
+def outbound_span(service: str, operation: str):
+    with tracer.start_as_current_span(
+        f"{service} {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={"peer.service": service, "operation": operation}
+    ) as span:
+        yield span